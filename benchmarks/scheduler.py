@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Benchmark of the heap and calendar schedulers of NetworkEnvironment
+
+Runs N processes, each yielding `env.timeout(1)` every tick, for a number of ticks, and reports the wall-clock time
+per scheduler and the number of events processed per second. Usage:
+
+    python benchmarks/scheduler.py --processes 10000 100000 1000000 --ticks 10
+"""
+import gc
+import time
+import argparse
+import networkx as nx
+from networksimulator import environment
+
+
+def ticker(env):
+    while True:
+        yield env.timeout(1)
+
+
+def bench(scheduler, processes, ticks):
+    env = environment.NetworkEnvironment(nx.Graph(), scheduler=scheduler)
+    for _ in range(0, processes):
+        env.process(ticker(env))
+    gc.collect()
+    start = time.perf_counter()
+    env.run(until=ticks)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--ticks', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>10} {:>12} {:>8}'.format('processes', 'heap (s)', 'calendar', 'events/s', 'speedup'))
+    for processes in args.processes:
+        heap = min(bench('heap', processes, args.ticks) for _ in range(0, args.repeat))
+        calendar = min(bench('calendar', processes, args.ticks) for _ in range(0, args.repeat))
+        events = processes * args.ticks
+        print('{:>10} {:>10.3f} {:>10.3f} {:>12.0f} {:>8.2f}'.format(processes, heap, calendar, events / calendar,
+                                                                    heap / calendar))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,15 @@
-__all__ = ['agents', 'builders', 'environment', 'generators', 'grid', 'logger', 'results', 'simulator']
+"""NETSIM: A Network Simulator
+
+Importing the package is cheap: sub-modules are only imported when first accessed, e.g. `networksimulator.builders`,
+and sub-modules defer importing heavy optional dependencies (SciPy, pandas, pyarrow) until they are needed.
+"""
+import importlib
+
+__all__ = ['agents', 'aggregation', 'builders', 'distributed', 'distributions', 'ensemble', 'environment', 'graphio',
+           'grid', 'logger', 'orchestrator', 'reducers', 'results', 'simulator', 'streams', 'tracing']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
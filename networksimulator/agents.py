@@ -20,9 +20,38 @@ def run(self, graph, env):
 Note again that the `run` method is a generator that yields SimPy events. In SimPy terms, this is a process. In this
 case the process yields an arbitrary number of events, but this need not be the case. See the SimPy process
 documentation for more detail.
+
+Agents are used as node keys, so they are hashed on every node attribute lookup. The hash is therefore computed once,
+at construction, and agents hold no per-instance dictionary. Subclasses should declare `__slots__ = ()` to keep this
+compact representation; the `agent_id` of an agent must not be changed after construction.
+
+Graphs with very many nodes may instead be populated with flyweight agents: a single `FlyweightAgent` object drives
+the dynamics of many nodes, which are then plain integer indices. The mapping of flyweight agents to the nodes they
+drive is held in the graph attribute 'flyweights', as a dictionary of {agent: list of nodes}, and the simulation
+environment registers one `run_node` process per node.
+
+Agent classes whose dynamics are a fixed-interval update may instead be stepped as a batch: setting the class
+attribute `batch_interval` makes the simulation environment register a single process for all nodes of that class,
+which calls the class method `step_batch` with the list of nodes once per interval.
 """
 
 
+def _slot_names(cls):
+    """Names of the slots declared by the subclasses of BaseAgent in the MRO of a class, private names mangled"""
+    names = []
+    for klass in cls.__mro__:
+        if klass is BaseAgent or klass is object:
+            continue
+        slots = klass.__dict__.get('__slots__', ())
+        for name in ((slots,) if isinstance(slots, str) else slots):
+            if name in ('__dict__', '__weakref__'):
+                continue
+            if name.startswith('__') and not name.endswith('__'):
+                name = '_' + klass.__name__.lstrip('_') + name
+            names.append(name)
+    return names
+
+
 class BaseAgent(object):
     """
     Base class for all agents.
@@ -34,14 +63,57 @@ class BaseAgent(object):
     At this level of abstraction, we make no restriction on the states that the agent has access to
     both read and write.
     """
+    __slots__ = ('agent_id', '_hash')
+    batch_interval = None
+
     def __init__(self, agent_id):
         self.agent_id = agent_id
+        self._hash = hash((type(self), agent_id))
 
     def __hash__(self):
-        return hash(self.agent_id) ^ hash(str(self.__class__))
+        return self._hash
 
     def __eq__(self, other):
-        return isinstance(other, type(self)) and hash(self) == hash(other)
+        return self is other or (type(other) is type(self) and self.agent_id == other.agent_id)
+
+    def __getstate__(self):
+        # The cached hash is process-specific, so it is recomputed on unpickling rather than stored
+        slots = {name: getattr(self, name) for name in _slot_names(type(self)) if hasattr(self, name)}
+        return self.agent_id, getattr(self, '__dict__', None), slots
+
+    def __setstate__(self, state):
+        agent_id, attributes = state[:2]
+        BaseAgent.__init__(self, agent_id)
+        if attributes:
+            self.__dict__.update(attributes)
+        for name, value in (state[2] if len(state) > 2 else {}).items():
+            setattr(self, name, value)
+
+    def run(self, graph, env):
+        raise NotImplementedError
+
+    @classmethod
+    def step_batch(cls, nodes, graph, env):
+        """Computes one update of all the given nodes of this class. Used instead of `run` when `batch_interval` is
+        set.
+        """
+        raise NotImplementedError
+
+
+class FlyweightAgent(BaseAgent):
+    """
+    Base class for flyweight agents.
+
+    A single flyweight agent object drives the dynamics of many nodes, which are plain integer indices. Rather than
+    `run`, flyweight agents define `run_node`, which receives the node index whose dynamics it computes.
+    """
+    __slots__ = ()
+
+    def __init__(self, agent_id=0):
+        super().__init__(agent_id)
 
     def run(self, graph, env):
+        raise TypeError('Flyweight agents are run per node, with run_node')
+
+    def run_node(self, node, graph, env):
         raise NotImplementedError
@@ -0,0 +1,217 @@
+"""Aggregation module
+
+Online statistics of logged series across Monte Carlo replicates. Series are folded into running statistics one at a
+time, as each simulation run finishes, so summary curves over many replicates never require all trajectories to be held
+in memory at once.
+
+Grid points are grouped by the dimensions that are *not* aggregated over. For example, aggregating over `seed` a grid
+with dimensions `seed` and `beta` gives one group of statistics per value of `beta`.
+
+Quantile reservoirs select the series they retain at random. Each group draws from its own stream below the
+aggregator's `streams`, so that the retained series only depend on the seed and on the order of the runs within the
+group. A simulation case sets these streams from its own, when they are not given.
+"""
+import numpy as np
+from . import streams
+
+
+class RunningStats(object):
+    """Running count, mean, variance, minimum and maximum of series, per time-step
+
+    Uses Welford's algorithm, which is numerically stable and needs a single pass. Series of different lengths are
+    supported; each time-step keeps its own count.
+    """
+    def __init__(self):
+        self.count = np.zeros(0, dtype=int)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+
+    def _grow(self, length):
+        extra = length - len(self.count)
+        if extra <= 0:
+            return
+        self.count = np.concatenate((self.count, np.zeros(extra, dtype=int)))
+        self.mean = np.concatenate((self.mean, np.zeros(extra)))
+        self.m2 = np.concatenate((self.m2, np.zeros(extra)))
+        self.min = np.concatenate((self.min, np.full(extra, np.inf)))
+        self.max = np.concatenate((self.max, np.full(extra, -np.inf)))
+
+    def update(self, series):
+        """Fold a series into the running statistics
+
+        Args:
+            series: 1-D sequence of numbers, one per logged time-step
+        """
+        x = np.asarray(series, dtype=float).ravel()
+        n = len(x)
+        self._grow(n)
+
+        self.count[:n] += 1
+        delta = x - self.mean[:n]
+        self.mean[:n] += delta / self.count[:n]
+        self.m2[:n] += delta * (x - self.mean[:n])
+        np.minimum(self.min[:n], x, out=self.min[:n])
+        np.maximum(self.max[:n], x, out=self.max[:n])
+        return self
+
+    def variance(self, ddof=1):
+        """Per time-step variance. Time-steps with too few samples are NaN"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=1):
+        """Per time-step standard deviation"""
+        return np.sqrt(self.variance(ddof))
+
+    def confidence_interval(self, z=1.96):
+        """Per time-step normal-approximation confidence interval of the mean
+
+        Args:
+            z: number of standard errors either side of the mean
+
+        Returns:
+            Tuple of (lower, upper) arrays
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            half = z * self.std() / np.sqrt(self.count)
+        return self.mean - half, self.mean + half
+
+
+class ReservoirQuantiles(object):
+    """Streaming quantile sketch over whole series, using reservoir sampling
+
+    Keeps a uniform random sample of at most `size` series, so memory is bounded by `size` times the series length
+    regardless of how many series are folded in. Quantiles are computed per time-step over the retained sample.
+    """
+    def __init__(self, size=100, seed=None):
+        """Constructor
+
+        Args:
+            size: maximum number of series retained
+            seed: Integer seed, SeedSequence, or instance of NumPy's Generator or RandomState object, used to select
+                the retained series. If None, fresh entropy is used
+        """
+        self.size = size
+        self.seen = 0
+        self.reservoir = []
+        if isinstance(seed, (np.random.Generator, np.random.RandomState)):
+            self.__rng__ = seed
+        else:
+            self.__rng__ = np.random.default_rng(seed)
+
+    def update(self, series):
+        """Offer a series to the reservoir
+
+        Args:
+            series: 1-D sequence of numbers, one per logged time-step
+        """
+        x = np.asarray(series, dtype=float).ravel()
+        self.seen += 1
+        if len(self.reservoir) < self.size:
+            self.reservoir.append(x)
+        else:
+            try:
+                index = self.__rng__.integers(0, self.seen)
+            except AttributeError:
+                index = self.__rng__.randint(0, self.seen)
+            if index < self.size:
+                self.reservoir[index] = x
+        return self
+
+    def quantile(self, q):
+        """Per time-step quantiles of the retained series
+
+        Args:
+            q: quantile or sequence of quantiles, in [0, 1]
+
+        Returns:
+            Array of shape (len(q), length) or (length,) for a scalar q
+        """
+        if not self.reservoir:
+            return np.zeros((len(np.atleast_1d(q)), 0)) if np.ndim(q) else np.zeros(0)
+        length = max(len(x) for x in self.reservoir)
+        stack = np.full((len(self.reservoir), length), np.nan)
+        for ii, x in enumerate(self.reservoir):
+            stack[ii, :len(x)] = x
+        return np.nanquantile(stack, q, axis=0)
+
+
+class Aggregator(object):
+    """Folds the logged series of grid points into per-group running statistics
+
+    Grid points are grouped by the values of all dimensions except those listed in `over`.
+    """
+    def __init__(self, over=('seed',), statistic=None, reservoir_size=100, seed=None):
+        """Constructor
+
+        Args:
+            over: names of the grid dimensions to aggregate over
+            statistic: Callable transforming the logged data of one run into a 1-D series. Defaults to the data itself
+            reservoir_size: number of series retained per group for quantile estimates. Zero disables quantiles
+            seed: Integer root seed, SeedSequence or RandomStreams object of the quantile reservoirs. If None, the
+                streams are set by the simulation case, or drawn from fresh entropy when the first group is created
+        """
+        self.over = tuple(over)
+        self.statistic = statistic
+        self.reservoir_size = reservoir_size
+        self.streams = streams.RandomStreams(seed) if seed is not None else None
+        self.groups = {}
+
+    def key(self, point):
+        """Returns the hashable group key of a grid point"""
+        return tuple(sorted((k, v) for k, v in point.items() if k not in self.over))
+
+    def update(self, point, data):
+        """Fold the logged data of one grid point into the statistics of its group
+
+        Args:
+            point: (dict) grid point
+            data: logged data of the run, e.g. `BaseResults.data`
+        """
+        series = self.statistic(data) if self.statistic is not None else data
+        key = self.key(point)
+        try:
+            stats, quantiles = self.groups[key]
+        except KeyError:
+            quantiles = None
+            if self.reservoir_size:
+                if self.streams is None:
+                    self.streams = streams.RandomStreams()
+                quantiles = ReservoirQuantiles(self.reservoir_size, self.streams.generator('group', key))
+            stats, quantiles = self.groups[key] = (RunningStats(), quantiles)
+
+        stats.update(series)
+        if quantiles is not None:
+            quantiles.update(series)
+        return self
+
+    def summary(self, point, quantiles=(0.05, 0.5, 0.95)):
+        """Summary curves of the group containing the given grid point
+
+        Args:
+            point: (dict) grid point. Values of aggregated dimensions are ignored and may be omitted
+            quantiles: sequence of quantiles to estimate
+
+        Returns:
+            Dictionary with per time-step arrays 'count', 'mean', 'std', 'min', 'max' and, if quantiles are kept,
+            'quantiles' of shape (len(quantiles), length)
+        """
+        stats, sketch = self.groups[self.key(point)]
+        out = {
+            'count': stats.count,
+            'mean': stats.mean,
+            'std': stats.std(),
+            'min': stats.min,
+            'max': stats.max,
+        }
+        if sketch is not None:
+            out['quantiles'] = sketch.quantile(list(quantiles))
+        return out
+
+    def __iter__(self):
+        """Yields (group point, summary) pairs for every group"""
+        for key in self.groups:
+            point = dict(key)
+            yield point, self.summary(point)
@@ -6,30 +6,54 @@ specified randomly or deterministically distributed attributes or edges.
 The user-facing interface is defined by the `[Multi[Di]]GraphFactory` classes, but most of the work is done by the two
 list-builder classes: NodeListBuilder and EdgeListBuilder. These classes build lists of tuples that can be easily used
 to generate a graph using NetworkX's `add_node_from` and `add_edge_from` methods.
+
+For large graphs, the node list builder also provides a bulk path, `add_to`, which hands the sampled attribute arrays
+directly to the graph without first building the full list of tuples. Constant attributes are not expanded per node
+on this path, and node attributes may be specified per agent class.
+
+Edges sampled from a distribution may be built in parallel across a pool of processes. The node pair space is split
+into blocks of source nodes whose size does not depend on the number of workers, and each block draws from its own
+random stream, derived deterministically from the factory's RNG with NumPy's `SeedSequence`. The resulting graph is
+therefore the same whatever the number of workers.
+
+Geometric edges, connecting nodes within a radius of each other or to their k nearest neighbours, are built through a
+k-d tree over node coordinates, which are ordinary node attributes, e.g. sampled with `set_node_attribute`. This takes
+O(n log n) time rather than the O(n^2) of the all-pairs modes. SciPy's spatial module is only imported when used.
+
+Edge attributes are sampled once the edges are built, with one draw per edge actually built, and may also be computed
+from the attributes of the end nodes of all edges at once, on arrays, with `set_edge_attribute_from_nodes`.
+
+Graphs saved with the `graphio` module, e.g. built once for a whole sweep, are loaded by `FileGraphFactory`.
+
+Distribution specifications are resolved into samplers by the `distributions` module, which is also where custom
+samplers are registered.
 """
+import os
 import itertools
+from concurrent import futures
 import networkx as nx
+import numpy as np
 from numpy import random
-from scipy import stats
-from . import agents
+from . import agents, distributions, graphio, streams
+from .utils import node_dict
 
 
 class BaseListBuilder(object):
     """Base class for the node and edge list builders used in GraphFactory classes"""
     __rng__ = None
-    __attr_dic__ = {}
     size = 0
 
     def __init__(self, rng=None):
         """Constructor
 
         Args:
-            rng: Instance of NumPy's RandomState object
+            rng: Instance of NumPy's RandomState or Generator object
 
         Returns:
             ListBuilder object
         """
         self.__rng__ = rng
+        self.__attr_dic__ = {}
 
     def add(self, **kwargs):
         """Add attribute name/value pairs to the attribute dictionary
@@ -41,26 +65,6 @@ class BaseListBuilder(object):
         for name, value in kwargs.items():
             self.__attr_dic__[name] = self._parse_args(value)
 
-    def _parse_distribution(self, dist):
-        """Parses a given distribution input into a callable with the given seed
-
-        Args:
-            dist: Callable of scipy.stats, or numpy.random, or a string of either
-
-        Returns:
-            Callable distribution function with the given seeded RNG self.__rng__
-        """
-        try:
-            dist.random_state = self.__rng__
-            dist = dist.rvs
-        except AttributeError:
-            try:
-                dist = getattr(self.__rng__, dist.__name__)
-            except AttributeError:
-                dist = getattr(stats, dist, getattr(self.__rng__, dist))
-                dist = self._parse_distribution(dist)
-        return dist
-
     def _parse_args(self, arg):
         """Parse the arguments given to .add()
 
@@ -68,14 +72,33 @@ class BaseListBuilder(object):
             arg: treated as distribution specification if a tuple
 
         Returns:
-            If input is a tuple, returns the same 3-tuple with the first element replaced with the appropriate callable.
+            If input is a tuple, returns the distributions.Sampler object it resolves to, bound to self.__rng__.
             Otherwise, leaves the input unchanged
         """
         if isinstance(arg, tuple):
-            dist = self._parse_distribution(arg[0])
-            arg = (dist, arg[1], arg[2]) if len(arg) > 2 else (dist, arg[1], {})
+            arg = distributions.make_sampler(arg, self.__rng__)
         return arg
 
+    @staticmethod
+    def _sample(attr_dic, size):
+        """Samples the attributes of the given attribute dictionary
+
+        Args:
+            attr_dic: Dictionary of parsed attributes, as built by .add()
+            size: Number of samples to draw for each distributed attribute
+
+        Returns:
+            Tuple of dictionaries (constants, samples), holding the constant attribute values and the arrays of sampled
+            attribute values respectively
+        """
+        constants, samples = {}, {}
+        for name, value in attr_dic.items():
+            if isinstance(value, distributions.Sampler):
+                samples[name] = value(size)
+            else:
+                constants[name] = value
+        return constants, samples
+
     def _build_list(self, list_attr, graph):
         """Specific implementation of the list building method
         Takes as inputs the list of sampled or constant attributes as well as the full graph
@@ -98,12 +121,9 @@ class BaseListBuilder(object):
         Returns:
             Iterable object
         """
-        samples = {}
-        for name, value in self.__attr_dic__.items():
-            try:
-                samples[name] = value[0](*value[1], size=self.size, **value[2])
-            except (IndexError, TypeError):
-                samples[name] = [value] * self.size
+        constants, samples = self._sample(self.__attr_dic__, self.size)
+        for name, value in constants.items():
+            samples[name] = [value] * self.size
 
         list_attr = list(map(dict, zip(*[[(k, v) for v in val] for (k, val) in samples.items()])))
 
@@ -114,27 +134,211 @@ class NodeListBuilder(BaseListBuilder):
     """Defines the specific implementation of the list builder for (node, attributes) tuple list"""
     agent = None
 
-    def _build_list(self, list_attr, graph):
-        if callable(self.agent):
-            if len(list_attr) > 0:
-                return [(self.agent(ii), list_attr[ii]) for ii in range(0, self.size)]
-            else:
-                return [self.agent(ii) for ii in range(0, self.size)]
+    def __init__(self, rng=None):
+        super().__init__(rng=rng)
+        self.__class_attr_dic__ = {}
+        self.agent_mix = None
+
+    def add_for(self, agent_type, **kwargs):
+        """Add attribute name/value pairs applying only to the nodes of the given agent class
+
+        Args:
+            agent_type: Agent class of the nodes receiving the attributes
+            kwargs: name/value pairs of arguments to parse, as for .add()
+        """
+        attr_dic = self.__class_attr_dic__.setdefault(agent_type, {})
+        for name, value in kwargs.items():
+            attr_dic[name] = self._parse_args(value)
+
+    def _groups(self):
+        """Partition of the nodes by agent class
+
+        Returns:
+            List of (agent class, array of node indices) tuples
+        """
+        if self.agent_mix is None:
+            return [(self.agent, np.arange(0, self.size))]
+
+        mix = self.agent_mix
+        agent_types = mix['agents']
+        if mix['spec'] is not None:
+            # class of each node drawn from a distribution of indices into the list of agent classes
+            codes = np.asarray(mix['spec'](self.size), dtype=int)
+            if codes.size and (codes.min() < 0 or codes.max() >= len(agent_types)):
+                raise ValueError('Agent class distribution sampled indices outside of the list of agent classes')
+        elif mix['sample']:
+            # class of each node drawn independently with the given probabilities
+            codes = self.__rng__.choice(len(agent_types), size=self.size, p=mix['proportions'])
         else:
-            if len(list_attr) > 0:
-                return [(ii, list_attr[ii]) for ii in range(0, self.size)]
+            codes = np.repeat(np.arange(0, len(agent_types)), self._counts(mix['proportions']))
+
+        return [(agent, np.flatnonzero(codes == ii)) for (ii, agent) in enumerate(agent_types)]
+
+    def _counts(self, proportions):
+        """Exact number of nodes of each agent class, rounding the proportions by largest remainder"""
+        quotas = proportions * self.size
+        counts = np.floor(quotas).astype(int)
+        remainder = self.size - counts.sum()
+        counts[np.argsort(counts - quotas, kind='stable')[:remainder]] += 1
+        return counts
+
+    def set_mix(self, proportions, sample=False):
+        """Populate the nodes with several agent classes in the given proportions
+
+        Args:
+            proportions: Dictionary of {agent class: proportion}. Proportions are normalised to sum to one
+            sample: If False, node counts are the proportions rounded to exact numbers, and node indices are assigned
+                to the agent classes in contiguous blocks. If True, the class of each node is drawn independently
+        """
+        agent_types = list(proportions.keys())
+        weights = np.asarray(list(proportions.values()), dtype=float)
+        if weights.min() < 0 or weights.sum() <= 0:
+            raise ValueError('Agent class proportions must be non-negative and not all zero')
+        weights = weights / weights.sum()
+        if sample and self.__rng__ is None:
+            raise TypeError('Sampling agent classes requires an RNG')
+        self.agent_mix = {'agents': agent_types, 'proportions': weights, 'sample': sample, 'spec': None}
+
+    def set_mix_by_distribution(self, agent_types, spec):
+        """Populate the nodes with several agent classes, drawing the class of each node from a distribution
+
+        Args:
+            agent_types: List of agent classes
+            spec: distribution specification tuple, of the same form as for add(), whose samples are indices into
+                agent_types
+        """
+        self.agent_mix = {'agents': list(agent_types), 'proportions': None, 'sample': True,
+                          'spec': self._parse_args(spec)}
+
+    def _make_nodes(self, agent, indices, graph):
+        """Creates the node objects of the given agent class for the given indices"""
+        indices = indices.tolist()
+        if isinstance(agent, type) and issubclass(agent, agents.FlyweightAgent):
+            # a single flyweight agent drives all nodes, which are plain indices
+            graph.graph.setdefault('flyweights', {})[agent()] = indices
+            return indices
+        if callable(agent):
+            return list(map(agent, indices))
+        return indices
+
+    def add_to(self, graph):
+        """Bulk build method: samples the node attributes and adds the nodes directly to the graph
+
+        Sampled attribute arrays are converted to lists of Python scalars and zipped into the node attribute
+        dictionaries as the graph consumes them; constant attributes are passed to the graph once.
+
+        Args:
+            graph: Full NetworkX graph object
+
+        Returns:
+            The graph object
+        """
+        constants, columns = self._sample(self.__attr_dic__, self.size)
+
+        groups = self._groups()
+        for agent, indices in groups:
+            nodes = self._make_nodes(agent, indices, graph)
+
+            group_constants = dict(constants)
+            if len(groups) > 1:
+                group_columns = {name: np.asarray(col)[indices] for (name, col) in columns.items()}
             else:
-                return list(range(0, self.size))
+                group_columns = dict(columns)
+            if agent in self.__class_attr_dic__:
+                extra_constants, extra_columns = self._sample(self.__class_attr_dic__[agent], len(indices))
+                group_constants.update(extra_constants)
+                for name in extra_columns:
+                    group_constants.pop(name, None)
+                group_columns.update(extra_columns)
+            for name in group_constants:
+                group_columns.pop(name, None)
+
+            if group_columns:
+                names = tuple(group_columns)
+                rows = zip(*[np.asarray(col).tolist() for col in group_columns.values()])
+                graph.add_nodes_from(zip(nodes, (dict(zip(names, row)) for row in rows)), **group_constants)
+            else:
+                graph.add_nodes_from(nodes, **group_constants)
+
+        return graph
+
+    def _build_list(self, list_attr, graph):
+        nodes = []
+        for agent, indices in self._groups():
+            nodes += self._make_nodes(agent, indices, graph)
+
+        if len(list_attr) > 0:
+            return [(node, list_attr[ii]) for (ii, node) in enumerate(nodes)]
+        else:
+            return nodes
+
+
+DEFAULT_BLOCK_SIZE = 2 ** 20  # number of node pairs sampled per block in parallel builds
+
+
+def _sample_edge_block(task):
+    """Samples the edges of one block of source nodes. Runs in a worker process.
+
+    Args:
+        task: tuple of (seed sequence, unbound sampler, threshold, first row, last row, number of nodes, whether to
+            sample with a Generator rather than a RandomState)
+
+    Returns:
+        Tuple of arrays (source indices, target indices) of the sampled edges
+    """
+    seed, sampler, thd, start, stop, num_nodes, generator = task
+    rng = random.Generator(random.PCG64(seed)) if generator else random.RandomState(random.PCG64(seed))
+    samples = sampler.bind(rng)((stop - start) * num_nodes)
+    flat = np.flatnonzero(np.asarray(samples) > thd)
+    return flat // num_nodes + start, flat % num_nodes
+
+
+def _node_columns(nodes, graph):
+    """Arrays of the attributes set on every node, in the order of the given nodes
+
+    Args:
+        nodes: list of the graph's nodes
+        graph: Full NetworkX graph object
+
+    Returns:
+        Dictionary of {attribute name: array}
+    """
+    data = node_dict(graph)
+    if not nodes:
+        return {}
+    names = set(data[nodes[0]]).intersection(*[data[node].keys() for node in nodes[1:]])
+    return {name: np.asarray([data[node][name] for node in nodes]) for name in names}
+
+
+def _canonical_pairs(sources, targets, num_nodes, directed):
+    """Sorted unique pairs. On undirected graphs, pairs are oriented from the lower to the higher index first"""
+    if not directed:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    num_nodes = max(1, num_nodes)
+    keys = np.unique(sources.astype(np.int64) * num_nodes + targets)
+    return keys // num_nodes, keys % num_nodes
 
 
 class EdgeListBuilder(BaseListBuilder):
     """Defines the specific implementation of the list builder for (edge, attributes) tuple list"""
-    __edge_dic__ = {}
     __thd__ = 0
     callback = None
 
     def __init__(self, rng=None):
         super().__init__(rng=rng)
+        self.workers = 0
+        self.block_size = DEFAULT_BLOCK_SIZE
+        self.__edge_dic__ = {}
+        self.__spatial__ = None
+        self.__node_attr_dic__ = {}
+        self.array_callback = None
+
+    def _clear_modes(self):
+        """Unsets the edge building mode, before another is set"""
+        self.__edge_dic__.pop('edges', None)
+        self.__spatial__ = None
+        self.array_callback = None
+        self.callback = None
 
     def from_dist(self, spec, thd):
         """Sets the distribution from which the edge list will be built
@@ -143,26 +347,266 @@ class EdgeListBuilder(BaseListBuilder):
             spec: distribution specification tuple. Same form as for add() method
             thd: threshold above which the edge will be added
         """
-        self.__edge_dic__['edges'] = self._parse_args(spec)
+        sampler = self._parse_args(spec)
+        self._clear_modes()
+        self.__edge_dic__['edges'] = sampler
         self.__thd__ = thd
-        self.callback = None
 
-    def _build_list(self, list_attr, graph):
-        list_edge = []
-        nodes = graph.nodes()
+    def from_callback(self, callback):
+        """Sets the callable deciding, for every ordered pair of nodes, whether the edge is added
+
+        Args:
+            callback: Callable with the signature (nodeA, nodeB, graph, rng), returning a boolean
+        """
+        self._clear_modes()
+        self.callback = callback
+
+    def from_array_callback(self, callback):
+        """Sets the callable deciding which edges are added, for arrays of candidate pairs at a time
+
+        Candidates are all ordered pairs of nodes, passed in blocks of at most self.block_size pairs.
+
+        Args:
+            callback: Callable with the signature (sources, targets, columns, rng), where sources and targets are arrays
+                of the indices of the nodes of the candidate pairs, in the order of graph.nodes(), and columns is a
+                dictionary of {attribute name: array} of the attributes set on every node, in the same order. Returns
+                a boolean array, true for the pairs whose edge is added
+        """
+        self._clear_modes()
+        self.array_callback = callback
+
+    def from_radius(self, radius, coords, p=2, callback=None):
+        """Sets edges between all nodes within the given distance of each other
+
+        Args:
+            radius: maximum distance between connected nodes
+            coords: names of the node attributes holding the coordinates of the nodes
+            p: order of the Minkowski distance, e.g. 1 for Manhattan distance or 2 for Euclidean distance
+            callback: optional callable of the same form as for from_array_callback(), filtering the candidate pairs
+        """
+        self._clear_modes()
+        self.__spatial__ = {'mode': 'radius', 'value': radius, 'coords': tuple(coords), 'p': p, 'callback': callback}
+
+    def from_nearest_neighbours(self, k, coords, p=2, callback=None):
+        """Sets edges from every node to its k nearest neighbours. On undirected graphs, a node may therefore have more
+        than k neighbours
+
+        Args:
+            k: number of neighbours of each node
+            coords: names of the node attributes holding the coordinates of the nodes
+            p: order of the Minkowski distance, e.g. 1 for Manhattan distance or 2 for Euclidean distance
+            callback: optional callable of the same form as for from_array_callback(), filtering the candidate pairs
+        """
+        self._clear_modes()
+        self.__spatial__ = {'mode': 'knn', 'value': int(k), 'coords': tuple(coords), 'p': p, 'callback': callback}
+
+    def _spatial_pairs(self, columns, directed):
+        """Finds the candidate pairs of the geometric edge modes with a k-d tree
+
+        Args:
+            columns: dictionary of {attribute name: array} of the node attributes, in node order
+            directed: whether the graph is directed
+
+        Returns:
+            Tuple of arrays (source indices, target indices), sorted and without duplicates
+        """
+        from scipy import spatial  # imported on first use, as it is slow to import
+
+        spec = self.__spatial__
+        try:
+            points = np.column_stack([np.asarray(columns[name], dtype=float) for name in spec['coords']])
+        except KeyError as e:
+            raise ValueError('Coordinate attribute {} is not set on every node'.format(e))
+        num_nodes = len(points)
+        tree = spatial.cKDTree(points)
+
+        if spec['mode'] == 'radius':
+            pairs = tree.query_pairs(spec['value'], p=spec['p'], output_type='ndarray')
+            sources, targets = pairs[:, 0], pairs[:, 1]
+            if directed:
+                sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+        else:
+            k = min(spec['value'], num_nodes - 1)
+            if k <= 0:
+                return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+            _, neighbours = tree.query(points, k=k + 1, p=spec['p'])
+            # each node is normally its own nearest neighbour, but not necessarily when coordinates coincide
+            others = neighbours != np.arange(0, num_nodes)[:, None]
+            first = np.argsort(~others, axis=1, kind='stable')[:, :k]
+            sources = np.repeat(np.arange(0, num_nodes), k)
+            targets = np.take_along_axis(neighbours, first, axis=1).ravel()
+
+        return _canonical_pairs(sources, targets, num_nodes, directed)
+
+    def _array_callback_pairs(self, num_nodes, columns):
+        """Applies the array callback to all ordered pairs of nodes, in blocks of source nodes
+
+        Returns:
+            Tuple of arrays (source indices, target indices) of the accepted pairs, in row-major order
+        """
+        rows = max(1, self.block_size // max(1, num_nodes))
+        all_sources, all_targets = [], []
+        for start in range(0, num_nodes, rows):
+            stop = min(start + rows, num_nodes)
+            sources = np.repeat(np.arange(start, stop), num_nodes)
+            targets = np.tile(np.arange(0, num_nodes), stop - start)
+            mask = np.asarray(self.array_callback(sources, targets, columns, self.__rng__), dtype=bool)
+            all_sources.append(sources[mask])
+            all_targets.append(targets[mask])
+        if not all_sources:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate(all_sources), np.concatenate(all_targets)
+
+    def _sample_edges_parallel(self, num_nodes):
+        """Samples the edges from the distribution in blocks of source nodes, across a pool of worker processes
+
+        Args:
+            num_nodes: number of nodes in the graph
+
+        Returns:
+            Tuple of arrays (source indices, target indices) of the sampled edges, in row-major order
+        """
+        if self.__rng__ is None:
+            raise TypeError('Parallel edge sampling requires an RNG')
+        rows = max(1, self.block_size // max(1, num_nodes))
+        bounds = [(start, min(start + rows, num_nodes)) for start in range(0, num_nodes, rows)]
+        seeds = streams.seed_sequence_from(self.__rng__).spawn(len(bounds))
+        sampler = self.__edge_dic__['edges'].bind(None)  # each block binds it to its own RNG, of the same type
+        generator = isinstance(self.__rng__, random.Generator)
+        tasks = [(seed, sampler, self.__thd__, start, stop, num_nodes, generator)
+                 for (seed, (start, stop)) in zip(seeds, bounds)]
+
+        if self.workers == 1:
+            blocks = list(map(_sample_edge_block, tasks))
+        else:
+            with futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+                blocks = list(pool.map(_sample_edge_block, tasks))
+
+        if not blocks:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate([b[0] for b in blocks]), np.concatenate([b[1] for b in blocks])
+
+    def add_from_nodes(self, **kwargs):
+        """Add edge attributes computed from the attributes of the nodes at both ends, for all edges at once
+
+        Args:
+            kwargs: name/callable pairs. Callables have the same signature (sources, targets, columns, rng) as for
+                from_array_callback(), with sources and targets the indices of the end nodes of the built edges, and
+                return an array holding the attribute value of every edge. They take precedence over attributes of the
+                same name set with .add()
+        """
+        for name, value in kwargs.items():
+            if not callable(value):
+                raise TypeError('Edge attribute {} must be computed by a callable'.format(name))
+            self.__node_attr_dic__[name] = value
+
+    def _pairs(self, nodes, graph):
+        """Builds the edges, as pairs of indices into the list of nodes, and applies the edge limit
+
+        Args:
+            nodes: list of the graph's nodes
+            graph: Full NetworkX graph object
+
+        Returns:
+            Tuple of arrays (source indices, target indices), and the dictionary of node attribute arrays if built
+        """
+        columns = None
+        num_nodes = len(nodes)
         if callable(self.callback):
-            for pair in itertools.product(nodes, nodes):
-                if self.callback(pair[0], pair[1], graph, self.__rng__):
-                    list_edge.append(pair)
+            pairs = [(ii, jj) for (ii, jj) in itertools.product(range(0, num_nodes), repeat=2)
+                     if self.callback(nodes[ii], nodes[jj], graph, self.__rng__)]
+            sources = np.array([ii for (ii, _) in pairs], dtype=int)
+            targets = np.array([jj for (_, jj) in pairs], dtype=int)
+        elif self.__spatial__ is not None or callable(self.array_callback):
+            columns = _node_columns(nodes, graph)
+            if self.__spatial__ is not None:
+                sources, targets = self._spatial_pairs(columns, graph.is_directed())
+                callback = self.__spatial__['callback']
+                if callback is not None:
+                    mask = np.asarray(callback(sources, targets, columns, self.__rng__), dtype=bool)
+                    sources, targets = sources[mask], targets[mask]
+            else:
+                sources, targets = self._array_callback_pairs(num_nodes, columns)
+        elif 'edges' not in self.__edge_dic__:
+            sources, targets = np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        elif self.workers:
+            sources, targets = self._sample_edges_parallel(num_nodes)
         else:
-            vals = self.__edge_dic__['edges']
-            samples = vals[0](*vals[1], size=graph.number_of_nodes()**2, **vals[2])
-            for pair, sample in zip(itertools.product(nodes, nodes), samples):
-                if sample > self.__thd__:
-                    list_edge.append(pair)
+            samples = self.__edge_dic__['edges'](num_nodes ** 2)
+            flat = np.flatnonzero(np.asarray(samples) > self.__thd__)
+            sources, targets = flat // max(1, num_nodes), flat % max(1, num_nodes)
+
+        if not graph.is_directed() and not graph.is_multigraph():
+            # each edge once, without self-loops, so that attributes are sampled and the limit applied per edge built
+            keep = sources != targets
+            sources, targets = _canonical_pairs(sources[keep], targets[keep], num_nodes, False)
+
+        if self.size:
+            sources, targets = sources[:self.size], targets[:self.size]
+        return sources, targets, columns
+
+    def _edges(self, graph):
+        """Builds the edges, then samples or computes their attributes for the number of edges actually built
+
+        Args:
+            graph: Full NetworkX graph object
+
+        Returns:
+            Tuple of (list of source nodes, list of target nodes, dictionary of constant attributes, dictionary of
+            {attribute name: array} of the other attributes)
+        """
+        nodes = list(graph.nodes())
+        sources, targets, columns = self._pairs(nodes, graph)
+        num_edges = len(sources)
+
+        constants, samples = self._sample(self.__attr_dic__, num_edges)
+        if self.__node_attr_dic__:
+            if columns is None:
+                columns = _node_columns(nodes, graph)
+            for name, function in self.__node_attr_dic__.items():
+                values = np.asarray(function(sources, targets, columns, self.__rng__))
+                if values.shape[:1] != (num_edges,):
+                    raise ValueError('Edge attribute {} has {} values for {} edges'.format(
+                        name, values.shape[0] if values.ndim else 1, num_edges))
+                constants.pop(name, None)
+                samples[name] = values
+
+        return ([nodes[ii] for ii in sources.tolist()], [nodes[jj] for jj in targets.tolist()], constants, samples)
+
+    def build(self, graph):
+        """Builds the list of (source node, target node, attributes) edge tuples
+
+        Args:
+            graph: Full NetworkX graph object
+
+        Returns:
+            List of tuples
+        """
+        sources, targets, constants, samples = self._edges(graph)
+        names = tuple(samples)
+        rows = zip(*[np.asarray(col).tolist() for col in samples.values()]) if names else itertools.repeat(())
+        return [(u, v, dict(constants, **dict(zip(names, row)))) for (u, v, row) in zip(sources, targets, rows)]
+
+    def add_to(self, graph):
+        """Bulk build method: builds the edges and their attributes and adds them directly to the graph
+
+        Attribute arrays are converted to lists of Python scalars and zipped into the edge attribute dictionaries as the
+        graph consumes them; constant attributes are passed to the graph once.
+
+        Args:
+            graph: Full NetworkX graph object
 
-        list_edge = [(pair[0], pair[1], dic) for pair, dic in zip(list_edge, list_attr)]
-        return list_edge[:self.size] if self.size else list_edge
+        Returns:
+            The graph object
+        """
+        sources, targets, constants, samples = self._edges(graph)
+        if samples:
+            names = tuple(samples)
+            rows = zip(*[np.asarray(col).tolist() for col in samples.values()])
+            graph.add_edges_from(zip(sources, targets, (dict(zip(names, row)) for row in rows)), **constants)
+        else:
+            graph.add_edges_from(zip(sources, targets), **constants)
+        return graph
 
 
 class BaseGraphFactory(object):
@@ -170,7 +614,7 @@ class BaseGraphFactory(object):
     Fully specifies functionality; concrete implementations only specify which NetworkX graph object to instantiate.
     """
     def __init__(self, rng=None):
-        if rng is not None and not isinstance(rng, random.RandomState):
+        if rng is not None and not isinstance(rng, (random.RandomState, random.Generator)):
             raise TypeError
         self.__nbuilder__ = NodeListBuilder(rng)
         self.__ebuilder__ = EdgeListBuilder(rng)
@@ -183,13 +627,11 @@ class BaseGraphFactory(object):
         """
         graph = self.init_graph()
 
-        # build list of (node, attrdict) node tuples
-        list_nodes = self.__nbuilder__.build(graph)
-        graph.add_nodes_from(list_nodes)
+        # add nodes and their sampled attributes in bulk
+        self.__nbuilder__.add_to(graph)
 
-        # build list of (nodeFrom, nodeTo, attrdict) edge tuples
-        list_edges = self.__ebuilder__.build(graph)
-        graph.add_edges_from(list_edges)
+        # build the edges, then their attributes for the number of edges built, and add them in bulk
+        self.__ebuilder__.add_to(graph)
 
         return graph
 
@@ -209,20 +651,58 @@ class BaseGraphFactory(object):
         if not issubclass(agent_type, agents.BaseAgent):
             raise TypeError
         self.__nbuilder__.agent = agent_type
+        self.__nbuilder__.agent_mix = None
+
+    def set_agents(self, proportions, sample=False):
+        """Specify several agent classes to populate the graph nodes, as a dictionary of {agent class: proportion}.
+        By default the node counts of each class are exact; if sample is True, the class of each node is instead drawn
+        independently with the given probabilities
+        """
+        if not all(issubclass(agent_type, agents.BaseAgent) for agent_type in proportions):
+            raise TypeError
+        self.__nbuilder__.set_mix(proportions, sample=sample)
+
+    def set_agents_by_distribution(self, agent_types, arg_tuple):
+        """Specify several agent classes to populate the graph nodes, drawing the class of each node from the
+        distribution specification arg_tuple, whose samples are indices into the list agent_types
+        """
+        if not all(issubclass(agent_type, agents.BaseAgent) for agent_type in agent_types):
+            raise TypeError
+        if not isinstance(arg_tuple, tuple):
+            raise TypeError
+        self.__nbuilder__.set_mix_by_distribution(agent_types, arg_tuple)
 
     def set_node_attribute(self, **kwargs):
         """Set node attributes as keyword arguments.
         Tuples are interpreted as random distribution specifications, with the form (dist, args, kwargs), where dist is
-        a method of numpy.random or scipy.stats, or a string of the name of either. Non-tuples are left unmodified.
+        a method of numpy.random or scipy.stats, or a string of the name of either or of a sampler registered with
+        distributions.register. Non-tuples are left unmodified.
         """
         self.__nbuilder__.add(**kwargs)
 
+    def set_node_attribute_for(self, agent_type, **kwargs):
+        """Set node attributes applying only to the nodes of the given agent class.
+        Arguments are interpreted in the same way as in .set_node_attribute, and take precedence over them
+        """
+        if not issubclass(agent_type, agents.BaseAgent):
+            raise TypeError
+        self.__nbuilder__.add_for(agent_type, **kwargs)
+
     def set_edge_attribute(self, **kwargs):
         """Set edge attributes as keyword arguments.
         Arguments are interpreted in the same way as in .set_node_attribute
         """
         self.__ebuilder__.add(**kwargs)
 
+    def set_edge_attribute_from_nodes(self, **kwargs):
+        """Set edge attributes computed from the attributes of both end nodes, as keyword arguments.
+        Values must be callables with the signature (sources, targets, columns, rng), where sources and targets are
+        arrays of the indices of the end nodes of all edges, in the order of graph.nodes(), and columns is a dictionary
+        of {attribute name: array} of the node attributes in the same order. They must return an array of the attribute
+        values of all edges, e.g. `lambda s, t, columns, rng: columns['vulnerable'][s] * columns['vulnerable'][t]`
+        """
+        self.__ebuilder__.add_from_nodes(**kwargs)
+
     def set_edge_by_distribution(self, arg_tuple, threshold):
         """Set the distribution according to which edges should be added.
         The arg_tuple must be a distribution specification (dist, args, kwargs) and the threshold is the value above
@@ -232,6 +712,14 @@ class BaseGraphFactory(object):
             raise TypeError
         self.__ebuilder__.from_dist(arg_tuple, threshold)
 
+    def set_parallel(self, workers=None, block_size=DEFAULT_BLOCK_SIZE):
+        """Build the edges sampled from a distribution in parallel, with the given number of worker processes (all
+        cores if None). The block_size is the number of node pairs sampled per task. Results depend on the RNG and the
+        block size, but not on the number of workers. Edges set by callback are always built serially.
+        """
+        self.__ebuilder__.workers = workers if workers is not None else os.cpu_count()
+        self.__ebuilder__.block_size = block_size
+
     def set_edge_by_callback(self, cb):
         """Set the edges based on the given callable.
         The callable must have the signature (nodeA, nodeB, graph, rng) and return a boolean indicating whether or not
@@ -239,7 +727,41 @@ class BaseGraphFactory(object):
         """
         if not callable(cb):
             raise TypeError
-        self.__ebuilder__.callback = cb
+        self.__ebuilder__.from_callback(cb)
+
+    def set_edge_by_array_callback(self, cb):
+        """Set the edges based on the given vectorised callable, which decides for arrays of candidate pairs at once.
+        The callable must have the signature (sources, targets, columns, rng), where sources and targets are arrays of
+        node indices, in the order of graph.nodes(), and columns is a dictionary of {attribute name: array} of the node
+        attributes in the same order. It must return a boolean array indicating which edges should be added
+        """
+        if not callable(cb):
+            raise TypeError
+        self.__ebuilder__.from_array_callback(cb)
+
+    def set_edge_by_radius(self, radius, coords=('x', 'y'), p=2, callback=None):
+        """Set edges between all nodes within the given distance of each other.
+        Node coordinates are read from the node attributes named in coords, e.g. sampled with .set_node_attribute.
+        The distance is the Minkowski p-norm. The optional callback, of the same form as for
+        .set_edge_by_array_callback, filters the candidate pairs
+        """
+        if radius < 0:
+            raise ValueError('Radius must be non-negative')
+        if callback is not None and not callable(callback):
+            raise TypeError
+        self.__ebuilder__.from_radius(radius, coords, p=p, callback=callback)
+
+    def set_edge_by_nearest_neighbours(self, k, coords=('x', 'y'), p=2, callback=None):
+        """Set edges from every node to its k nearest neighbours.
+        Node coordinates are read from the node attributes named in coords, e.g. sampled with .set_node_attribute.
+        The distance is the Minkowski p-norm. The optional callback, of the same form as for
+        .set_edge_by_array_callback, filters the candidate pairs
+        """
+        if k < 0:
+            raise ValueError('Number of neighbours must be non-negative')
+        if callback is not None and not callable(callback):
+            raise TypeError
+        self.__ebuilder__.from_nearest_neighbours(k, coords, p=p, callback=callback)
 
 
 class GraphFactory(BaseGraphFactory):
@@ -260,3 +782,20 @@ class MultiGraphFactory(BaseGraphFactory):
 class MultiDiGraphFactory(BaseGraphFactory):
     def init_graph(self):
         return nx.MultiDiGraph()
+
+
+class FileGraphFactory(object):
+    """Graph factory loading a graph saved with `graphio.save`, e.g. built once by another factory and reused across
+    the grid points of a sweep
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap = mmap
+
+    def build(self):
+        """Load the saved graph
+
+        Returns:
+            NetworkX graph object
+        """
+        return graphio.read_graph(self.path, mmap=self.mmap)
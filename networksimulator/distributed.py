@@ -0,0 +1,245 @@
+"""Distributed module
+
+Runs the grid points of a simulation case across any number of worker processes, on one or several machines, through
+a work queue held in an SQLite database on a shared filesystem.
+
+A coordinator enqueues the grid points by their index into the grid (see `BaseGrid.point`). Workers lease points one
+at a time, run them and acknowledge them. While a point runs, its worker renews the lease with periodic heartbeats; if
+a worker crashes, its lease expires and the point is leased again by another worker, up to a maximum number of
+attempts. Each worker builds its own simulation case, whose `_prepare_grid` must therefore be deterministic.
+
+For example, with a simulation case class `Case` taking no constructor arguments:
+```
+queue = distributed.WorkQueue('/shared/sweep.sqlite')
+distributed.enqueue_grid(queue, Case()._prepare_grid())
+distributed.run_local(queue.path, Case, workers=8)
+```
+or, on each machine, `distributed.Worker(distributed.WorkQueue('/shared/sweep.sqlite'), Case()).run()`.
+
+SQLite relies on the file locking of the filesystem, which some network filesystems do not implement reliably.
+"""
+import os
+import time
+import socket
+import threading
+import multiprocessing
+from .utils import sqlite_transaction
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue(object):
+    """Queue of grid point indices, with leases, heartbeats and retries, backed by an SQLite database
+
+    Arguments:
+        path : (string) : Path of the SQLite database file, created if needed
+        lease_time : (float) [optional] : Seconds a lease lasts without heartbeat
+        max_attempts : (int) [optional] : Number of times a point is leased before it is marked as failed
+        timeout : (float) [optional] : Seconds to wait for the database lock
+    """
+
+    def __init__(self, path, lease_time=60, max_attempts=3, timeout=30):
+        self.path = path
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS points ('
+                'idx INTEGER PRIMARY KEY, status TEXT NOT NULL, worker TEXT, lease_expires REAL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, error TEXT)'
+            )
+
+    def _connect(self, write=True):
+        """Opens a connection for a single transaction, see `utils.sqlite_transaction`"""
+        return sqlite_transaction(self.path, self.timeout, write=write)
+
+    def enqueue(self, indices):
+        """Adds grid point indices to the queue. Indices already queued are left unchanged"""
+        with self._connect() as db:
+            db.executemany('INSERT OR IGNORE INTO points (idx, status) VALUES (?, ?)',
+                           [(int(idx), PENDING) for idx in indices])
+        return self
+
+    def lease(self, worker):
+        """Leases the next pending point, or a point whose lease has expired
+
+        Args:
+            worker: (string) identifier of the worker
+
+        Returns:
+            Index of the leased point, or None if no point is available
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'UPDATE points SET status = ?, error = ? WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+                (FAILED, 'lease expired', LEASED, now, self.max_attempts)
+            )
+            row = db.execute(
+                'SELECT idx FROM points WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY idx LIMIT 1',
+                (PENDING, LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                'UPDATE points SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE idx = ?',
+                (LEASED, worker, now + self.lease_time, row[0])
+            )
+        return row[0]
+
+    def heartbeat(self, idx, worker):
+        """Renews the lease of a point
+
+        Returns:
+            False if the worker no longer holds the lease
+        """
+        with self._connect() as db:
+            cursor = db.execute(
+                'UPDATE points SET lease_expires = ? WHERE idx = ? AND worker = ? AND status = ?',
+                (time.time() + self.lease_time, idx, worker, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, idx, worker):
+        """Marks a leased point as done, and clears the error of any previous attempt
+
+        Returns:
+            False if the worker no longer held the lease
+        """
+        with self._connect() as db:
+            cursor = db.execute(
+                'UPDATE points SET status = ?, error = NULL WHERE idx = ? AND worker = ? AND status = ?',
+                (DONE, idx, worker, LEASED)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, idx, worker, error=None):
+        """Returns a leased point to the queue after an error, or marks it as failed after the last attempt"""
+        with self._connect() as db:
+            db.execute(
+                'UPDATE points SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ? '
+                'WHERE idx = ? AND worker = ? AND status = ?',
+                (self.max_attempts, PENDING, FAILED, error, idx, worker, LEASED)
+            )
+
+    def counts(self):
+        """Returns the number of points in each status, as a dictionary"""
+        with self._connect(write=False) as db:
+            rows = db.execute('SELECT status, COUNT(*) FROM points GROUP BY status').fetchall()
+        out = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        out.update(dict(rows))
+        return out
+
+    def errors(self):
+        """Returns a dictionary of {index: error} of the points whose last attempt failed"""
+        with self._connect(write=False) as db:
+            rows = db.execute('SELECT idx, error FROM points WHERE error IS NOT NULL').fetchall()
+        return dict(rows)
+
+    def finished(self):
+        """Returns True when no point is pending or leased"""
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+
+def enqueue_grid(queue, grid):
+    """Enqueues every point of a grid, by index"""
+    return queue.enqueue(range(0, len(grid)))
+
+
+class Worker(object):
+    """Leases, runs and acknowledges grid points of a simulation case until the queue is finished
+
+    Arguments:
+        queue : (WorkQueue) : Work queue
+        case : (BaseSimCase) : Simulation case whose grid points are run
+        worker_id : (string) [optional] : Identifier of the worker. Defaults to host name and process id
+        heartbeat : (float) [optional] : Seconds between lease renewals. Defaults to a third of the lease time
+        poll : (float) [optional] : Seconds to wait before polling again when all remaining points are leased
+    """
+
+    def __init__(self, queue, case, worker_id=None, heartbeat=None, poll=1):
+        self.queue = queue
+        self.case = case
+        self.worker_id = worker_id if worker_id is not None else '{}:{}'.format(socket.gethostname(), os.getpid())
+        self.heartbeat = heartbeat if heartbeat is not None else queue.lease_time / 3
+        self.poll = poll
+        self.completed = []
+
+    def _beat(self, idx, stop):
+        while not stop.wait(self.heartbeat):
+            if not self.queue.heartbeat(idx, self.worker_id):
+                return
+
+    def run(self, max_points=None):
+        """Runs grid points until the queue is finished, or until max_points points have been run
+
+        Returns:
+            List of the indices of the points completed by this worker
+        """
+        grid = self.case._prepare_grid()
+        while max_points is None or len(self.completed) < max_points:
+            idx = self.queue.lease(self.worker_id)
+            if idx is None:
+                if self.queue.finished():
+                    break
+                time.sleep(self.poll)
+                continue
+
+            stop = threading.Event()
+            beat = threading.Thread(target=self._beat, args=(idx, stop), daemon=True)
+            beat.start()
+            try:
+                self.case.run_point(grid.point(idx), raise_errors=True)
+            except Exception as e:
+                self.queue.fail(idx, self.worker_id, repr(e))
+            else:
+                if self.queue.ack(idx, self.worker_id):
+                    self.completed.append(idx)
+            finally:
+                stop.set()
+                beat.join()
+
+        return self.completed
+
+
+def run_worker(queue_path, case_factory, queue_options=None, **kwargs):
+    """Entry point of a worker process
+
+    Args:
+        queue_path: Path of the SQLite database of the work queue
+        case_factory: Picklable callable returning the simulation case, e.g. its class
+        queue_options: (dict) keyword arguments of `WorkQueue`, e.g. lease_time
+        kwargs: passed on to `Worker`
+    """
+    queue = WorkQueue(queue_path, **(queue_options or {}))
+    return Worker(queue, case_factory(), **kwargs).run()
+
+
+def run_local(queue_path, case_factory, workers=None, queue_options=None, **kwargs):
+    """Runs a number of worker processes on the local machine and waits for them to finish
+
+    Args:
+        queue_path: Path of the SQLite database of the work queue
+        case_factory: Picklable callable returning the simulation case, e.g. its class
+        workers: number of worker processes. Defaults to the number of cores
+        queue_options: (dict) keyword arguments of `WorkQueue`, e.g. lease_time
+        kwargs: passed on to `Worker`
+
+    Returns:
+        List of the exit codes of the worker processes
+    """
+    workers = workers if workers is not None else os.cpu_count()
+    processes = [multiprocessing.Process(target=run_worker, args=(queue_path, case_factory, queue_options),
+                                         kwargs=kwargs)
+                 for _ in range(0, workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return [process.exitcode for process in processes]
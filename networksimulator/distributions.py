@@ -0,0 +1,207 @@
+"""Distributions module
+
+Random attributes and edges are specified in the graph factories by tuples of the form (dist, args, kwargs), where
+dist is a scipy.stats distribution, a method of NumPy's RandomState or Generator, or the name of either. Such
+specifications are validated and resolved once, by `make_sampler`, into `Sampler` objects which hold the resolved
+sampling function bound to the builder's RNG, its parameters and the dtype of its output. Drawing samples is then a
+single vectorised call, with no further look-ups.
+
+Names are looked up in the registry of custom samplers first, then in scipy.stats and lastly among the RNG's methods,
+and their resolution is cached. Custom samplers are registered with `register`, for example:
+```
+def spread(rng, low, high, size=None):
+    return low + (high - low) * rng.random(size)
+
+distributions.register('spread', spread, dtype=float)
+factory.set_node_attribute(x=('spread', [0, 10]))
+```
+Custom samplers are sent to worker processes by reference when edges are built in parallel, so should be defined at
+module level.
+
+SciPy is only imported when a name is resolved, since names may refer to scipy.stats distributions. Distributions given
+as NumPy functions or SciPy objects do not require importing it.
+"""
+import functools
+import numpy as np
+from numpy import random
+
+REGISTRY = 'registry'
+SCIPY = 'scipy'
+RNG = 'rng'
+
+# RNG methods whose samples are integers
+INTEGER_METHODS = frozenset([
+    'binomial', 'geometric', 'hypergeometric', 'integers', 'logseries', 'negative_binomial', 'poisson', 'randint',
+    'random_integers', 'zipf'
+])
+
+_registry = {}
+
+
+def _stats():
+    """Imports scipy.stats on first use. It is slow to import, and only needed for distributions given by name"""
+    from scipy import stats
+    return stats
+
+
+def register(name, function, dtype=None):
+    """Registers a custom sampler, which takes precedence over scipy.stats and RNG methods of the same name
+
+    Args:
+        name: (string) name of the sampler, as used in distribution specifications
+        function: Callable with the signature (rng, *args, size=None, **kwargs), returning an array of samples
+        dtype: NumPy dtype of the samples, which are converted to it if given
+    """
+    if not isinstance(name, str):
+        raise TypeError('Sampler name must be a string, not {!r}'.format(name))
+    if not callable(function):
+        raise TypeError('Sampler {!r} must be callable'.format(name))
+    _registry[name] = (function, np.dtype(dtype) if dtype is not None else None)
+    _resolve_name.cache_clear()
+
+
+def unregister(name):
+    """Removes a custom sampler from the registry"""
+    del _registry[name]
+    _resolve_name.cache_clear()
+
+
+def _scipy_dtype(dist):
+    """Dtype of the samples of a scipy.stats distribution, or its frozen version"""
+    stats = _stats()
+    dist = getattr(dist, 'dist', dist)
+    if isinstance(dist, stats.rv_discrete):
+        return np.dtype(int)
+    if isinstance(dist, stats.rv_continuous):
+        return np.dtype(float)
+    return None
+
+
+def _method_dtype(name):
+    return np.dtype(int) if name in INTEGER_METHODS else None
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_name(name):
+    """Resolves a distribution name into a (source, target, dtype) tuple"""
+    if name in _registry:
+        function, dtype = _registry[name]
+        return REGISTRY, function, dtype
+    dist = getattr(_stats(), name, None)
+    if hasattr(dist, 'rvs'):
+        return SCIPY, dist, _scipy_dtype(dist)
+    if hasattr(random.RandomState, name) or hasattr(random.Generator, name):
+        return RNG, name, _method_dtype(name)
+    raise ValueError('Unknown distribution {!r}: not a registered sampler, scipy.stats distribution or RNG '
+                     'method'.format(name))
+
+
+def resolve(dist):
+    """Resolves a distribution into the (source, target, dtype) tuple from which samplers are built
+
+    Args:
+        dist: scipy.stats distribution, method of NumPy's RandomState or Generator, or the name of a registered
+            sampler, of a scipy.stats distribution or of an RNG method
+
+    Returns:
+        Tuple of the source (REGISTRY, SCIPY or RNG), the target (sampling function, scipy.stats distribution or name
+        of the RNG method) and the dtype of the samples, None if unknown
+    """
+    if isinstance(dist, str):
+        return _resolve_name(dist)
+    if hasattr(dist, 'rvs'):
+        return SCIPY, dist, _scipy_dtype(dist)
+    name = getattr(dist, '__name__', None)
+    if callable(dist) and (hasattr(random.RandomState, name) or hasattr(random.Generator, name)):
+        return RNG, name, _method_dtype(name)
+    raise TypeError('Distribution must be a scipy.stats distribution, a NumPy RNG method, or the name of either, '
+                    'not {!r}'.format(dist))
+
+
+class Sampler(object):
+    """Distribution specification resolved into a vectorised sampling function, bound to an RNG
+
+    Arguments:
+        name : (string) : Name of the distribution
+        source : (string) : Where the distribution was resolved: REGISTRY, SCIPY or RNG
+        target : (object) : Custom sampling function, scipy.stats distribution, or name of the RNG method
+        args : (sequence) [optional] : Positional parameters of the distribution
+        kwargs : (dict) [optional] : Keyword parameters of the distribution
+        rng : (RandomState|Generator) [optional] : RNG the samples are drawn from
+        dtype : (numpy.dtype) [optional] : Dtype of the samples, if known
+    """
+
+    def __init__(self, name, source, target, args=(), kwargs=None, rng=None, dtype=None):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.rng = rng
+        self.dtype = dtype
+        self.function = self._bind_function()
+
+    def _bind_function(self):
+        if self.source == SCIPY:
+            return functools.partial(self.target.rvs, random_state=self.rng)
+        if self.source == REGISTRY:
+            return functools.partial(self.target, self.rng)
+        if self.rng is None:
+            return None
+        try:
+            return getattr(self.rng, self.target)
+        except AttributeError:
+            raise ValueError('RNG of type {} has no distribution {!r}'.format(type(self.rng).__name__, self.target))
+
+    def bind(self, rng):
+        """Returns the same sampler, bound to another RNG"""
+        return Sampler(self.name, self.source, self.target, self.args, self.kwargs, rng=rng, dtype=self.dtype)
+
+    def __call__(self, size=None):
+        """Draws samples
+
+        Args:
+            size: number or shape of the samples
+
+        Returns:
+            Array of samples
+        """
+        if self.function is None:
+            raise TypeError('Distribution {!r} requires an RNG'.format(self.name))
+        samples = self.function(*self.args, size=size, **self.kwargs)
+        return samples if self.dtype is None else np.asarray(samples, dtype=self.dtype)
+
+    def __repr__(self):
+        return 'Sampler({!r}, {!r}, {!r})'.format(self.name, self.args, self.kwargs)
+
+
+def make_sampler(spec, rng=None):
+    """Validates a distribution specification and resolves it into a sampler
+
+    Args:
+        spec: tuple of the form (dist, args) or (dist, args, kwargs), where dist is as accepted by `resolve`
+        rng: Instance of NumPy's RandomState or Generator object
+
+    Returns:
+        Sampler object bound to rng
+    """
+    if not isinstance(spec, tuple) or len(spec) not in (2, 3):
+        raise TypeError('Distribution specification must be a tuple (dist, args[, kwargs]), not {!r}'.format(spec))
+    dist, args = spec[0], spec[1]
+    kwargs = spec[2] if len(spec) > 2 else {}
+    if not isinstance(args, (list, tuple, np.ndarray)):
+        raise TypeError('Distribution arguments must be a list or tuple, not {!r}'.format(args))
+    if not isinstance(kwargs, dict):
+        raise TypeError('Distribution keyword arguments must be a dictionary, not {!r}'.format(kwargs))
+    if 'size' in kwargs:
+        raise ValueError('The number of samples is set by the builder, and may not be given as keyword argument')
+
+    source, target, dtype = resolve(dist)
+    if source == RNG and rng is None:
+        raise TypeError('Distribution {!r} requires an RNG'.format(target))
+
+    if isinstance(dist, str):
+        name = dist
+    else:
+        name = getattr(getattr(dist, 'dist', dist), 'name', None) or getattr(dist, '__name__', repr(dist))
+    return Sampler(name, source, target, args, kwargs, rng=rng, dtype=dtype)
@@ -0,0 +1,145 @@
+"""Ensemble module
+
+Runs many replicates of a simulation on the same graph in one vectorised pass. Instead of one SimPy process per node
+and per replicate, the state of K replicates of an N-node graph is held as (K x N) arrays, one per node attribute, and
+all replicates are advanced together once per tick. Scheduling, neighbour traversal and logging costs are thereby
+shared by the K replicates.
+
+Each replicate draws from its own random stream, derived from the ensemble seed with `streams.RandomStreams`, so that
+the trajectory of a replicate does not depend on how many other replicates are run alongside it.
+
+Ensembles are defined by sub-classing `BaseEnsemble` and redefining `step`. For example, an SI epidemic in which each
+susceptible node is infected with probability `beta` per infected neighbour could be written as:
+```
+class SI(BaseEnsemble):
+    def step(self, state):
+        pressure = self.neighbour_sum(state['sick'])
+        infected = self.draw('random') < 1 - (1 - self.beta) ** pressure
+        state['sick'] |= infected
+```
+The records of each replicate are either kept in memory, and returned as `results.BaseResults` objects by `results`,
+or passed to one logger per replicate, whose files may be loaded with the `results` module as usual.
+"""
+import numpy as np
+from . import results, streams
+
+
+class BaseEnsemble(object):
+    """Base class for ensembles of replicates advanced together over a shared topology
+
+    Arguments:
+        graph : (NetworkX.Graph) : Graph object providing the topology and the initial node attributes
+        replicates : (int) : Number of replicates K
+        attributes : (list) : Names of the node attributes making up the state
+        seed : (int|SeedSequence|RandomStreams) [optional] : Root seed of the replicate streams
+        interval : (int) [optional] : Simulation time advanced per tick
+        time_start : (int) [optional] : Time at which to start simulation
+        weight : (string) [optional] : Name of the edge attribute used as adjacency weight. Unweighted if None
+    """
+
+    def __init__(self, graph, replicates, attributes, seed=None, interval=1, time_start=0, weight=None):
+        self.graph = graph
+        self.nodes = list(graph.nodes())
+        self.index = {node: ii for (ii, node) in enumerate(self.nodes)}
+        self.replicates = replicates
+        self.interval = interval
+        self.now = time_start
+        self.adjacency = self._build_adjacency(weight)
+        self.__in_adjacency__ = self.adjacency.T.tocsr()
+
+        data = dict(graph.nodes(data=True))
+        self.state = {}
+        for name in attributes:
+            column = np.asarray([data[node][name] for node in self.nodes])
+            self.state[name] = np.tile(column, (replicates, 1))
+
+        root = streams.RandomStreams(seed)
+        self.rngs = [root.generator('replicate', k) for k in range(0, replicates)]
+        self.records = [[] for _ in range(0, replicates)]
+
+    def _build_adjacency(self, weight):
+        """Builds the sparse (N x N) adjacency matrix, where entry (i, j) is the weight of the edge from i to j"""
+        from scipy import sparse  # imported on first use, as it is slow to import
+
+        num_nodes = len(self.nodes)
+        rows, cols, vals = [], [], []
+        for edge in self.graph.edges(data=True):
+            rows.append(self.index[edge[0]])
+            cols.append(self.index[edge[1]])
+            vals.append(edge[-1].get(weight, 1) if weight is not None else 1)
+
+        if not self.graph.is_directed():
+            rows, cols = rows + cols, cols + rows
+            vals = vals + vals
+
+        return sparse.csr_matrix((np.asarray(vals, dtype=float), (rows, cols)), shape=(num_nodes, num_nodes))
+
+    def draw(self, distribution, *args, **kwargs):
+        """Draws one sample per node and per replicate, each replicate from its own stream
+
+        Args:
+            distribution: name of a NumPy Generator method, e.g. 'random' or 'normal'
+            args, kwargs: parameters of the distribution
+
+        Returns:
+            (K x N) array
+        """
+        size = len(self.nodes)
+        return np.stack([getattr(rng, distribution)(*args, size=size, **kwargs) for rng in self.rngs])
+
+    def neighbour_sum(self, values):
+        """Sums the values of the in-neighbours of every node, in every replicate
+
+        Args:
+            values: (K x N) array
+
+        Returns:
+            (K x N) array, whose entry (k, j) is the weighted sum of values[k, i] over the edges from i to j
+        """
+        return np.asarray(self.__in_adjacency__.dot(np.asarray(values, dtype=float).T)).T
+
+    def step(self, state):
+        """Advances the state of all replicates by one tick, in place
+
+        Arguments:
+            state : (dict) : {attribute name: (K x N) array}
+        """
+        raise NotImplementedError
+
+    def get_state(self, state):
+        """Transforms the state of all replicates into one record per replicate. Default behaviour is to copy each
+        replicate's row of every attribute. Overwrite this method, preferably with vectorised operations over
+        replicates, to alter the records that get logged.
+
+        Arguments:
+            state : (dict) : {attribute name: (K x N) array}
+
+        Returns:
+            Sequence of K records
+        """
+        return [{name: values[k].copy() for (name, values) in state.items()} for k in range(0, self.replicates)]
+
+    def run(self, until, loggers=None):
+        """Runs all replicates, recording the state before every tick, until the simulation time reaches `until`
+
+        Arguments:
+            until : (int) : Time at which to stop the simulation
+            loggers : (list) [optional] : One logger per replicate, whose `observe` method receives the records. If
+                None, records are kept in memory
+        """
+        if loggers is not None and len(loggers) != self.replicates:
+            raise ValueError('Expected one logger per replicate')
+
+        while self.now < until:
+            for k, record in enumerate(self.get_state(self.state)):
+                if loggers is None:
+                    self.records[k].append(record)
+                else:
+                    loggers[k].observe(self.now, record)
+            self.step(self.state)
+            self.now += self.interval
+        return self
+
+    def results(self):
+        """Returns the records kept in memory as one results.BaseResults object per replicate"""
+        return [results.BaseResults(records) for records in self.records]
@@ -5,10 +5,199 @@ based on SimPy's Environment class. It defines the context within which the simu
 and also controls the simulation clock.
 
 An environment is a necessary component of every simulation.
+
+The environment also acts as a lightweight event hub for state changes. Agents (or the environment itself) may call
+`emit` whenever they change a node's state, and any callables registered with `subscribe` are notified with the
+current simulation time, the node and the changed attributes. With no subscribers, emitting costs a single loop over
+an empty list.
+
+Environments may be reused across simulation runs on the same graph: `reset` reinitialises the clock, event queue,
+random number generator and agent processes, and restores the graph attributes saved by `take_snapshot`, avoiding the
+reconstruction of the graph and its agents.
+
+Besides the shared generator `rng`, each agent (or batch of agents) may draw from its own independent random stream,
+`agent_rng(agent)`, derived from the environment seed with `streams.RandomStreams`. Draws from these streams do not
+depend on the order in which agents are scheduled, so that trajectories remain reproducible when agents are batched,
+reordered or run in parallel.
+
+Simulations may stop before the requested runtime. Stop conditions added with `add_stop_condition` are checked by a
+process of their own at a given interval, and `stop` ends the run at the current time, recording the reason in
+`stop_reason` and the time in `stop_time`. Built-in conditions detect an absorbing state (`AbsorbingState`) and a
+statistic settling within a tolerance over a window of checks (`SteadyState`); any callable may be used as a
+`Predicate`.
+
+By default, events are scheduled on SimPy's binary heap, at O(log n) cost per event. In dense simulations where many
+events fall on the same times, e.g. every agent yielding `env.timeout(1)`, the environment may instead be constructed
+with `scheduler='calendar'`: events are then kept in one bucket per distinct scheduled time, with O(1) insertion and
+removal, and only the distinct times are kept in a heap. Events are processed in exactly the same order as with the
+heap: by time, then priority, then scheduling order.
 """
 
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
+from time import perf_counter
 import simpy
-from numpy.random import RandomState
+from simpy.core import EmptySchedule, Infinity, StopSimulation
+from simpy.events import NORMAL, URGENT, Event
+from numpy.random import RandomState, SeedSequence
+from . import agents, streams
+from .utils import node_dict
+
+
+class StopCondition(object):
+    """Base class for conditions stopping a simulation before its runtime
+
+    Arguments:
+        reason : (string) [optional] : Reason recorded when the condition stops the simulation. Defaults to the name
+            of the condition class
+    """
+    def __init__(self, reason=None):
+        self.reason = reason if reason is not None else type(self).__name__
+
+    def check(self, graph, env):
+        """Returns True if the simulation should stop"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Clears any state held by the condition, before a new run"""
+        pass
+
+
+class Predicate(StopCondition):
+    """Stops the simulation when a user predicate, with the signature (graph, env), returns True"""
+    def __init__(self, predicate, reason=None):
+        super().__init__(reason)
+        self.predicate = predicate
+
+    def check(self, graph, env):
+        return self.predicate(graph, env)
+
+
+class AbsorbingState(StopCondition):
+    """Stops the simulation when a statistic of the graph reaches an absorbing value, e.g. no infected nodes left
+
+    Arguments:
+        statistic : (callable) : Function of the graph returning the statistic
+        value : Absorbing value of the statistic
+    """
+    def __init__(self, statistic, value, reason=None):
+        super().__init__(reason)
+        self.statistic = statistic
+        self.value = value
+
+    def check(self, graph, env):
+        return self.statistic(graph) == self.value
+
+
+class SteadyState(StopCondition):
+    """Stops the simulation when a statistic of the graph has stayed within a tolerance over a window of checks
+
+    Arguments:
+        statistic : (callable) : Function of the graph returning the statistic
+        window : (int) : Number of consecutive checks considered
+        tol : (float) [optional] : Largest difference between the extreme values of the statistic over the window
+    """
+    def __init__(self, statistic, window, tol=0, reason=None):
+        super().__init__(reason)
+        self.statistic = statistic
+        self.window = window
+        self.tol = tol
+        self.__values__ = deque(maxlen=window)
+
+    def check(self, graph, env):
+        values = self.__values__
+        values.append(self.statistic(graph))
+        return len(values) == self.window and max(values) - min(values) <= self.tol
+
+    def reset(self):
+        self.__values__.clear()
+
+
+class CalendarScheduler(object):
+    """Event queue of an environment holding one bucket of events per distinct scheduled time
+
+    Each bucket keeps one FIFO queue per priority, for the priorities used by SimPy: -1 (events interrupted by
+    `StopSimulation`), URGENT and NORMAL. The distinct times are kept in a heap. Scheduling and processing an event are
+    O(1), plus O(log T) when a time is first scheduled, T being the number of distinct times pending.
+
+    The `schedule`, `peek` and `step` methods replace those of `simpy.Environment` on the environment.
+
+    Arguments:
+        env : (simpy.Environment) : Environment whose events are scheduled
+    """
+    def __init__(self, env):
+        self.env = env
+        self.clear()
+
+    def clear(self):
+        """Discards all events"""
+        self.__buckets__ = {}
+        self.__times__ = []
+        self.__count__ = 0
+
+    def schedule(self, event, priority=NORMAL, delay=0):
+        """Schedules an event after all the events of the same time and priority, as `simpy.Environment.schedule`"""
+        time = self.env._now + delay
+        try:
+            bucket = self.__buckets__[time]
+        except KeyError:
+            bucket = self.__buckets__[time] = (deque(), deque(), deque())
+            heappush(self.__times__, time)
+        bucket[priority + 1].append(event)
+        self.__count__ += 1
+
+    def peek(self):
+        """Returns the time of the next event, or Infinity if no event is left"""
+        times = self.__times__
+        while times:
+            bucket = self.__buckets__[times[0]]
+            if bucket[0] or bucket[1] or bucket[2]:
+                return times[0]
+            del self.__buckets__[heappop(times)]
+        return Infinity
+
+    def step(self):
+        """Processes the next event, as `simpy.Environment.step`"""
+        times = self.__times__
+        while True:
+            if not times:
+                raise EmptySchedule
+            time = times[0]
+            bucket = self.__buckets__[time]
+            # interrupted events first, then URGENT and lastly NORMAL events
+            if bucket[0]:
+                events = bucket[0]
+            elif bucket[1]:
+                events = bucket[1]
+            elif bucket[2]:
+                events = bucket[2]
+            else:
+                del self.__buckets__[heappop(times)]
+                continue
+            break
+        event = events.popleft()
+        self.__count__ -= 1
+        self.env._now = time
+
+        callbacks, event.callbacks = event.callbacks, None
+        try:
+            for callback in callbacks:
+                callback(event)
+        except StopSimulation:
+            # process the remaining callbacks first when the simulation resumes, as SimPy does
+            event.callbacks = callbacks[callbacks.index(callback) + 1:]
+            self.schedule(event, -1)
+            raise
+
+        if not event._ok and not hasattr(event, '_defused'):
+            exc = type(event._value)(*event._value.args)
+            exc.__cause__ = event._value
+            raise exc
+
+    def __len__(self):
+        # a counter rather than a sum over the buckets, so that other threads, e.g. a tracer, may read it at any time
+        return self.__count__
 
 
 class NetworkEnvironment(simpy.Environment):
@@ -16,19 +205,229 @@ class NetworkEnvironment(simpy.Environment):
 
     Description ...
     """
-    def __init__(self, graph, seed=None, time_start=0):
+    def __init__(self, graph, seed=None, time_start=0, snapshot=False, scheduler='heap'):
         """Constructor
 
         Args:
             graph (Object): NetworkX Graph object on which to perform simulation.
-            seed (Optional[int]): Seed for NumPy's RandomState
+            seed (Optional[int|SeedSequence|RandomStreams]): Seed for NumPy's RandomState. If a SeedSequence or
+                RandomStreams object is given, `rng` is instead a PCG64-based Generator derived from it
             time_start (Optional[int]): Time at which to start simulation
+            snapshot (Optional[bool]): Save the initial graph attributes, to be restored by `reset`
+            scheduler (Optional[str]): Event queue: 'heap', SimPy's default, or 'calendar', see `CalendarScheduler`
         """
         super().__init__(initial_time=time_start)
-        if seed is not None:
+        self.scheduler = scheduler
+        self._init_scheduler()
+        self.graph = graph
+        self.listeners = []
+        self.batch_stats = {}
+        self.stop_conditions = []
+        self.stop_reason = None
+        self.stop_time = None
+        self.__until__ = None
+        self.__snapshot__ = None
+        self._seed(seed)
+        if snapshot:
+            self.take_snapshot()
+        self._register_agents()
+
+    def _init_scheduler(self):
+        """Sets up the event queue. The calendar scheduler's methods replace SimPy's `schedule`, `peek` and `step` on
+        the instance, so that the default heap scheduler keeps SimPy's own methods at no extra cost"""
+        if self.scheduler == 'heap':
+            self.__calendar__ = None
+        elif self.scheduler == 'calendar':
+            self.__calendar__ = CalendarScheduler(self)
+            self.schedule = self.__calendar__.schedule
+            self.peek = self.__calendar__.peek
+            self.step = self.__calendar__.step
+        else:
+            raise ValueError('Unknown scheduler {!r}, expected \'heap\' or \'calendar\''.format(self.scheduler))
+
+    def queue_length(self):
+        """Returns the number of scheduled events. Safe to call from another thread than the one running the
+        simulation, as it reads a counter or the length of the heap rather than iterating over the queue"""
+        return len(self.__calendar__) if self.__calendar__ is not None else len(self._queue)
+
+    def _seed(self, seed):
+        """Seeds the shared generator `rng` and the root of the agent streams"""
+        self.streams = streams.RandomStreams(seed)
+        self.__agent_rngs__ = {}
+        if isinstance(seed, (streams.RandomStreams, SeedSequence)):
+            self.rng = self.streams.generator('environment')
+        elif seed is not None:
             self.rng = RandomState(seed)
+
+    def agent_rng(self, agent):
+        """Returns the independent random stream of an agent, agent class or node, creating it on first use
+
+        Args:
+            agent: Agent, agent class (for batches) or node index (for flyweight agents)
+
+        Returns:
+            PCG64-based NumPy Generator object
+        """
+        try:
+            return self.__agent_rngs__[agent]
+        except KeyError:
+            rng = self.__agent_rngs__[agent] = self.streams.generator('agent', agent)
+            return rng
+
+    def _register_agents(self):
+        """Registers the run method of every agent of the graph as a simulation process
+
+        Nodes driven by flyweight agents, listed in the graph attribute 'flyweights', get one `run_node` process each.
+        Agent classes with a `batch_interval` are grouped, and get a single process stepping all their nodes. Nodes
+        which are not agents have no dynamics of their own.
+        """
+        graph = self.graph
+        batches = {}
+        for agent, nodes in graph.graph.get('flyweights', {}).items():
+            if agent.batch_interval is not None:
+                batches[agent] = list(nodes)
+                continue
+            for node in nodes:
+                self.process(agent.run_node(node, graph, self))
         for node in graph:
-            self.process(node.run(graph, self))
+            if isinstance(node, agents.BaseAgent):
+                if node.batch_interval is None:
+                    self.process(node.run(graph, self))
+                else:
+                    batches.setdefault(type(node), []).append(node)
+        for agent, nodes in batches.items():
+            self.process(self._run_batch(agent, nodes))
+
+    def _run_batch(self, agent, nodes):
+        """Process stepping all the given nodes of an agent class (or flyweight agent) once per batch interval
+
+        The number of nodes, number of steps and total wall-clock time spent stepping are kept in `batch_stats`,
+        keyed the same way as the batches themselves: by agent class, or by flyweight agent.
+        """
+        stats = self.batch_stats[agent] = {'nodes': len(nodes), 'steps': 0, 'time': 0.0}
+        while True:
+            start = perf_counter()
+            agent.step_batch(nodes, self.graph, self)
+            stats['time'] += perf_counter() - start
+            stats['steps'] += 1
+            yield self.timeout(agent.batch_interval)
+
+    def take_snapshot(self):
+        """Saves a copy of the graph, node and edge attributes, to be restored by `reset`
+
+        Attribute dictionaries are copied shallowly: attribute values that are mutated in place, rather than replaced,
+        are not restored. Changes to the graph topology are not restored either.
+        """
+        graph = self.graph
+        self.__snapshot__ = (
+            [(graph.graph, dict(graph.graph))] +
+            [(attr, dict(attr)) for (_, attr) in graph.nodes(data=True)] +
+            [(edge[-1], dict(edge[-1])) for edge in graph.edges(data=True)]
+        )
+        return self
+
+    def reset(self, seed=None, time_start=0):
+        """Resets the environment for a new simulation run on the same graph
+
+        The clock is set to `time_start`, all scheduled events, processes and subscribers are discarded, the graph
+        attributes are restored from the snapshot (if any) and the agent processes are registered afresh.
+
+        Args:
+            seed (Optional[int|SeedSequence|RandomStreams]): Seed, as for the constructor. If None, the random number
+                generators are left as they are
+            time_start (Optional[int]): Time at which to start simulation
+        """
+        self._now = time_start
+        self._queue = []
+        self._eid = count()
+        if self.__calendar__ is not None:
+            self.__calendar__.clear()
+        self._active_proc = None
+        self.listeners = []
+        self.batch_stats = {}
+        self.stop_reason = None
+        self.stop_time = None
+
+        if seed is not None:
+            self._seed(seed)
+
+        if self.__snapshot__ is not None:
+            for attr, saved in self.__snapshot__:
+                attr.clear()
+                attr.update(saved)
+
+        self._register_agents()
+        for condition, interval in self.stop_conditions:
+            condition.reset()
+            self.process(self._check_stop(condition, interval))
+        return self
+
+    def add_stop_condition(self, condition, interval=1):
+        """Adds a condition, checked every `interval` time units from now, which stops the simulation when met
+
+        Stop conditions are kept across calls to `reset`.
+
+        Args:
+            condition (StopCondition|callable): Stop condition, or predicate with the signature (graph, env)
+            interval (Optional[int]): Interval between checks
+        """
+        if not isinstance(condition, StopCondition):
+            condition = Predicate(condition)
+        condition.reset()
+        self.stop_conditions.append((condition, interval))
+        self.process(self._check_stop(condition, interval))
+        return self
+
+    def _check_stop(self, condition, interval):
+        """Process checking a stop condition once per interval"""
+        while True:
+            if condition.check(self.graph, self):
+                self.stop(condition.reason)
+                return
+            yield self.timeout(interval)
+
+    def run(self, until=None):
+        """Runs the simulation, as `simpy.Environment.run`
+
+        The `until` time is turned into an event here rather than by SimPy, so that `stop` may defuse it. Otherwise a
+        run ended by a stop condition would leave it scheduled, and it would end the next run at the wrong time.
+
+        Args:
+            until (Optional[float|Event]): Time or event at which to stop the simulation. Runs until no event is left
+                if None
+        """
+        if until is not None and not isinstance(until, Event):
+            at = until if isinstance(until, int) else float(until)
+            if at <= self.now:
+                raise ValueError('until ({}) must be greater than the current simulation time'.format(at))
+            until = Event(self)
+            until._ok = True
+            until._value = None
+            self.schedule(until, URGENT, at - self.now)
+        self.__until__ = until
+        try:
+            return super().run(until)
+        finally:
+            self.__until__ = None
+
+    def stop(self, reason=None):
+        """Stops the simulation at the current time, before any other event scheduled for this time. The `until`
+        event of the current run, if any, no longer stops later runs
+
+        Args:
+            reason: Reason for stopping, recorded in `stop_reason`
+        """
+        self.stop_reason = reason
+        self.stop_time = self.now
+        until = self.__until__
+        if until is not None and until.callbacks and StopSimulation.callback in until.callbacks:
+            until.callbacks.remove(StopSimulation.callback)
+        # triggered and scheduled the same way as the `until` event of SimPy's Environment.run
+        event = self.event()
+        event._ok = True
+        event._value = reason
+        event.callbacks.append(StopSimulation.callback)
+        self.schedule(event, URGENT)
 
     def draw(self, distribution):
         arg_dict = {
@@ -36,3 +435,38 @@ class NetworkEnvironment(simpy.Environment):
         }
         args = arg_dict[distribution]
         return getattr(self.rng, distribution)(*args)
+
+    def subscribe(self, callback):
+        """Register a callable to be notified of state-change events
+
+        Args:
+            callback: Callable with the signature (time, node, changes), where changes is a dictionary of the changed
+                attribute names and their new values
+        """
+        self.listeners.append(callback)
+        return self
+
+    def unsubscribe(self, callback):
+        """Remove a previously subscribed callable"""
+        self.listeners.remove(callback)
+        return self
+
+    def emit(self, node, **changes):
+        """Notify all subscribers that the state of the given node has changed
+
+        Args:
+            node: Node whose state has changed. May be None for graph-wide events
+            changes: name/value pairs of the changed attributes
+        """
+        for callback in self.listeners:
+            callback(self.now, node, changes)
+
+    def update_node(self, node, **changes):
+        """Set node attributes on the simulation graph and emit the corresponding state-change event
+
+        Args:
+            node: Node whose attributes are set
+            changes: name/value pairs of the attributes to set
+        """
+        node_dict(self.graph)[node].update(changes)
+        self.emit(node, **changes)
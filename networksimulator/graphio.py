@@ -0,0 +1,362 @@
+"""Graph I/O module
+
+Saves graphs to, and loads them from, a binary format about half the size of pickled NetworkX graphs, whose arrays
+may be memory-mapped, so that large graphs may be built once and reused across sweeps.
+
+A saved graph is a directory of NumPy `.npy` files and a JSON manifest:
+
+- the topology as compressed sparse rows: `indptr`, holding for each node the offset of its first out-edge, and
+  `indices`, holding the target node index of every edge. Undirected edges are stored once
+- one typed array per node or edge attribute, plus a boolean mask for attributes not set on every node or edge
+- the agent class of every node, as an index into the list of agent classes held by the manifest, and its agent id.
+  Each flyweight agent has an entry of its own in that list, with its agent id, and the graph's 'flyweights'
+  attribute is rebuilt on load
+
+Nodes must be integers or agents with integer ids, and agent classes must be importable by name. The values of each
+attribute must all be booleans, all strings, or all numbers, integers being stored as floats when mixed with
+floats. Graph attributes are stored in the manifest, and must therefore be JSON-serialisable.
+
+`load` memory-maps the arrays, for array-based code such as the `ensemble` module, and `to_graph` turns them into a
+NetworkX graph by filling its node and neighbour dictionaries with one update per node, rather than one call per edge.
+For example:
+```
+graphio.save(factory.build(), 'graph')
+graph = graphio.read_graph('graph')  # or builders.FileGraphFactory('graph').build()
+```
+"""
+import os
+import json
+import importlib
+import networkx as nx
+import numpy as np
+from . import agents
+from .utils import adjacency_dicts, node_dict
+
+FORMAT = 'networksimulator.graph'
+VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def _class_name(cls):
+    """Returns the importable name 'module:qualname' of a class"""
+    if '<locals>' in cls.__qualname__:
+        raise ValueError('Agent class {} is not importable by name'.format(cls.__qualname__))
+    return '{}:{}'.format(cls.__module__, cls.__qualname__)
+
+
+def _import_class(name):
+    """Imports a class from its name 'module:qualname'"""
+    module, qualname = name.split(':')
+    obj = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _type_kind(value_type):
+    """Kind of column holding values of the given Python or NumPy type, None if it cannot be stored"""
+    if issubclass(value_type, (bool, np.bool_)):
+        return 'bool'
+    if issubclass(value_type, (int, np.integer)):
+        return 'int'
+    if issubclass(value_type, (float, np.floating)):
+        return 'float'
+    if issubclass(value_type, (complex, np.complexfloating)):
+        return 'complex'
+    if issubclass(value_type, str):
+        return 'str'
+    return None
+
+
+def _column(values, present, kind):
+    """Typed array of attribute values, with missing values set to zero
+
+    Args:
+        values: list of the values set, in order
+        present: boolean array, true where the value is set, or None if set everywhere
+        kind: description of the attribute for error messages
+
+    Returns:
+        NumPy array
+    """
+    # NumPy would silently coerce mixed values, e.g. booleans to floats or numbers to strings
+    kinds = {_type_kind(value_type) for value_type in set(map(type, values))}
+    if None in kinds or (len(kinds) > 1 and kinds != {'int', 'float'}):
+        raise ValueError('{} cannot be stored as an array of numbers, booleans or strings: it holds values of types {}'
+                         .format(kind, sorted(t.__name__ for t in set(map(type, values)))))
+    array = np.asarray(values)
+    if array.ndim != 1:
+        raise ValueError('{} cannot be stored as an array of numbers, booleans or strings'.format(kind))
+    if present is None:
+        return array
+    column = np.zeros(len(present), dtype=array.dtype)
+    column[present] = array
+    return column
+
+
+def _columns(dicts, kind):
+    """Typed arrays of the attributes of a list of attribute dictionaries
+
+    Returns:
+        Dictionary of {attribute name: (array, mask)}, where mask is None for attributes set in every dictionary
+    """
+    names = {}
+    for dic in dicts:
+        for name in dic:
+            names.setdefault(name, None)
+    columns = {}
+    for name in names:
+        present = np.fromiter((name in dic for dic in dicts), dtype=bool, count=len(dicts))
+        if present.all():
+            values, present = [dic[name] for dic in dicts], None
+        else:
+            values = [dic[name] for dic in dicts if name in dic]
+        columns[name] = (_column(values, present, '{} attribute {!r}'.format(kind, name)), present)
+    return columns
+
+
+def save(graph, path):
+    """Saves a graph to a directory in the binary graph format
+
+    Args:
+        graph: NetworkX graph object
+        path: (string) path of the directory, created if needed. Files of a previously saved graph are overwritten
+
+    Returns:
+        The path
+    """
+    nodes = list(graph.nodes())
+    index = {node: ii for (ii, node) in enumerate(nodes)}
+
+    # agent class code and id of every node; flyweight-driven nodes are plain indices, coded by flyweight agent
+    classes, codes, ids = [], np.full(len(nodes), -1, dtype=np.int32), np.zeros(len(nodes), dtype=np.int64)
+    class_codes, flyweight_ids = {}, {}
+    for ii, node in enumerate(nodes):
+        if isinstance(node, agents.BaseAgent):
+            cls, node_id = type(node), node.agent_id
+            if cls not in class_codes:
+                class_codes[cls] = len(classes)
+                classes.append(_class_name(cls))
+            codes[ii] = class_codes[cls]
+        else:
+            node_id = node
+        if not isinstance(node_id, (int, np.integer)) or isinstance(node_id, bool):
+            raise ValueError('Node {!r} is neither an integer nor an agent with an integer id'.format(node))
+        ids[ii] = node_id
+    for flyweight, members in graph.graph.get('flyweights', {}).items():
+        flyweight_ids[len(classes)] = flyweight.agent_id
+        codes[[index[node] for node in members]] = len(classes)
+        classes.append(_class_name(type(flyweight)))
+
+    # edges as compressed sparse rows, read from the neighbour dictionaries in node order. Undirected edges are kept
+    # in the row of their first node only
+    successors, _ = adjacency_dicts(graph)
+    directed, multigraph = graph.is_directed(), graph.is_multigraph()
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    targets, edge_dicts = [], []
+    for ii, node in enumerate(nodes):
+        for neighbour, attr in successors[node].items():
+            jj = index[neighbour]
+            if directed or jj >= ii:
+                if multigraph:
+                    targets.extend([jj] * len(attr))
+                    edge_dicts.extend(attr.values())
+                else:
+                    targets.append(jj)
+                    edge_dicts.append(attr)
+        indptr[ii + 1] = len(targets)
+    index_type = np.int32 if len(nodes) < 2 ** 31 else np.int64
+
+    graph_attributes = {key: value for (key, value) in graph.graph.items() if key != 'flyweights'}
+    try:
+        graph_attributes = json.loads(json.dumps(graph_attributes))
+    except TypeError as e:
+        raise ValueError('Graph attributes must be JSON-serialisable: {}'.format(e))
+
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        os.remove(os.path.join(path, MANIFEST))
+    arrays = {'indptr': indptr, 'indices': np.asarray(targets, dtype=index_type), 'agent_codes': codes,
+              'agent_ids': ids}
+    manifest = {'format': FORMAT, 'version': VERSION, 'directed': directed,
+                'multigraph': multigraph, 'num_nodes': len(nodes), 'num_edges': len(targets),
+                'graph': graph_attributes, 'agents': classes, 'flyweights': flyweight_ids, 'nodes': {}, 'edges': {}}
+    data = node_dict(graph)
+    for kind, dicts in (('nodes', [data[node] for node in nodes]), ('edges', edge_dicts)):
+        for ii, (name, (column, mask)) in enumerate(_columns(dicts, kind[:-1]).items()):
+            key = '{}_{}'.format(kind[:-1], ii)
+            arrays[key] = column
+            manifest[kind][name] = {'file': key, 'dtype': column.dtype.str, 'masked': mask is not None}
+            if mask is not None:
+                arrays[key + '_mask'] = mask
+
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array, allow_pickle=False)
+    # the manifest is written last, so that an interrupted save is not mistaken for a saved graph
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    return path
+
+
+class GraphArrays(object):
+    """Arrays of a graph saved in the binary graph format, as returned by `load`
+
+    Attributes:
+        manifest: dictionary of the graph's metadata
+        indptr, indices: topology as compressed sparse rows
+        agent_codes, agent_ids: index into `agents` (-1 for plain nodes) and agent id of every node
+        agents: list of agent classes
+        flyweights: dictionary of {index into `agents`: agent id} of the flyweight agents
+        nodes, edges: dictionaries of {attribute name: (array, mask)}, where mask is None for attributes set on every
+            node or edge. Edge attributes are in the order of `indices`
+    """
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.agent_codes = arrays['agent_codes']
+        self.agent_ids = arrays['agent_ids']
+        self.agents = [_import_class(name) for name in manifest['agents']]
+        self.flyweights = {int(code): agent_id for (code, agent_id) in manifest.get('flyweights', {}).items()}
+        self.nodes, self.edges = {}, {}
+        for kind, columns in (('nodes', self.nodes), ('edges', self.edges)):
+            for name, spec in manifest[kind].items():
+                mask = arrays[spec['file'] + '_mask'] if spec['masked'] else None
+                columns[name] = (arrays[spec['file']], mask)
+
+    @property
+    def num_nodes(self):
+        return self.manifest['num_nodes']
+
+    @property
+    def num_edges(self):
+        return self.manifest['num_edges']
+
+    def sources(self):
+        """Returns the source node index of every edge, in the order of `indices`"""
+        return np.repeat(np.arange(0, self.num_nodes), np.diff(self.indptr))
+
+
+def load(path, mmap=True):
+    """Loads the arrays of a graph saved with `save`
+
+    Args:
+        path: (string) path of the directory of the saved graph
+        mmap: (bool) memory-map the arrays rather than reading them into memory
+
+    Returns:
+        GraphArrays object
+    """
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ValueError('{} holds no saved graph'.format(path))
+    if manifest.get('format') != FORMAT or manifest.get('version', 0) > VERSION:
+        raise ValueError('{} holds no saved graph of a supported version'.format(path))
+
+    names = ['indptr', 'indices', 'agent_codes', 'agent_ids']
+    for spec in list(manifest['nodes'].values()) + list(manifest['edges'].values()):
+        names += [spec['file'], spec['file'] + '_mask'] if spec['masked'] else [spec['file']]
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+              for name in names}
+    return GraphArrays(manifest, arrays)
+
+
+def _dicts(columns):
+    """Attribute dictionaries of the nodes or edges, from their attribute columns, or None if there are none"""
+    if not columns:
+        return None
+    names = tuple(columns)
+    rows = zip(*[np.asarray(column).tolist() for (column, _) in columns.values()])
+    masks = [(name, np.asarray(mask)) for (name, (_, mask)) in columns.items() if mask is not None]
+    dicts = [dict(zip(names, row)) for row in rows]
+    for name, mask in masks:
+        for ii in np.flatnonzero(~mask).tolist():
+            del dicts[ii][name]
+    return dicts
+
+
+def _fill_rows(neighbours, nodes, indptr, targets, dicts):
+    """Adds the neighbours of every node, with one dictionary update per node
+
+    Args:
+        neighbours: dictionary of {node: neighbour dictionary} of the graph
+        nodes: array of the nodes
+        indptr: offsets of the rows of every node into targets and dicts
+        targets: list of the neighbours, by rows
+        dicts: list of the edge attribute dictionaries, by rows
+    """
+    bounds = indptr.tolist()
+    for ii in np.flatnonzero(np.diff(indptr)).tolist():
+        start, stop = bounds[ii], bounds[ii + 1]
+        neighbours[nodes[ii]].update(zip(targets[start:stop], dicts[start:stop]))
+
+
+def to_graph(arrays):
+    """Builds a NetworkX graph from the arrays of a saved graph
+
+    Args:
+        arrays: GraphArrays object, as returned by `load`
+
+    Returns:
+        NetworkX graph object
+    """
+    manifest = arrays.manifest
+    if manifest['multigraph']:
+        graph = nx.MultiDiGraph() if manifest['directed'] else nx.MultiGraph()
+    else:
+        graph = nx.DiGraph() if manifest['directed'] else nx.Graph()
+    graph.graph.update(manifest['graph'])
+
+    ids = np.asarray(arrays.agent_ids)
+    codes = np.asarray(arrays.agent_codes)
+    nodes = np.empty(arrays.num_nodes, dtype=object)
+    plain = codes < 0
+    nodes[plain] = ids[plain].tolist()
+    for code, cls in enumerate(arrays.agents):
+        members = np.flatnonzero(codes == code)
+        if code in arrays.flyweights:
+            # a single flyweight agent drives all its nodes, which are plain indices
+            nodes[members] = ids[members].tolist()
+            graph.graph.setdefault('flyweights', {})[cls(arrays.flyweights[code])] = ids[members].tolist()
+        else:
+            nodes[members] = list(map(cls, ids[members].tolist()))
+
+    # nodes are added to the node and neighbour dictionaries directly, as NetworkX would with add_nodes_from
+    node_list = nodes.tolist()
+    node_dicts = _dicts(arrays.nodes)
+    if node_dicts is None:
+        node_dicts = [{} for _ in range(0, arrays.num_nodes)]
+    successors, predecessors = adjacency_dicts(graph)
+    node_dict(graph).update(zip(node_list, node_dicts))
+    successors.update(zip(node_list, [{} for _ in range(0, arrays.num_nodes)]))
+    if predecessors is not None:
+        predecessors.update(zip(node_list, [{} for _ in range(0, arrays.num_nodes)]))
+
+    sources = np.asarray(arrays.sources())
+    indices = np.asarray(arrays.indices)
+    edge_dicts = _dicts(arrays.edges)
+    if graph.is_multigraph():
+        targets = nodes[indices].tolist()
+        if edge_dicts is None:
+            graph.add_edges_from(zip(nodes[sources].tolist(), targets))
+        else:
+            graph.add_edges_from(zip(nodes[sources].tolist(), targets, edge_dicts))
+    else:
+        if edge_dicts is None:
+            edge_dicts = [{} for _ in range(0, arrays.num_edges)]
+        # fill the neighbour dictionaries of a node at once, from its rows of the adjacency matrix and its transpose
+        _fill_rows(successors, nodes, np.asarray(arrays.indptr), nodes[indices].tolist(), edge_dicts)
+        order = np.argsort(indices, kind='stable')
+        indptr = np.zeros(arrays.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=arrays.num_nodes), out=indptr[1:])
+        _fill_rows(successors if predecessors is None else predecessors, nodes, indptr,
+                   nodes[sources[order]].tolist(), [edge_dicts[ii] for ii in order.tolist()])
+    return graph
+
+
+def read_graph(path, mmap=True):
+    """Loads a graph saved with `save` as a NetworkX graph. See `load` and `to_graph`"""
+    return to_graph(load(path, mmap=mmap))
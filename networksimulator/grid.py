@@ -19,6 +19,22 @@ class BaseGrid(object):
             out = {names[ii]: point[ii] for ii in range(0, len(names))}
             yield out
 
+    def __len__(self):
+        size = 1
+        for values in self.grid.values():
+            size *= len(values)
+        return size
+
+    def point(self, index):
+        """Returns the grid point at the given position in the iteration order of the grid"""
+        if not 0 <= index < len(self):
+            raise IndexError('Grid point index out of range')
+        out = {}
+        for name, values in reversed(list(self.grid.items())):
+            index, ii = divmod(index, len(values))
+            out[name] = values[ii]
+        return {name: out[name] for name in self.grid}
+
     def add_dimensions(self, **kwargs):
         self.grid.update(kwargs)
         return self
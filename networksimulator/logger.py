@@ -3,37 +3,88 @@
 Very simple logging just to get going: store full graph state in memory every timestep and pickle
 and dump at the end.
 
+Loggers may also reduce the logged states into scalar summaries as the simulation runs, with the reducers of the
+`reducers` module, and skip logging the trajectory itself: with `trajectory` set to False no results file is written,
+and only the annotations and reduced values in `meta` are kept.
+
+For sparse, event-driven dynamics the `EventLogger` records only the state changes emitted through the simulation
+environment (see `NetworkEnvironment.emit`), rather than polling the whole state at a fixed interval.
 
 """
 
 import os
 import re
 import sys
+import gzip
+import shutil
 import pickle
 import datetime
 
 
 DEFAULT_BUFFER_SIZE = 1024 * 1024 * 200  # 200 MB default buffer
+GZIP_EXTENSION = '.gz'
+
+
+def compress(path, compresslevel=6):
+    """Compresses a closed results file with gzip, replacing it with the compressed file
+
+    Compressed results files are loaded transparently by the `results` module.
+
+    Args:
+        path: (string) path of the results file
+        compresslevel: (int) gzip compression level, from 1 (fastest) to 9 (smallest)
+
+    Returns:
+        Path of the compressed file, i.e. the original path with the '.gz' extension appended
+    """
+    path = os.path.normcase(path)
+    out = path + GZIP_EXTENSION
+    with open(path, 'rb') as src, gzip.open(out, 'wb', compresslevel=compresslevel) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+    return out
 
 
 class BaseLogger(object):
     """Base class for logging simulation signals
     """
 
-    def __init__(self, path_results, interval_log=1, buffer_size=DEFAULT_BUFFER_SIZE):
+    def __init__(self, path_results, interval_log=1, buffer_size=DEFAULT_BUFFER_SIZE, trajectory=True):
         """Constructor
 
         Args:
             path_results: (string) absolute path of results file
             interval_log: (int) interval at which to log model state
             buffer_size: (int) number of bytes to keep in memory before writing to file
+            trajectory: (bool) log the state at every interval. If False, only reducers are updated and no file is
+                written
         """
-        self.__file__ = open(os.path.normcase(path_results), 'ab')
+        self.path = path_results
+        self.meta = {}
+        self.reducers = {}
+        self.trajectory = trajectory
+        self.__file__ = None
         self.__state__ = []
         self.interval_log = interval_log
         self.size_buffer = buffer_size
         self.limit_num_state = 0
 
+    def _file(self):
+        """Opens the results file on first write"""
+        if self.__file__ is None:
+            self.__file__ = open(os.path.normcase(self.path), 'ab')
+        return self.__file__
+
+    def add_reducer(self, name, reducer):
+        """Adds a reducer, updated with every observed state, whose result is recorded under the given name in `meta`
+
+        Args:
+            name: (string) name of the reduced value
+            reducer: (reducers.Reducer) reducer object
+        """
+        self.reducers[name] = reducer
+        return self
+
     def register(self, graph, env):
         """Creates process instance of log method to run along with the simulation
 
@@ -55,9 +106,21 @@ class BaseLogger(object):
             SimPy.Event object, a timeout after one logging interval
         """
         while True:
-            self.save(self.get_state(graph))
+            self.observe(env.now, self.get_state(graph))
             yield env.timeout(self.interval_log)
 
+    def observe(self, time, data):
+        """Updates the reducers with a logged data-point, and saves it if the trajectory is logged
+
+        Args:
+            time: simulation time of the data-point
+            data: data-point, as returned by `get_state`
+        """
+        for reducer in self.reducers.values():
+            reducer.update(time, data)
+        if self.trajectory:
+            self.save(data)
+
     def save(self, data):
         """Writes data to stream or flushes buffer if no inputs are given
 
@@ -68,7 +131,7 @@ class BaseLogger(object):
             self.limit_num_state = int(self.size_buffer / sys.getsizeof(data))
 
         if len(self.__state__) >= self.limit_num_state:
-            pickle.dump(self.__file__, self.__state__)
+            pickle.dump(self.__state__, self._file())
             self.__state__ = [data]
         else:
             self.__state__.append(data)
@@ -87,12 +150,111 @@ class BaseLogger(object):
         """
         return graph
 
+    def annotate(self, **kwargs):
+        """Adds name/value pairs describing the run as a whole, e.g. why and when it stopped. These are written to
+        file on close, and loaded into the `meta` dictionary of the results
+        """
+        self.meta.update(kwargs)
+        return self
+
     def close(self):
-        """Writes the any remaining data-points held in the logger state to file and closes the file
+        """Records the results of the reducers in `meta`, then writes the any remaining data-points held in the logger
+        state, and any annotations, to file and closes the file. Without trajectory, no file is written and `path` is
+        set to None
         """
-        pickle.dump(self.__state__, self.__file__)
+        self.annotate(**{name: reducer.result() for (name, reducer) in self.reducers.items()})
+        if self.trajectory or self.__file__ is not None:
+            file = self._file()
+            pickle.dump(self.__state__, file)
+            if self.meta:
+                pickle.dump(self.meta, file)
+            file.close()
+        else:
+            self.path = None
         self.__state__ = []
-        self.__file__.close()
+
+
+class EventLogger(BaseLogger):
+    """Logger recording timestamped state changes as they are emitted by the simulation environment
+
+    Each record is the tuple returned by `get_event`, by default (time, node, changes). When `interval_log` is
+    non-zero, it is treated as a coalescing window: all changes to a node within one window are merged into a single
+    record, stamped with the time of that node's latest change in the window.
+    """
+
+    def __init__(self, path_results, interval_log=0, buffer_size=DEFAULT_BUFFER_SIZE):
+        """Constructor
+
+        Args:
+            path_results: (string) absolute path of results file
+            interval_log: (int) coalescing window. Zero records every change individually
+            buffer_size: (int) number of bytes to keep in memory before writing to file
+        """
+        super().__init__(path_results, interval_log=interval_log, buffer_size=buffer_size)
+        self.__window__ = None
+        self.__pending__ = {}
+
+    def register(self, graph, env):
+        """Subscribes the logger to the state-change events of the simulation environment
+
+        Args:
+            graph : (NetworkX.Graph) : Graph object - subject of simulation
+            env : (NetworkEnvironment) : Simulation environment
+        """
+        env.subscribe(self.record)
+        return self
+
+    def record(self, time, node, changes):
+        """Records a state-change event, or merges it into the current coalescing window
+
+        Args:
+            time: simulation time of the change
+            node: node whose state has changed
+            changes: (dict) changed attribute names and their new values
+        """
+        if not self.interval_log:
+            self.observe(time, self.get_event(time, node, changes))
+            return
+
+        if self.__window__ is not None and time >= self.__window__ + self.interval_log:
+            self.flush_window()
+        if self.__window__ is None:
+            self.__window__ = time
+
+        try:
+            pending = self.__pending__[node]
+        except KeyError:
+            self.__pending__[node] = (time, dict(changes))
+        else:
+            pending[1].update(changes)
+            self.__pending__[node] = (time, pending[1])
+
+    def flush_window(self):
+        """Saves the coalesced records of the current window, in the order of their times"""
+        for node, (time, changes) in sorted(self.__pending__.items(), key=lambda item: item[1][0]):
+            self.observe(time, self.get_event(time, node, changes))
+        self.__pending__ = {}
+        self.__window__ = None
+
+    def get_event(self, time, node, changes):
+        """Transforms a state-change event into the record passed to `save`. Overwrite this method to alter the
+        data-structure that gets logged.
+
+        Args:
+            time: simulation time of the change
+            node: node whose state has changed
+            changes: (dict) changed attribute names and their new values
+
+        Returns:
+            Object describing the state change
+        """
+        return time, node, changes
+
+    def close(self):
+        """Saves any pending coalesced records, then writes the remaining data-points to file and closes the file
+        """
+        self.flush_window()
+        super().close()
 
 
 class LoggerFactory(object):
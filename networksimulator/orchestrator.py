@@ -0,0 +1,228 @@
+"""Orchestrator module
+
+Runs the grid points of a simulation case through a pipeline of stages, with asyncio, so that the I/O-bound stages of
+some points overlap with the simulation of others:
+
+1. 'build': prepares the graph, environment and logger of the point (`BaseSimCase._start_point`)
+2. 'simulate': runs the simulation and closes the log (`BaseSimCase._simulate`)
+3. 'finalize': optionally compresses the results file with gzip (`logger.compress`)
+4. 'catalog': folds the results into the case's aggregator and summary table, if any, and appends the point to the
+   catalog file
+
+The first three stages run in an executor, a thread pool by default, and the last one in a thread of its own, which
+handles one point at a time, so that the event loop is never blocked and the aggregator, summary table and catalog
+file are only updated by one thread. Stages are connected by bounded queues, so that built but not yet simulated
+points do not pile up in memory, and the number of concurrent tasks of each stage may be set. Threads overlap file
+I/O and compression with simulation, but simulations themselves are bound by the interpreter lock; to spread
+simulations over several cores, see the `distributed` module.
+
+Points whose build, simulation, compression or cataloguing raises are counted as failed rather than done, and the
+error is recorded with the point and stage. Progress - points done and failed, throughput and estimated time
+remaining - is reported after every point to an optional callback, and written as JSON to an optional status file.
+For example:
+```
+orchestrator.Orchestrator(Case(), compress=True, status_path='status.json').run()
+```
+"""
+import os
+import json
+import time
+import asyncio
+import datetime
+from concurrent import futures
+from . import grid as nsg
+from . import logger
+
+STAGES = ('build', 'simulate', 'finalize', 'catalog')
+
+
+class Progress(object):
+    """Live progress of a sweep
+
+    Arguments:
+        total : (int) : Number of grid points of the sweep
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.failures = []
+        self.running = {stage: 0 for stage in STAGES}
+        self.start = time.monotonic()
+
+    def elapsed(self):
+        """Seconds since the start of the sweep"""
+        return time.monotonic() - self.start
+
+    def throughput(self):
+        """Points finished per second, counting failures"""
+        elapsed = self.elapsed()
+        return (self.done + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Estimated seconds remaining, or None before the first point is finished"""
+        throughput = self.throughput()
+        if not throughput:
+            return None
+        return (self.total - self.done - self.failed) / throughput
+
+    def status(self):
+        """Returns the progress as a JSON-serialisable dictionary"""
+        return {
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'running': dict(self.running),
+            'elapsed': self.elapsed(),
+            'throughput': self.throughput(),
+            'eta': self.eta(),
+            'failures': list(self.failures),
+        }
+
+
+class Orchestrator(object):
+    """Runs the grid points of a simulation case through concurrent pipeline stages
+
+    Arguments:
+        case : (BaseSimCase) : Simulation case, whose `reuse` attribute must not be set
+        concurrency : (dict) [optional] : Number of concurrent tasks per stage name. Defaults to one per stage. Catalog
+            tasks run one at a time whatever their number
+        queue_size : (int) [optional] : Maximum number of points waiting between two stages
+        executor : (concurrent.futures.Executor) [optional] : Executor of the build, simulate and finalize stages.
+            Defaults to a thread pool with one thread per concurrent task
+        compress : (bool|int) [optional] : Compress results files with gzip; an integer sets the compression level
+        progress : (callable) [optional] : Called with the `Progress` status dictionary after every point
+        status_path : (string) [optional] : Path of a JSON file holding the latest progress status
+        catalog_path : (string) [optional] : Path of a file to which a JSON line is appended for every finished point,
+            with its hash, parameters and results file path
+    """
+
+    def __init__(self, case, concurrency=None, queue_size=2, executor=None, compress=False, progress=None,
+                 status_path=None, catalog_path=None):
+        if case.reuse:
+            raise ValueError('Cases reusing their environment across grid points must be run sequentially')
+        self.case = case
+        self.concurrency = {stage: 1 for stage in STAGES}
+        self.concurrency.update(concurrency or {})
+        self.queue_size = queue_size
+        self.executor = executor
+        self.compress = compress
+        self.progress = progress
+        self.status_path = status_path
+        self.catalog_path = catalog_path
+        self.status = None
+
+    def run(self, points=None):
+        """Runs the sweep to completion
+
+        Arguments:
+            points : (iterable) [optional] : Grid points to run. Defaults to the whole grid of the case
+
+        Returns:
+            Final progress status dictionary
+        """
+        return asyncio.run(self.run_async(points))
+
+    async def run_async(self, points=None):
+        """Coroutine running the sweep, for use within a running event loop. See `run`"""
+        self.case.timestamp['start'] = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+        if points is None:
+            points = self.case._prepare_grid()
+        points = list(points)
+        self.status = Progress(len(points))
+        self._report()
+
+        executor = self.executor
+        if executor is None:
+            executor = futures.ThreadPoolExecutor(max_workers=sum(self.concurrency[s] for s in STAGES[:-1]))
+        catalog_executor = futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            queues = [asyncio.Queue(maxsize=self.queue_size) for _ in STAGES]
+            stages = [
+                self._stage('build', self._build, queues[0], queues[1], executor),
+                self._stage('simulate', self._simulate, queues[1], queues[2], executor),
+                self._stage('finalize', self._finalize, queues[2], queues[3], executor),
+                self._stage('catalog', self._catalog, queues[3], None, catalog_executor),
+            ]
+            await asyncio.gather(self._feed(points, queues[0]), *stages)
+        finally:
+            catalog_executor.shutdown()
+            if self.executor is None:
+                executor.shutdown()
+
+        self.case.timestamp['end'] = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+        return self._report()
+
+    async def _feed(self, points, queue):
+        for point in points:
+            await queue.put({'point': point})
+        for _ in range(0, self.concurrency['build']):
+            await queue.put(None)
+
+    async def _stage(self, name, function, inbox, outbox, executor):
+        """Runs the concurrent tasks of a stage until all tasks of the previous stage have finished"""
+        async def task():
+            loop = asyncio.get_running_loop()
+            while True:
+                item = await inbox.get()
+                if item is None:
+                    return
+                self.status.running[name] += 1
+                try:
+                    await loop.run_in_executor(executor, function, item)
+                except Exception as e:
+                    self._fail(item['point'], name, e)
+                    continue
+                finally:
+                    self.status.running[name] -= 1
+                if outbox is not None:
+                    await outbox.put(item)
+                else:
+                    self.status.done += 1
+                    self._report()
+
+        await asyncio.gather(*[task() for _ in range(0, self.concurrency[name])])
+        if outbox is not None:
+            following = STAGES[STAGES.index(name) + 1]
+            for _ in range(0, self.concurrency[following]):
+                await outbox.put(None)
+
+    def _build(self, item):
+        item['graph'], item['env'], item['log'] = self.case._start_point(item['point'])
+
+    def _simulate(self, item):
+        self.case._simulate(item.pop('env'), item['log'], raise_errors=True)
+        del item['graph']
+        item['path'] = item['log'].path
+
+    def _finalize(self, item):
+        if self.compress is not False and item['path'] is not None:
+            level = 6 if self.compress is True else self.compress
+            item['path'] = logger.compress(item['path'], compresslevel=level)
+
+    def _catalog(self, item):
+        point = item['point']
+        self.case._finish_point(point, item['path'], item['log'].meta)
+        if self.catalog_path is not None:
+            entry = {'hash': nsg.hash_grid_point(point), 'point': point, 'path': item['path'],
+                     'meta': item['log'].meta}
+            with open(self.catalog_path, 'a') as f:
+                f.write(json.dumps(entry, default=repr) + '\n')
+
+    def _fail(self, point, stage, error):
+        self.status.failed += 1
+        self.status.failures.append({'point': point, 'stage': stage, 'error': repr(error)})
+        self._report()
+
+    def _report(self):
+        """Passes the progress status to the callback and writes it to the status file"""
+        status = self.status.status()
+        if self.progress is not None:
+            self.progress(status)
+        if self.status_path is not None:
+            temp = self.status_path + '.tmp'
+            with open(temp, 'w') as f:
+                json.dump(status, f, default=repr)
+            os.replace(temp, self.status_path)  # readers never see a partly written file
+        return status
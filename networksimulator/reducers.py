@@ -0,0 +1,135 @@
+"""Reducers module
+
+Reducers compute scalar summaries of a run incrementally, as the logger observes the state of the simulation, e.g. the
+peak number of infected nodes, the time of that peak, or the time to extinction. They are attached to a logger with
+`BaseLogger.add_reducer`, or to all the grid points of a simulation case through `BaseSimCase.reducers`, and their
+results are recorded in the `meta` dictionary of the run. Together with `BaseSimCase.summary` and with trajectory
+logging switched off, sweeps then only store a row of summaries per grid point.
+
+Each reducer applies an optional `statistic` to the logged state - whatever the logger's `get_state` or `get_event`
+returns - before reducing it. For example:
+```
+case.reducers = {
+    'peak': reducers.Max(lambda state: state['infected']),
+    'peak_time': reducers.ArgMax(lambda state: state['infected']),
+    'extinction': reducers.FirstTime(lambda state: state['infected'] == 0),
+    'attack_rate': reducers.Final(lambda state: state['recovered'] / state['total']),
+}
+```
+"""
+
+
+class Reducer(object):
+    """Base class for reducers of the logged states of a run into a single value
+
+    Arguments:
+        statistic : (callable) [optional] : Function of the logged state returning the value reduced. Defaults to the
+            state itself
+    """
+    def __init__(self, statistic=None):
+        self.statistic = statistic
+        self.reset()
+
+    def value(self, state):
+        """Applies the statistic to a logged state"""
+        return self.statistic(state) if self.statistic is not None else state
+
+    def reset(self):
+        """Clears the reduced value, before a new run"""
+        pass
+
+    def update(self, time, state):
+        """Folds a logged state into the reduced value
+
+        Args:
+            time: simulation time at which the state was logged
+            state: logged state
+        """
+        raise NotImplementedError
+
+    def result(self):
+        """Returns the reduced value, None if no state was observed"""
+        raise NotImplementedError
+
+
+class Final(Reducer):
+    """Value of the statistic at the last observation"""
+    def reset(self):
+        self.__value__ = None
+
+    def update(self, time, state):
+        self.__value__ = self.value(state)
+
+    def result(self):
+        return self.__value__
+
+
+class Max(Reducer):
+    """Largest value of the statistic"""
+    def reset(self):
+        self.__value__ = None
+
+    def update(self, time, state):
+        value = self.value(state)
+        if self.__value__ is None or value > self.__value__:
+            self.__value__ = value
+
+    def result(self):
+        return self.__value__
+
+
+class Min(Reducer):
+    """Smallest value of the statistic"""
+    def reset(self):
+        self.__value__ = None
+
+    def update(self, time, state):
+        value = self.value(state)
+        if self.__value__ is None or value < self.__value__:
+            self.__value__ = value
+
+    def result(self):
+        return self.__value__
+
+
+class ArgMax(Reducer):
+    """Time at which the statistic first reached its largest value"""
+    def reset(self):
+        self.__value__ = None
+        self.__time__ = None
+
+    def update(self, time, state):
+        value = self.value(state)
+        if self.__value__ is None or value > self.__value__:
+            self.__value__ = value
+            self.__time__ = time
+
+    def result(self):
+        return self.__time__
+
+
+class Mean(Reducer):
+    """Mean of the statistic over the observations"""
+    def reset(self):
+        self.__count__ = 0
+        self.__mean__ = 0.0
+
+    def update(self, time, state):
+        self.__count__ += 1
+        self.__mean__ += (self.value(state) - self.__mean__) / self.__count__
+
+    def result(self):
+        return self.__mean__ if self.__count__ else None
+
+
+class FirstTime(Reducer):
+    """Time of the first observation at which the statistic is true, e.g. the time to extinction"""
+    def reset(self):
+        self.__time__ = None
+
+    def update(self, time, state):
+        if self.__time__ is None and self.value(state):
+            self.__time__ = time
+
+    def result(self):
+        return self.__time__
@@ -1,19 +1,40 @@
-"""
+"""Results module
+
+Loads the data logged by simulation runs, either one results file at a time or for a whole parameter grid. Results
+files compressed with gzip, see `logger.compress`, are read transparently.
+
+Results for a whole grid may also be exported to a columnar dataset: one table with a column per grid dimension, a
+`step` column holding the index of each logged state, and one column per state variable. Datasets are written one
+file per grid point, optionally partitioned into `dimension=value` sub-directories, alongside an index of the grid
+point held by each file. Reading a dataset only opens the files whose grid point can satisfy the given filters, and
+only loads the requested columns. NPZ needs no extra dependencies; Parquet and Arrow require `pyarrow` and dataframe
+views require `pandas`.
 
+Sweeps that only need a few scalar outputs per grid point may instead record them in a `SummaryTable`, an SQLite
+database with one row per grid point keyed by the hash of the point (see `BaseSimCase.summary` and the `reducers`
+module).
 """
 import os
 import glob
+import gzip
+import json
 import pickle
+import operator
+import numpy as np
+from . import aggregation
 from . import grid as nsg
+from .logger import GZIP_EXTENSION
+from .utils import sqlite_transaction
 
 
 class BaseResults(object):
     """
 
     """
-    def __init__(self, data):
+    def __init__(self, data, meta=None):
         self.open = True
         self.data = data
+        self.meta = meta if meta is not None else {}
 
     def finalize(self):
         self.open = False
@@ -33,20 +54,26 @@ class BaseResults(object):
     @classmethod
     def from_file(cls, file):
         data = []
+        meta = {}
         try:
             with file as f:
                 while True:
-                    data += pickle.load(f)
+                    chunk = pickle.load(f)
+                    if isinstance(chunk, dict):
+                        meta.update(chunk)  # annotations of the run, see BaseLogger.annotate
+                    else:
+                        data += chunk
         except EOFError:
             pass  # Reach end of saved data
         except FileNotFoundError as e:
             print(e)
 
-        return cls(data)
+        return cls(data, meta)
 
     @classmethod
     def from_path(cls, path):
-        file = open(os.path.normcase(path), 'rb')
+        path = os.path.normcase(path)
+        file = gzip.open(path, 'rb') if path.endswith(GZIP_EXTENSION) else open(path, 'rb')
         return cls.from_file(file)
 
 
@@ -62,11 +89,348 @@ def from_dir(path):
     pass
 
 
+def path_from_point(point, root):
+    pattern = '*' + nsg.hash_grid_point(point) + '*'
+    return glob.glob(os.path.join(root, pattern))[0]
+
+
 def from_grid(grid, root):
     results = []
     for point in grid:
-        pattern = '*' + nsg.hash_grid_point(point) + '*'
-        path = glob.glob(os.path.join(root, pattern))[0]
-        results.append(BaseResults.from_path(path))
+        results.append(BaseResults.from_path(path_from_point(point, root)))
 
     return results
+
+
+def aggregate_grid(grid, root, over=('seed',), statistic=None, **kwargs):
+    """Folds the results of every grid point into running statistics, loading one results file at a time
+
+    Args:
+        grid: BaseGrid object
+        root: directory containing the results files
+        over: names of the grid dimensions to aggregate over
+        statistic: Callable transforming the logged data of one run into a 1-D series
+        kwargs: passed on to `aggregation.Aggregator`
+
+    Returns:
+        aggregation.Aggregator object
+    """
+    agg = aggregation.Aggregator(over=over, statistic=statistic, **kwargs)
+    for point in grid:
+        agg.update(point, BaseResults.from_path(path_from_point(point, root)).data)
+
+    return agg
+
+
+FORMATS = ('npz', 'parquet', 'arrow')
+INDEX_FILE = '_index.pickle'
+
+FILTER_OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda a, b: np.isin(a, list(b)),
+    'not in': lambda a, b: np.logical_not(np.isin(a, list(b))),
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('The parquet and arrow formats require the pyarrow package')
+    return pyarrow
+
+
+def _state_columns(record):
+    """Maps a logged state to a dictionary of {column name: value}"""
+    if isinstance(record, dict):
+        return record
+    if np.ndim(record) == 0:
+        return {'state': record}
+    return {'state_%d' % ii: val for ii, val in enumerate(np.ravel(record))}
+
+
+def point_table(point, data, state=None):
+    """Builds the columnar table of the data logged for one grid point
+
+    Args:
+        point: (dict) grid point
+        data: logged data of the run, e.g. `BaseResults.data`
+        state: Callable mapping each logged record to a scalar, sequence or dictionary of state values. Defaults to the
+            record itself
+
+    Returns:
+        Dictionary of {column name: NumPy array}, all of the same length
+    """
+    rows = [_state_columns(state(rec) if state is not None else rec) for rec in data]
+    names = list(dict.fromkeys(name for row in rows for name in row))
+
+    clash = set(names).intersection(point).union({'step'}.intersection(names))
+    if clash:
+        raise ValueError('State columns clash with grid dimensions: {}'.format(sorted(clash)))
+
+    table = {name: np.full(len(rows), value) for name, value in point.items()}
+    table['step'] = np.arange(len(rows))
+    for name in names:
+        table[name] = np.asarray([row.get(name, np.nan) for row in rows])
+    return table
+
+
+def _write_table(table, path, fmt):
+    if fmt == 'npz':
+        np.savez(path, **table)
+    else:
+        pa = _import_pyarrow()
+        arrow_table = pa.table(table)
+        if fmt == 'parquet':
+            pa.parquet.write_table(arrow_table, path)
+        else:
+            pa.feather.write_feather(arrow_table, path)
+
+
+def _read_table(path, fmt, columns):
+    if fmt == 'npz':
+        with np.load(path, allow_pickle=False) as f:
+            names = f.files if columns is None else [c for c in columns if c in f.files]
+            return {name: f[name] for name in names}
+
+    pa = _import_pyarrow()
+    if fmt == 'parquet':
+        names = pa.parquet.read_schema(path).names
+        names = names if columns is None else [c for c in columns if c in names]
+        arrow_table = pa.parquet.read_table(path, columns=names)
+    else:
+        with pa.memory_map(path) as source:
+            names = pa.ipc.open_file(source).schema.names
+        names = names if columns is None else [c for c in columns if c in names]
+        arrow_table = pa.feather.read_table(path, columns=names)
+    return {name: arrow_table.column(name).to_numpy() for name in names}
+
+
+def export_grid(grid, root, path, fmt='npz', partition_by=(), state=None):
+    """Exports the results of every grid point to a columnar dataset, loading one results file at a time
+
+    Args:
+        grid: BaseGrid object
+        root: directory containing the results files
+        path: directory of the dataset to write
+        fmt: one of 'npz', 'parquet' or 'arrow'
+        partition_by: names of the grid dimensions by which to partition the dataset into sub-directories
+        state: Callable mapping each logged record to state values. See `point_table`
+
+    Returns:
+        Dataset object
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Unknown format {}, expected one of {}'.format(fmt, list(FORMATS)))
+
+    os.makedirs(os.path.normcase(path), exist_ok=True)
+    index = []
+    for point in grid:
+        table = point_table(point, BaseResults.from_path(path_from_point(point, root)).data, state)
+
+        subdir = os.path.join(*['{}={}'.format(k, point[k]) for k in partition_by]) if partition_by else ''
+        os.makedirs(os.path.join(path, subdir), exist_ok=True)
+        name = os.path.join(subdir, 'part-{}.{}'.format(nsg.hash_grid_point(point), fmt))
+
+        _write_table(table, os.path.join(path, name), fmt)
+        index.append((name, point))
+
+    with open(os.path.join(path, INDEX_FILE), 'wb') as f:
+        pickle.dump({'format': fmt, 'files': index}, f)
+
+    return Dataset(path)
+
+
+class Dataset(object):
+    """Columnar dataset of the results of a whole grid, as written by `export_grid`
+
+    Filters are sequences of (column, op, value) tuples, combined with logical and, where op is one of '==', '!=', '<',
+    '<=', '>', '>=', 'in' or 'not in'. Filters on grid dimensions are evaluated against the index, so that files of
+    non-matching grid points are never opened.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), 'rb') as f:
+            index = pickle.load(f)
+        self.format = index['format']
+        self.files = index['files']
+
+    def _select_files(self, filters):
+        selected = []
+        for name, point in self.files:
+            keep = True
+            for column, op, value in filters:
+                if column in point and not FILTER_OPS[op](point[column], value):
+                    keep = False
+                    break
+            if keep:
+                selected.append(name)
+        return selected
+
+    def read(self, columns=None, filters=()):
+        """Reads the dataset into a table
+
+        Args:
+            columns: names of the columns to load. Defaults to all columns
+            filters: sequence of (column, op, value) tuples selecting the rows to return
+
+        Returns:
+            Dictionary of {column name: NumPy array}
+        """
+        filters = list(filters)
+        needed = None if columns is None else list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+
+        parts = []
+        for name in self._select_files(filters):
+            table = _read_table(os.path.join(self.path, name), self.format, needed)
+            mask = np.ones(len(next(iter(table.values()))) if table else 0, dtype=bool)
+            for column, op, value in filters:
+                mask &= FILTER_OPS[op](table[column], value)
+            if columns is not None:
+                table = {c: table[c] for c in columns if c in table}
+            parts.append({c: v[mask] for c, v in table.items()})
+
+        names = list(dict.fromkeys(c for part in parts for c in part))
+        return {c: np.concatenate([part[c] for part in parts if c in part]) for c in names}
+
+    def to_dataframe(self, columns=None, filters=(), index=None):
+        """Reads the dataset into a pandas DataFrame
+
+        Args:
+            columns: names of the columns to load. Defaults to all columns
+            filters: sequence of (column, op, value) tuples selecting the rows to return
+            index: column, or list of columns, to set as the DataFrame index, e.g. ['seed', 'step']
+
+        Returns:
+            pandas.DataFrame object
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError('Dataframe views require the pandas package')
+        frame = pandas.DataFrame(self.read(columns, filters))
+        return frame.set_index(index) if index is not None else frame
+
+
+def read_dataset(path, columns=None, filters=()):
+    return Dataset(path).read(columns, filters)
+
+
+def _sql_value(value):
+    """Converts a value to a type stored natively by SQLite. Other values are stored as JSON text"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return json.dumps(value, default=repr)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SummaryTable(object):
+    """Table of scalar summaries of the runs of a sweep, with one row per grid point, held in an SQLite database
+
+    Rows are keyed by the hash of the grid point (see `grid.hash_grid_point`), in the 'hash' column, and hold the
+    dimensions of the point and the metrics of its run in columns of their own. Columns are added as new names appear.
+    Adding the row of a point again replaces it. Several processes may write to the same table.
+
+    Arguments:
+        path : (string) : Path of the SQLite database file, created if needed
+        timeout : (float) [optional] : Seconds to wait for the database lock
+    """
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS summary (hash TEXT PRIMARY KEY)')
+
+    def _connect(self, write=True):
+        """Opens a connection for a single transaction, see `utils.sqlite_transaction`"""
+        return sqlite_transaction(self.path, self.timeout, write=write)
+
+    @staticmethod
+    def _columns(db):
+        return [row[1] for row in db.execute('PRAGMA table_info(summary)')]
+
+    def add(self, point, metrics):
+        """Adds the row of a grid point
+
+        Args:
+            point: (dict) grid point
+            metrics: (dict) name/value pairs of the metrics of its run, e.g. the `meta` dictionary of its logger
+        """
+        clash = set(point).intersection(metrics).union({'hash'}.intersection(set(point).union(metrics)))
+        if clash:
+            raise ValueError('Metric names must differ from grid dimensions, and neither may be \'hash\': '
+                             '{}'.format(sorted(clash)))
+        row = {'hash': nsg.hash_grid_point(point)}
+        row.update((k, _sql_value(v)) for (k, v) in point.items())
+        row.update((k, _sql_value(v)) for (k, v) in metrics.items())
+
+        with self._connect() as db:
+            existing = set(self._columns(db))
+            for name in row:
+                if name not in existing:
+                    db.execute('ALTER TABLE summary ADD COLUMN {}'.format(_quote(name)))
+            db.execute('INSERT OR REPLACE INTO summary ({}) VALUES ({})'.format(
+                ', '.join(_quote(name) for name in row), ', '.join('?' * len(row))), list(row.values()))
+        return self
+
+    def get(self, point):
+        """Returns the row of a grid point as a dictionary, without the columns it has no value for
+
+        Raises:
+            KeyError if the grid point has no row
+        """
+        with self._connect(write=False) as db:
+            columns = self._columns(db)
+            row = db.execute('SELECT * FROM summary WHERE hash = ?', (nsg.hash_grid_point(point),)).fetchone()
+        if row is None:
+            raise KeyError(point)
+        return {name: value for (name, value) in zip(columns, row) if value is not None}
+
+    def read(self, columns=None):
+        """Reads the table
+
+        Args:
+            columns: names of the columns to load. Defaults to all columns
+
+        Returns:
+            Dictionary of {column name: NumPy array}
+        """
+        with self._connect(write=False) as db:
+            if columns is None:
+                columns = self._columns(db)
+            rows = db.execute('SELECT {} FROM summary ORDER BY rowid'.format(
+                ', '.join(_quote(name) for name in columns))).fetchall()
+        return {name: np.asarray([row[ii] for row in rows]) for (ii, name) in enumerate(columns)}
+
+    def to_dataframe(self, columns=None, index=None):
+        """Reads the table into a pandas DataFrame
+
+        Args:
+            columns: names of the columns to load. Defaults to all columns
+            index: column, or list of columns, to set as the DataFrame index, e.g. 'hash'
+
+        Returns:
+            pandas.DataFrame object
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError('Dataframe views require the pandas package')
+        frame = pandas.DataFrame(self.read(columns))
+        return frame.set_index(index) if index is not None else frame
+
+    def __len__(self):
+        with self._connect(write=False) as db:
+            return db.execute('SELECT COUNT(*) FROM summary').fetchone()[0]
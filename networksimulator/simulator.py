@@ -1,7 +1,9 @@
 """Simulation case and utility functions
 
 """
+import copy
 import datetime
+from . import results, streams
 
 
 class BaseSimCase(object):
@@ -10,13 +12,40 @@ class BaseSimCase(object):
     In order to define a simulation case, this class must be sub-classed, and the _prepare_* methods
     must be redefined.
 
+    Set the `reuse` attribute to True for sweeps whose grid points only differ in environment seeds or agent
+    parameters: the graph and environment are then built for the first point only, and reset with `_reset_env` for
+    every subsequent point, in which case `_reset_env` must be redefined as well.
+
+    Conditions in the `stop_conditions` list of (condition, interval) tuples are copied and added to the environment of
+    every grid point (see `NetworkEnvironment.add_stop_condition`), and may end runs before the runtime. The reason and
+    time at which each run stopped are recorded in the `meta` dictionary of its results, as 'stop_reason' and
+    'stop_time'.
+
+    Set the `aggregator` attribute to an `aggregation.Aggregator` to fold the logged results of each grid point into
+    running statistics as soon as its run finishes. Unless given a seed of its own, the aggregator draws from the
+    ('aggregator',) stream below the case's `streams`, a `streams.RandomStreams` object rooted at the case's seed.
+
+    Reducers in the `reducers` dictionary of {name: reducers.Reducer} are copied and added to the logger of every grid
+    point, and compute scalar summaries of each run as it goes. Set the `summary` attribute to a `results.SummaryTable`
+    to record these, along with the stop reason and time, in one row per grid point. Set `trajectory` to False to skip
+    logging the trajectories themselves, so that no results files are written.
+
     Arguments:
         runtime : (int) [optional] : The runtime of the simulation
+        seed : (int|SeedSequence|RandomStreams) [optional] : Root seed of the case's random streams
     """
 
-    def __init__(self, runtime=0):
+    def __init__(self, runtime=0, seed=None):
         self.grid = None
         self.runtime = runtime
+        self.streams = streams.RandomStreams(seed)
+        self.reuse = False
+        self.stop_conditions = []
+        self.aggregator = None
+        self.reducers = {}
+        self.trajectory = True
+        self.summary = None
+        self.__reusable__ = None
         self.success = False
         self.timestamp = {
             'start': None,
@@ -30,21 +59,101 @@ class BaseSimCase(object):
         """
         self.timestamp['start'] = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
 
+        self.__reusable__ = None
         for point in self._prepare_grid():
-            graph = self._prepare_graph(**point)
-            env = self._prepare_env(graph, **point)
-            log = self._prepare_logger(graph, env, **point)
-
-            try:
-                env.run(until=self.runtime)
-            except Exception as e:
-                print(e)
-            log.close()
+            self.run_point(point)
 
             # self.timestamp[grid.hash_grid_point(point)].append(datetime.datetime.now().strftime('%Y%m%dT%H%M%S'))
 
+        self.__reusable__ = None
         self.timestamp['end'] = datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
 
+    def run_point(self, point, raise_errors=False):
+        """Execute the simulation for a single grid point and log the outputs
+
+        Arguments:
+            point : (dict) : key-value pairs determining the grid point parameters
+            raise_errors : (bool) [optional] : Re-raise errors of the simulation, rather than printing them, see
+                `_simulate`
+
+        Returns:
+            The closed logger of the run
+        """
+        graph, env, log = self._start_point(point)
+        self._simulate(env, log, raise_errors=raise_errors)
+        self._finish_point(point, log.path, log.meta)
+        return log
+
+    def _start_point(self, point):
+        """Prepares, or resets when `reuse` is set, the graph, environment and logger of a grid point
+
+        Arguments:
+            point : (dict) : key-value pairs determining the grid point parameters
+
+        Returns:
+            Tuple of (graph, environment, logger)
+        """
+        if self.reuse and self.__reusable__ is not None:
+            graph, env = self.__reusable__
+            self._reset_env(graph, env, **point)
+        else:
+            graph = self._prepare_graph(**point)
+            env = self._prepare_env(graph, **point)
+            for condition, interval in self.stop_conditions:
+                env.add_stop_condition(copy.deepcopy(condition), interval)
+            if self.reuse:
+                env.take_snapshot()
+                self.__reusable__ = (graph, env)
+        log = self._prepare_logger(graph, env, **point)
+        for name, reducer in self.reducers.items():
+            reducer = copy.deepcopy(reducer)
+            reducer.reset()
+            log.add_reducer(name, reducer)
+        if not self.trajectory:
+            log.trajectory = False
+        return graph, env, log
+
+    def _simulate(self, env, log, raise_errors=False):
+        """Runs the environment until the runtime, records why and when it stopped, and closes the logger
+
+        Arguments:
+            env : (NetworkEnvironment) : Simulation environment
+            log : (BaseLogger) : Logger registered with the environment
+            raise_errors : (bool) [optional] : Re-raise errors of the simulation once the logger is closed, rather than
+                printing them
+        """
+        error = None
+        try:
+            env.run(until=self.runtime)
+        except Exception as e:
+            error = e
+
+        stop_reason = getattr(env, 'stop_reason', None)
+        if error is not None:
+            stop_reason = 'error'
+        log.annotate(stop_reason=stop_reason if stop_reason is not None else 'runtime', stop_time=env.now)
+        log.close()
+        if error is not None:
+            if raise_errors:
+                raise error
+            print(error)
+        return log
+
+    def _finish_point(self, point, path, meta=None):
+        """Folds the logged results of a grid point into the aggregator, and records its summary, if any
+
+        Arguments:
+            point : (dict) : key-value pairs determining the grid point parameters
+            path : (string) : Path of the results file of the grid point, None if no file was written
+            meta : (dict) [optional] : Annotations and reduced values of the run, see `BaseLogger.meta`
+        """
+        if self.aggregator is not None and path is not None:
+            if self.aggregator.streams is None:
+                self.aggregator.streams = self.streams.streams('aggregator')
+            self.aggregator.update(point, results.from_path(path).data)
+        if self.summary is not None:
+            self.summary.add(point, meta or {})
+
     def _prepare_grid(self):
         """Creates and returns the parameter grid determining the parameters of each sim case.
 
@@ -72,6 +181,17 @@ class BaseSimCase(object):
         """
         raise NotImplementedError
 
+    def _reset_env(self, graph, env, **kwargs):
+        """Resets the environment of the previous grid point for the given one, when `reuse` is set.
+
+        Typically calls `env.reset` with the seed of the grid point, and sets any agent parameters on the graph.
+        This method should be deterministic
+
+        Arguments:
+            kwargs : (dict) : key-value pairs determining the grid point parameters
+        """
+        raise NotImplementedError
+
     def _prepare_logger(self, graph, env, **kwargs):
         """Creates and returns the NetworkX graph object on which each sim case is run
 
@@ -0,0 +1,91 @@
+"""Random streams module
+
+Reproducible, independent random number streams derived from a single root seed with NumPy's `SeedSequence`.
+
+Every stream is identified by a path of keys below the root, for example ('point', grid point) or ('agent', agent).
+Keys are mapped to integers deterministically - independently of the process, of Python's hash randomisation and of
+the order in which streams are requested - so that the draws of each grid point, environment or agent are the same
+whether runs are executed serially, in parallel or in a different order. Streams use the PCG64 bit generator.
+
+For example, to give every grid point its own streams below a root seed:
+```
+def _prepare_env(self, graph, **kwargs):
+    return environment.NetworkEnvironment(graph, seed=streams.RandomStreams(1234).point(kwargs))
+```
+"""
+import hashlib
+import pickle
+from numpy import random
+from . import grid as nsg
+
+
+def stable_key(obj):
+    """Maps an object to a non-negative integer, deterministically across processes
+
+    Args:
+        obj: Non-negative integer, agent, class, or any picklable object
+
+    Returns:
+        Non-negative integer
+    """
+    if isinstance(obj, int) and not isinstance(obj, bool) and obj >= 0:
+        return obj
+    if isinstance(obj, type):
+        obj = ('class', obj.__module__, obj.__qualname__)
+    elif hasattr(obj, 'agent_id'):
+        obj = ('agent', type(obj).__module__, type(obj).__qualname__, obj.agent_id)
+    return int(hashlib.sha1(pickle.dumps(obj, protocol=2)).hexdigest()[:16], 16)
+
+
+def seed_sequence_from(rng):
+    """Derives a SeedSequence from the current state of a RandomState or Generator, advancing its state
+
+    Args:
+        rng: Instance of NumPy's RandomState or Generator object
+
+    Returns:
+        SeedSequence object
+    """
+    try:
+        words = rng.integers(0, 2 ** 32, size=4)
+    except AttributeError:
+        words = rng.randint(0, 2 ** 32, size=4)
+    return random.SeedSequence([int(w) for w in words])
+
+
+class RandomStreams(object):
+    """Tree of independent random streams below a root seed"""
+    def __init__(self, seed=None):
+        """Constructor
+
+        Args:
+            seed: Integer root seed, SeedSequence, or RandomStreams object. If None, fresh entropy is used
+        """
+        if isinstance(seed, RandomStreams):
+            seed = seed.seed_sequence
+        self.seed_sequence = seed if isinstance(seed, random.SeedSequence) else random.SeedSequence(seed)
+
+    def child(self, *keys):
+        """Returns the SeedSequence of the stream identified by the given path of keys"""
+        root = self.seed_sequence
+        return random.SeedSequence(
+            root.entropy,
+            spawn_key=tuple(root.spawn_key) + tuple(stable_key(k) for k in keys),
+            pool_size=root.pool_size
+        )
+
+    def streams(self, *keys):
+        """Returns the RandomStreams object rooted at the given path of keys"""
+        return RandomStreams(self.child(*keys))
+
+    def point(self, point):
+        """Returns the RandomStreams object of a grid point"""
+        return self.streams('point', int(nsg.hash_grid_point(point)[:16], 16))
+
+    def generator(self, *keys):
+        """Returns a PCG64-based Generator for the stream identified by the given path of keys"""
+        return random.Generator(random.PCG64(self.child(*keys)))
+
+    def random_state(self, *keys):
+        """Returns a PCG64-based RandomState, with NumPy's legacy interface, for the given path of keys"""
+        return random.RandomState(random.PCG64(self.child(*keys)))
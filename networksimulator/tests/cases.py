@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Agents, logger and simulation case shared by the tests
+"""
+from .. import agents, environment, grid, logger, simulator
+
+
+class Agent(agents.BaseAgent):
+    def run(self, graph, env):
+        while True:
+            yield env.timeout(1)
+
+
+class OtherAgent(Agent):
+    pass
+
+
+class Logger(logger.BaseLogger):
+    def get_state(self, graph):
+        return graph.graph['x']
+
+
+class Case(simulator.BaseSimCase):
+    """Simulation case logging each grid point with `logger_class` to a file in `root` named after the point's hash
+
+    Sub-classes define the grid and the graphs.
+    """
+    logger_class = Logger
+
+    def __init__(self, root, runtime, seed=None):
+        super().__init__(runtime=runtime, seed=seed)
+        self.root = root
+
+    def _prepare_env(self, graph, **kwargs):
+        return environment.NetworkEnvironment(graph)
+
+    def _prepare_logger(self, graph, env, **kwargs):
+        factory = logger.LoggerFactory(self.logger_class, self.root)
+        factory.id = grid.hash_grid_point(kwargs)
+        return factory.build().register(graph, env)
@@ -2,8 +2,10 @@
 """
 
 """
+import copy
+import pickle
 import networkx as nx
-from .. import agents
+from .. import agents, builders, environment
 
 
 class Agent(agents.BaseAgent):
@@ -57,3 +59,75 @@ def test_can_select_node_with_agent_index():
 
     assert G.node[Agent(1)]['state']
     assert not G.node[Agent(2)]['state']
+
+
+class SlottedAgent(agents.BaseAgent):
+    __slots__ = ()
+
+    def run(self, graph, env):
+        yield env.timeout(1)
+
+
+def test_slotted_agents_have_no_instance_dictionary():
+    agent = SlottedAgent(1)
+
+    assert not hasattr(agent, '__dict__')
+    assert hash(agent) == hash(SlottedAgent(1))
+    assert agent != Agent(1)
+
+
+def test_agents_survive_pickling():
+    one = Agent(1)
+    one.label = 'first'
+
+    copy = pickle.loads(pickle.dumps(one))
+
+    assert copy == one
+    assert hash(copy) == hash(one)
+    assert copy.label == 'first'
+    assert pickle.loads(pickle.dumps(SlottedAgent(3))) == SlottedAgent(3)
+
+
+class StatefulAgent(SlottedAgent):
+    __slots__ = ('label', '__secret', 'unset')
+
+    def __init__(self, agent_id, label=None):
+        super().__init__(agent_id)
+        self.label = label
+        self.__secret = agent_id * 2
+
+    def secret(self):
+        return self.__secret
+
+
+def test_agents_with_slots_survive_pickling_and_copying():
+    agent = StatefulAgent(4, label='fourth')
+
+    for clone in [pickle.loads(pickle.dumps(agent)), copy.deepcopy(agent), copy.copy(agent)]:
+        assert clone == agent
+        assert hash(clone) == hash(agent)
+        assert clone.label == 'fourth'
+        assert clone.secret() == 8
+        assert not hasattr(clone, 'unset')
+
+
+class Flyweight(agents.FlyweightAgent):
+    def run_node(self, node, graph, env):
+        while True:
+            graph.nodes[node]['steps'] += 1
+            yield env.timeout(1)
+
+
+def test_flyweight_agent_drives_many_nodes():
+    b = builders.NodeListBuilder()
+    b.size = 50
+    b.agent = Flyweight
+    graph = nx.Graph()
+    graph.add_nodes_from(b.build(graph), steps=0)
+
+    (agent, nodes), = graph.graph['flyweights'].items()
+    assert agent == Flyweight()
+    assert nodes == list(range(0, 50))
+
+    environment.NetworkEnvironment(graph).run(until=3)
+    assert all(attr['steps'] == 3 for (_, attr) in graph.nodes(data=True))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import aggregation, environment, grid, results, streams
+from . import cases
+import networkx as nx
+import numpy as np
+
+
+def test_running_stats_match_batch_statistics():
+    rng = np.random.RandomState(4)
+    series = rng.normal(3, 2, size=(50, 20))
+
+    stats = aggregation.RunningStats()
+    for row in series:
+        stats.update(row)
+
+    np.testing.assert_allclose(stats.mean, series.mean(axis=0))
+    np.testing.assert_allclose(stats.variance(), series.var(axis=0, ddof=1))
+    np.testing.assert_allclose(stats.min, series.min(axis=0))
+    np.testing.assert_allclose(stats.max, series.max(axis=0))
+    assert all(stats.count == 50)
+
+
+def test_running_stats_with_series_of_different_lengths():
+    stats = aggregation.RunningStats().update([1, 2, 3]).update([3, 4])
+
+    np.testing.assert_allclose(stats.mean, [2, 3, 3])
+    np.testing.assert_array_equal(stats.count, [2, 2, 1])
+    assert np.isnan(stats.variance()[2])
+
+
+def test_reservoir_memory_is_bounded():
+    sketch = aggregation.ReservoirQuantiles(size=10, seed=np.random.RandomState(0))
+    for ii in range(0, 1000):
+        sketch.update(np.full(5, ii))
+
+    assert len(sketch.reservoir) == 10
+    assert sketch.seen == 1000
+    median = sketch.quantile(0.5)
+    assert median.shape == (5,)
+    assert 100 < median[0] < 900
+
+
+def test_aggregator_groups_over_dimensions():
+    agg = aggregation.Aggregator(over=('seed',), statistic=np.cumsum)
+    for beta in [1, 2]:
+        for seed in range(0, 4):
+            agg.update({'seed': seed, 'beta': beta}, [beta, seed])
+
+    assert len(agg.groups) == 2
+    summary = agg.summary({'beta': 2})
+    np.testing.assert_allclose(summary['mean'], [2, 3.5])
+    assert summary['quantiles'].shape == (3, 2)
+    assert sorted(point['beta'] for point, _ in agg) == [1, 2]
+
+
+def test_reservoirs_are_reproducible_per_group():
+    def retained(seed, betas):
+        agg = aggregation.Aggregator(over=('seed',), reservoir_size=3, seed=seed)
+        for beta in betas:
+            for ii in range(0, 50):
+                agg.update({'seed': ii, 'beta': beta}, [ii])
+        return [agg.summary({'beta': beta})['quantiles'].tolist() for beta in [1, 2]]
+
+    assert retained(3, [1, 2]) == retained(streams.RandomStreams(3), [2, 1])
+    assert retained(3, [1, 2]) != retained(4, [1, 2])
+
+    sketch = aggregation.ReservoirQuantiles(size=3, seed=np.random.default_rng(0))
+    for ii in range(0, 50):
+        sketch.update([ii])
+    assert len(sketch.reservoir) == 3
+
+
+class Case(cases.Case):
+    def __init__(self, root, seed=None):
+        super().__init__(root, runtime=5, seed=seed)
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(seed=[0, 1, 2, 3], scale=[1])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        graph = nx.Graph(x=kwargs['seed'] * kwargs['scale'])
+        graph.add_nodes_from([cases.Agent(ii) for ii in range(0, 3)])
+        return graph
+
+    def _prepare_env(self, graph, **kwargs):
+        return environment.NetworkEnvironment(graph, seed=kwargs['seed'])
+
+
+def test_simcase_folds_each_finished_run(tmp_path):
+    case = Case(str(tmp_path))
+    case.aggregator = aggregation.Aggregator(over=('seed',))
+    case.run()
+
+    summary = case.aggregator.summary({'scale': 1})
+    np.testing.assert_allclose(summary['mean'], np.full(5, 1.5))
+    assert all(summary['count'] == 4)
+
+
+def test_simcase_seeds_the_aggregator_from_its_streams(tmp_path):
+    quantiles = []
+    for seed in [1, 1]:
+        case = Case(str(tmp_path / str(len(quantiles))), seed=seed)
+        case.aggregator = aggregation.Aggregator(over=('seed',), reservoir_size=2)
+        case.run()
+        quantiles.append(case.aggregator.summary({'scale': 1})['quantiles'])
+
+    np.testing.assert_array_equal(quantiles[0], quantiles[1])
+
+
+def test_aggregate_grid_from_results_files(tmp_path):
+    case = Case(str(tmp_path))
+    case.run()
+
+    agg = results.aggregate_grid(case.grid, str(tmp_path), over=('seed',))
+
+    np.testing.assert_allclose(agg.summary({'scale': 1})['max'], np.full(5, 3))
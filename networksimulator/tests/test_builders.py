@@ -187,4 +187,306 @@ def test_can_build_edge_list_from_distribution():
 
 
 def test_building_edge_list_from_distribution_gives_statistically_correct_results():
-    pass
\ No newline at end of file
+    pass
+
+
+class OtherAgent(agents.BaseAgent):
+    def run(self, graph, env):
+        yield env.timeout(1)
+
+
+def test_bulk_node_build_matches_node_list():
+    b = builders.NodeListBuilder(np.random.RandomState(5))
+    b.size = 20
+    b.agent = NodeAgent
+    b.add(d=4, e=('uniform', [0, 1], {}))
+    nlist = b.build(nx.Graph())
+
+    b.__rng__.seed(5)
+    g = b.add_to(nx.Graph())
+
+    assert g.number_of_nodes() == 20
+    for node, attr in nlist:
+        assert g.nodes[node] == attr
+
+
+def test_bulk_node_build_with_per_agent_class_attributes():
+    b = builders.NodeListBuilder(np.random.RandomState(5))
+    b.size = 10
+    b.agent = NodeAgent
+    b.add(f=1)
+    b.add_for(NodeAgent, f=2, g=('uniform', [5, 1], {}))
+    b.add_for(OtherAgent, h=3)
+
+    g = b.add_to(nx.Graph())
+
+    for node, attr in g.nodes(data=True):
+        assert attr['f'] == 2
+        assert 5 <= attr['g'] < 6
+        assert 'h' not in attr
+
+
+def test_node_build_with_exact_agent_class_proportions():
+    b = builders.NodeListBuilder(None)
+    b.size = 10
+    b.set_mix({NodeAgent: 2, OtherAgent: 1})
+
+    g = b.add_to(nx.Graph())
+
+    types = [type(node) for node in g.nodes()]
+    assert types.count(NodeAgent) == 7
+    assert types.count(OtherAgent) == 3
+    assert sorted(node.agent_id for node in g.nodes()) == list(range(0, 10))
+
+
+def test_node_build_with_sampled_agent_classes():
+    b = builders.NodeListBuilder(np.random.RandomState(2))
+    b.size = 2000
+    b.set_mix({NodeAgent: 0.25, OtherAgent: 0.75}, sample=True)
+    b.add_for(OtherAgent, other=True)
+
+    g = b.add_to(nx.Graph())
+
+    others = [node for node, attr in g.nodes(data=True) if attr.get('other')]
+    assert all(isinstance(node, OtherAgent) for node in others)
+    assert 1400 < len(others) < 1600
+
+
+def test_node_build_with_agent_classes_from_distribution():
+    b = builders.NodeListBuilder(np.random.RandomState(2))
+    b.size = 100
+    b.set_mix_by_distribution([NodeAgent, OtherAgent], ('binomial', [1, 0.5], {}))
+
+    nodes = b.build(nx.Graph())
+
+    assert {type(node) for node in nodes} == {NodeAgent, OtherAgent}
+
+
+def test_set_agents_requires_agent_classes():
+    with pytest.raises(TypeError):
+        builders.GraphFactory().set_agents({int: 1})
+
+
+@pytest.mark.parametrize('spec', [('normal', [0, 1], {}), (np.random.uniform, [-1, 1], {}), (stats.norm, [], {}),
+                                  ('integers', [0, 2], {})])
+def test_parallel_edge_sampling_is_independent_of_worker_count(spec):
+    edges = []
+    for workers in [1, 2, 3]:
+        rng = np.random.default_rng(11) if spec[0] == 'integers' else np.random.RandomState(11)
+        b = builders.EdgeListBuilder(rng)
+        b.from_dist(spec, 0.5)
+        b.workers = workers
+        b.block_size = 250
+        edges.append(b._sample_edges_parallel(60))
+
+    assert 0 < len(edges[0][0]) < 60 * 60
+    for sources, targets in edges[1:]:
+        np.testing.assert_array_equal(sources, edges[0][0])
+        np.testing.assert_array_equal(targets, edges[0][1])
+    pairs = edges[0][0] * 60 + edges[0][1]
+    assert np.all(np.diff(pairs) > 0)
+
+
+def test_parallel_graph_build_matches_serial_build():
+    edges = []
+    for workers in [1, 2]:
+        factory = builders.GraphFactory(np.random.RandomState(4))
+        factory.set_size(40)
+        factory.set_agent(NodeAgent)
+        factory.set_edge_by_distribution(('uniform', [0, 1]), 0.8)
+        factory.set_edge_attribute(w=('normal', [0, 1]))
+        factory.set_parallel(workers, block_size=200)
+        graph = factory.build()
+        edges.append(sorted((u.agent_id, v.agent_id, attr['w']) for (u, v, attr) in graph.edges(data=True)))
+
+    assert len(edges[0]) > 0
+    assert edges[1] == edges[0]
+
+
+def test_builders_do_not_share_attributes():
+    a, b = builders.NodeListBuilder(), builders.NodeListBuilder()
+    a.add(x=1)
+    b.size = 2
+
+    assert b.build(nx.Graph()) == [0, 1]
+    assert builders.EdgeListBuilder(np.random.RandomState(0)).__edge_dic__ == {}
+
+
+def spatial_builder(directed=False, size=300):
+    nb = builders.NodeListBuilder(np.random.RandomState(8))
+    nb.size = size
+    nb.add(x=('uniform', [0, 1]), y=('uniform', [0, 1]))
+    graph = nb.add_to(nx.DiGraph() if directed else nx.Graph())
+    return builders.EdgeListBuilder(np.random.RandomState(9)), graph
+
+
+def brute_force_pairs(graph, radius):
+    nodes = list(graph.nodes())
+    points = np.array([[graph.nodes[n]['x'], graph.nodes[n]['y']] for n in nodes])
+    dist = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1))
+    return {(nodes[i], nodes[j]) for i, j in zip(*np.nonzero(dist <= radius)) if i != j}
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_radius_edges_match_brute_force(directed):
+    eb, graph = spatial_builder(directed)
+    eb.from_radius(0.1, ('x', 'y'))
+
+    edges = {(u, v) for (u, v, _) in eb.build(graph)}
+
+    expected = brute_force_pairs(graph, 0.1)
+    if not directed:
+        expected = {(u, v) for (u, v) in expected if u < v}
+    assert len(edges) > 0
+    assert edges == expected
+
+
+def test_nearest_neighbour_edges():
+    eb, graph = spatial_builder(directed=True)
+    eb.from_nearest_neighbours(3, ('x', 'y'))
+    graph.add_edges_from(eb.build(graph))
+
+    nodes = list(graph.nodes())
+    points = np.array([[graph.nodes[n]['x'], graph.nodes[n]['y']] for n in nodes])
+    for ii, node in enumerate(nodes):
+        dist = np.sqrt(((points - points[ii]) ** 2).sum(axis=-1))
+        dist[ii] = np.inf
+        assert set(graph.successors(node)) == {nodes[jj] for jj in np.argsort(dist)[:3]}
+
+
+def test_nearest_neighbours_with_coincident_nodes():
+    graph = nx.Graph()
+    graph.add_nodes_from((ii, {'x': 0.0, 'y': 0.0}) for ii in range(0, 5))
+    eb = builders.EdgeListBuilder()
+    eb.from_nearest_neighbours(4, ('x', 'y'))
+
+    assert {(u, v) for (u, v, _) in eb.build(graph)} == {(u, v) for u in range(0, 5) for v in range(u + 1, 5)}
+
+
+def test_spatial_edges_filtered_by_array_callback():
+    eb, graph = spatial_builder()
+    eb.from_radius(0.1, ('x', 'y'), callback=lambda s, t, columns, rng: columns['x'][s] < 0.5)
+
+    edges = eb.build(graph)
+
+    assert len(edges) > 0
+    assert all(min(graph.nodes[u]['x'], graph.nodes[v]['x']) < 0.5 for (u, v, _) in edges)
+
+
+def test_array_callback_matches_pairwise_callback():
+    eb, graph = spatial_builder(size=50)
+    eb.block_size = 120
+    eb.from_array_callback(lambda s, t, columns, rng: columns['x'][s] + columns['y'][t] > 1)
+    vectorised = [(u, v) for (u, v, _) in eb.build(graph)]
+
+    eb.from_callback(lambda a, b, g, rng: g.nodes[a]['x'] + g.nodes[b]['y'] > 1)
+    pairwise = [(u, v) for (u, v, _) in eb.build(graph)]
+
+    assert len(vectorised) > 0
+    assert vectorised == pairwise
+
+
+def test_spatial_edges_require_coordinates():
+    eb, graph = spatial_builder(size=10)
+    eb.from_radius(0.1, ('x', 'z'))
+
+    with pytest.raises(ValueError):
+        eb.build(graph)
+
+
+def test_edge_attributes_are_sampled_for_every_edge_built():
+    eb, graph = spatial_builder()
+    eb.add(w=('uniform', [0, 1]), kind='contact')
+    eb.from_radius(0.1, ('x', 'y'))
+
+    edges = eb.build(graph)
+
+    assert len(edges) > 0
+    assert all(set(attr) == {'w', 'kind'} and 0 <= attr['w'] < 1 and attr['kind'] == 'contact'
+               for (_, _, attr) in edges)
+    assert len({attr['w'] for (_, _, attr) in edges}) == len(edges)
+
+    # undirected graph from a distribution: one sample per edge, without reversed duplicates or self-loops
+    b = builders.EdgeListBuilder(np.random.RandomState(2))
+    graph = nx.Graph()
+    graph.add_nodes_from(range(0, 7))
+    b.from_dist(('uniform', [0, 1]), 0.3)
+    b.add(w=('uniform', [0, 1]))
+
+    edges = b.build(graph)
+    graph.add_edges_from(edges)
+
+    assert len(edges) == graph.number_of_edges() > 0
+    assert nx.number_of_selfloops(graph) == 0
+    assert sorted(attr['w'] for (_, _, attr) in edges) == sorted(attr['w'] for (_, _, attr) in graph.edges(data=True))
+
+
+@pytest.mark.parametrize('graph_class', [nx.Graph, nx.DiGraph])
+def test_edge_limit_keeps_first_edges_with_their_attributes(graph_class):
+    b = builders.EdgeListBuilder(np.random.RandomState(4))
+    graph = graph_class()
+    graph.add_nodes_from(range(0, 6))
+    b.from_dist(('uniform', [0, 1]), 0.3)
+    b.add(w=('normal', [0, 1]))
+    edges = b.build(graph)
+    assert len(edges) > 8
+
+    b.__rng__.seed(4)
+    b.size = 8
+    limited = b.build(graph)
+    graph.add_edges_from(limited)
+
+    assert [(u, v) for (u, v, _) in limited] == [(u, v) for (u, v, _) in edges[:8]]
+    assert graph.number_of_edges() == 8
+    assert all('w' in attr for (_, _, attr) in graph.edges(data=True))
+
+
+def test_edge_attributes_from_end_nodes():
+    eb, graph = spatial_builder(size=100)
+    eb.from_radius(0.2, ('x', 'y'))
+    eb.add(weight=0)
+    eb.add_from_nodes(weight=lambda s, t, columns, rng: columns['x'][s] * columns['x'][t])
+
+    graph = eb.add_to(graph)
+
+    assert graph.number_of_edges() > 0
+    for u, v, attr in graph.edges(data=True):
+        assert attr['weight'] == pytest.approx(graph.nodes[u]['x'] * graph.nodes[v]['x'])
+
+
+def test_edge_attributes_from_end_nodes_must_have_one_value_per_edge():
+    eb, graph = spatial_builder(size=20)
+    eb.from_radius(0.5, ('x', 'y'))
+    eb.add_from_nodes(weight=lambda s, t, columns, rng: np.zeros(1))
+
+    with pytest.raises(ValueError):
+        eb.build(graph)
+    with pytest.raises(TypeError):
+        eb.add_from_nodes(weight=1)
+
+
+def test_graph_factory_without_edges():
+    factory = builders.GraphFactory()
+    factory.set_size(5)
+
+    graph = factory.build()
+
+    assert graph.number_of_nodes() == 5
+    assert graph.number_of_edges() == 0
+
+
+def test_graph_factory_edge_attributes_from_nodes():
+    factory = builders.GraphFactory(np.random.RandomState(5))
+    factory.set_size(30)
+    factory.set_node_attribute(vulnerable=('uniform', [0, 1]))
+    factory.set_edge_by_distribution(('uniform', [0, 1]), 0.8)
+    factory.set_edge_attribute(contact=1)
+    factory.set_edge_attribute_from_nodes(
+        risk=lambda s, t, columns, rng: columns['vulnerable'][s] + columns['vulnerable'][t])
+
+    graph = factory.build()
+
+    assert graph.number_of_edges() > 0
+    for u, v, attr in graph.edges(data=True):
+        assert attr['contact'] == 1
+        assert attr['risk'] == pytest.approx(graph.nodes[u]['vulnerable'] + graph.nodes[v]['vulnerable'])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import agents, distributed, grid, results
+from . import cases
+import networkx as nx
+import os
+import time
+
+RESULTS_DIR = 'NETSIM_TEST_RESULTS_DIR'
+
+
+class Case(cases.Case):
+    def __init__(self):
+        super().__init__(os.environ[RESULTS_DIR], runtime=3)
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(x=range(0, 4), y=[0, 1])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        if kwargs['x'] == 3 and kwargs['y'] == 1:
+            raise ValueError('bad point')
+        graph = nx.Graph(x=kwargs['x'])
+        graph.add_node(cases.Agent(0))
+        return graph
+
+
+def test_lease_expiry_and_retries(tmp_path):
+    queue = distributed.WorkQueue(str(tmp_path / 'queue.sqlite'), lease_time=0.2, max_attempts=2)
+    queue.enqueue([0, 1])
+
+    assert queue.lease('a') == 0
+    assert queue.lease('b') == 1
+    assert queue.lease('c') is None
+    assert queue.heartbeat(1, 'b')
+
+    time.sleep(0.3)
+    assert queue.lease('c') == 0
+    assert not queue.heartbeat(0, 'a')
+    assert not queue.ack(0, 'a')
+    assert queue.ack(0, 'c')
+
+    queue.fail(1, 'b', 'error')
+    assert queue.counts()[distributed.PENDING] == 1
+    assert queue.lease('c') == 1
+    time.sleep(0.3)
+    assert queue.lease('d') is None
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 1}
+    assert queue.finished()
+
+
+def test_point_succeeding_on_retry_has_no_error(tmp_path):
+    queue = distributed.WorkQueue(str(tmp_path / 'queue.sqlite'), max_attempts=2)
+    queue.enqueue([0])
+
+    assert queue.lease('a') == 0
+    queue.fail(0, 'a', 'error')
+    assert queue.errors() == {0: 'error'}
+    assert queue.lease('b') == 0
+    assert queue.ack(0, 'b')
+
+    assert queue.errors() == {}
+    assert queue.counts()[distributed.DONE] == 1
+
+
+def test_local_workers_run_whole_grid(tmp_path, monkeypatch):
+    monkeypatch.setenv(RESULTS_DIR, str(tmp_path / 'results'))
+    path = str(tmp_path / 'queue.sqlite')
+    queue = distributed.WorkQueue(path, max_attempts=2)
+    g = Case()._prepare_grid()
+    distributed.enqueue_grid(queue, g)
+
+    codes = distributed.run_local(path, Case, workers=3, poll=0.1)
+
+    assert codes == [0, 0, 0]
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 7, 'failed': 1}
+    assert list(queue.errors().keys()) == [7]
+    good = g.subgrid_from_values(x=[0, 1, 2], y=[0, 1])
+    assert [r.data for r in results.from_grid(good, str(tmp_path / 'results'))] == [[x] * 3 for x in [0, 0, 1, 1, 2, 2]]
+
+
+class CrashingAgent(agents.BaseAgent):
+    def run(self, graph, env):
+        yield env.timeout(1)
+        raise RuntimeError('crashed')
+
+
+class CrashingCase(Case):
+    def _prepare_graph(self, **kwargs):
+        graph = super()._prepare_graph(**kwargs)
+        if kwargs['x'] == 1:
+            graph.add_node(CrashingAgent(1))
+        return graph
+
+
+def test_worker_retries_and_records_simulation_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv(RESULTS_DIR, str(tmp_path / 'results'))
+    queue = distributed.WorkQueue(str(tmp_path / 'queue.sqlite'), max_attempts=2)
+    case = CrashingCase()
+    g = case._prepare_grid()
+    distributed.enqueue_grid(queue, g)
+
+    completed = distributed.Worker(queue, case, poll=0.01).run()
+
+    crashed = [idx for idx in range(0, len(g)) if g.point(idx)['x'] == 1]
+    assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 5, 'failed': 3}
+    assert sorted(completed) == [idx for idx in range(0, len(g)) if idx not in crashed + [7]]
+    errors = queue.errors()
+    assert sorted(errors) == crashed + [7]
+    assert all('crashed' in errors[idx] for idx in crashed)
@@ -0,0 +1,78 @@
+import pickle
+import pytest
+import numpy as np
+from scipy import stats
+from .. import distributions
+
+
+def spread(rng, low, high, size=None):
+    return low + (high - low) * rng.random_sample(size)
+
+
+@pytest.fixture
+def registered():
+    distributions.register('spread', spread, dtype=np.float32)
+    yield
+    distributions.unregister('spread')
+
+
+def test_names_resolve_to_scipy_before_rng_methods():
+    assert distributions.resolve('norm')[:2] == (distributions.SCIPY, stats.norm)
+    assert distributions.resolve('uniform')[:2] == (distributions.SCIPY, stats.uniform)
+    assert distributions.resolve('normal')[:2] == (distributions.RNG, 'normal')
+    assert distributions.resolve(np.random.normal)[:2] == (distributions.RNG, 'normal')
+
+
+def test_sampler_matches_rng_method():
+    sampler = distributions.make_sampler(('normal', [1, 2]), np.random.RandomState(4))
+
+    np.testing.assert_array_equal(sampler(5), np.random.RandomState(4).normal(1, 2, size=5))
+
+
+def test_scipy_sampler_does_not_modify_distribution():
+    state = stats.norm.random_state
+    sampler = distributions.make_sampler((stats.norm, [], {'scale': 2}), np.random.RandomState(4))
+
+    np.testing.assert_array_equal(sampler(5), stats.norm.rvs(scale=2, size=5, random_state=np.random.RandomState(4)))
+    assert stats.norm.random_state is state
+
+
+def test_dtypes():
+    rng = np.random.RandomState(0)
+    assert distributions.make_sampler(('poisson', [3]), rng).dtype == np.dtype(int)
+    assert distributions.make_sampler((stats.bernoulli(0.2), []), rng).dtype == np.dtype(int)
+    assert distributions.make_sampler(('gamma', [2]), rng)(3).dtype == np.dtype(float)
+
+
+def test_registered_sampler_takes_precedence(registered):
+    sampler = distributions.make_sampler(('spread', [5, 6]), np.random.RandomState(0))
+    samples = sampler(100)
+
+    assert samples.dtype == np.float32
+    assert np.all((5 <= samples) & (samples < 6))
+
+
+def test_unbound_sampler_can_be_pickled_and_bound(registered):
+    sampler = pickle.loads(pickle.dumps(distributions.make_sampler(('spread', [0, 1])).bind(None)))
+
+    np.testing.assert_array_equal(sampler.bind(np.random.RandomState(1))(3),
+                                  spread(np.random.RandomState(1), 0, 1, size=3).astype(np.float32))
+
+
+@pytest.mark.parametrize('spec, error', [
+    ('normal', TypeError),
+    (('normal',), TypeError),
+    (('normal', 1), TypeError),
+    (('normal', [0, 1], [1]), TypeError),
+    (('normal', [0, 1], {'size': 3}), ValueError),
+    (('not_a_distribution', []), ValueError),
+    ((len, []), TypeError),
+])
+def test_invalid_specifications_raise_on_creation(spec, error):
+    with pytest.raises(error):
+        distributions.make_sampler(spec, np.random.RandomState(0))
+
+
+def test_rng_method_requires_rng():
+    with pytest.raises(TypeError):
+        distributions.make_sampler(('normal', [0, 1]))
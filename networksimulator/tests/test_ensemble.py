@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import ensemble, logger, results
+import networkx as nx
+import numpy as np
+
+
+class SI(ensemble.BaseEnsemble):
+    beta = 0.3
+
+    def step(self, state):
+        pressure = self.neighbour_sum(state['sick'])
+        state['sick'] |= self.draw('random') < 1 - (1 - self.beta) ** pressure
+
+    def get_state(self, state):
+        return state['sick'].sum(axis=1).tolist()
+
+
+def build_graph():
+    graph = nx.path_graph(20)
+    for node, attr in graph.nodes(data=True):
+        attr['sick'] = node == 0
+    return graph
+
+
+def test_neighbour_sum():
+    graph = nx.DiGraph()
+    graph.add_edge('a', 'b', w=2)
+    graph.add_edge('c', 'b', w=3)
+    graph.add_edge('b', 'c', w=5)
+    for node, attr in graph.nodes(data=True):
+        attr['x'] = 1
+    e = ensemble.BaseEnsemble(graph, 2, ['x'], weight='w')
+
+    sums = e.neighbour_sum(e.state['x'] * np.array([[1], [10]]))
+
+    np.testing.assert_array_equal(sums, [[0, 5, 5], [0, 50, 50]])
+
+
+def test_replicates_do_not_depend_on_ensemble_size():
+    small = SI(build_graph(), 3, ['sick'], seed=9).run(30).results()
+    large = SI(build_graph(), 6, ['sick'], seed=9).run(30).results()
+
+    assert [r.data for r in small] == [r.data for r in large[:3]]
+    assert small[0].data[0] == 1
+    assert all(np.diff(r.data).min() >= 0 for r in large)
+    assert len({tuple(r.data) for r in large}) > 1
+
+
+def test_replicates_logged_to_results_files(tmp_path):
+    paths = [str(tmp_path / 'log_{}.pickle'.format(k)) for k in range(0, 4)]
+    loggers = [logger.BaseLogger(path) for path in paths]
+
+    e = SI(build_graph(), 4, ['sick'], seed=1).run(10, loggers=loggers)
+    for log in loggers:
+        log.close()
+
+    in_memory = SI(build_graph(), 4, ['sick'], seed=1).run(10).results()
+    assert e.now == 10
+    assert [results.from_path(path).data for path in paths] == [r.data for r in in_memory]
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import agents, environment, grid, logger, results
+from . import cases
+import networkx as nx
+import pytest
+
+
+class Agent(agents.BaseAgent):
+    def run(self, graph, env):
+        while True:
+            if env.draw('normal') > 0:
+                attr = graph.nodes[self]
+                attr['count'] = attr['count'] + 1
+            yield env.timeout(1)
+
+
+def build_graph(num_nodes=5):
+    graph = nx.Graph()
+    graph.add_nodes_from([(Agent(ii), {'count': 0}) for ii in range(0, num_nodes)])
+    return graph
+
+
+def counts(graph):
+    return [attr['count'] for (_, attr) in graph.nodes(data=True)]
+
+
+def test_reset_reproduces_fresh_environment():
+    fresh_graph = build_graph()
+    environment.NetworkEnvironment(fresh_graph, seed=7).run(until=20)
+
+    graph = build_graph()
+    env = environment.NetworkEnvironment(graph, seed=3, snapshot=True)
+    env.run(until=10)
+    env.reset(seed=7)
+    assert env.now == 0
+    assert counts(graph) == [0] * 5
+    env.run(until=20)
+
+    assert counts(graph) == counts(fresh_graph)
+
+
+def test_reset_without_snapshot_keeps_attributes_and_drops_subscribers():
+    graph = build_graph()
+    env = environment.NetworkEnvironment(graph, seed=1)
+    env.subscribe(lambda *args: None)
+    env.run(until=10)
+    before = counts(graph)
+
+    env.reset(seed=1, time_start=5)
+
+    assert env.now == 5
+    assert env.listeners == []
+    assert counts(graph) == before
+
+
+class Logger(logger.BaseLogger):
+    def get_state(self, graph):
+        return sum(counts(graph))
+
+
+class Case(cases.Case):
+    logger_class = Logger
+
+    def __init__(self, root, reuse):
+        super().__init__(root, runtime=10)
+        self.reuse = reuse
+        self.graphs_built = 0
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(seed=[0, 1, 2])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        self.graphs_built += 1
+        return build_graph()
+
+    def _prepare_env(self, graph, **kwargs):
+        return environment.NetworkEnvironment(graph, seed=kwargs['seed'])
+
+    def _reset_env(self, graph, env, **kwargs):
+        env.reset(seed=kwargs['seed'])
+
+
+def test_simcase_reuse_matches_reconstruction(tmp_path):
+    rebuilt = Case(str(tmp_path / 'rebuilt'), reuse=False)
+    rebuilt.run()
+    reused = Case(str(tmp_path / 'reused'), reuse=True)
+    reused.run()
+
+    assert rebuilt.graphs_built == 3
+    assert reused.graphs_built == 1
+    for r1, r2 in zip(results.from_grid(rebuilt.grid, str(tmp_path / 'rebuilt')),
+                      results.from_grid(reused.grid, str(tmp_path / 'reused'))):
+        assert r1.data == r2.data
+
+
+class BatchAgent(agents.BaseAgent):
+    batch_interval = 2
+
+    @classmethod
+    def step_batch(cls, nodes, graph, env):
+        for node in nodes:
+            graph.nodes[node]['count'] += 1
+
+
+def test_batch_agents_are_stepped_together():
+    graph = build_graph(3)
+    graph.add_nodes_from([(BatchAgent(ii), {'count': 0}) for ii in range(3, 10)])
+    env = environment.NetworkEnvironment(graph, seed=0)
+
+    env.run(until=10)
+
+    assert [graph.nodes[BatchAgent(ii)]['count'] for ii in range(3, 10)] == [5] * 7
+    assert list(env.batch_stats.keys()) == [BatchAgent]
+    assert env.batch_stats[BatchAgent]['nodes'] == 7
+    assert env.batch_stats[BatchAgent]['steps'] == 5
+
+
+class BatchFlyweight(agents.FlyweightAgent):
+    batch_interval = 5
+
+    def step_batch(self, nodes, graph, env):
+        for node in nodes:
+            graph.nodes[node]['count'] += self.agent_id
+
+
+def test_batch_stats_of_flyweight_instances_are_kept_apart():
+    graph = nx.Graph()
+    graph.add_nodes_from(range(0, 5), count=0)
+    graph.graph['flyweights'] = {BatchFlyweight(1): [0, 1], BatchFlyweight(2): [2, 3, 4]}
+    env = environment.NetworkEnvironment(graph, seed=0)
+
+    env.run(until=10)
+
+    assert [graph.nodes[node]['count'] for node in range(0, 5)] == [2, 2, 4, 4, 4]
+    assert {agent.agent_id: stats['nodes'] for agent, stats in env.batch_stats.items()} == {1: 2, 2: 3}
+    assert all(stats['steps'] == 2 for stats in env.batch_stats.values())
+
+
+def total_count(graph):
+    return sum(counts(graph))
+
+
+def test_absorbing_state_stops_simulation():
+    graph = build_graph()
+    env = environment.NetworkEnvironment(graph, seed=0)
+    env.add_stop_condition(environment.AbsorbingState(lambda g: total_count(g) >= 10, True, reason='ten'))
+
+    env.run(until=100)
+
+    assert env.stop_reason == 'ten'
+    assert env.now == env.stop_time < 100
+    assert total_count(graph) >= 10
+
+
+def test_steady_state_stops_simulation():
+    graph = build_graph()
+    env = environment.NetworkEnvironment(graph, seed=0)
+    env.add_stop_condition(environment.SteadyState(lambda g: min(total_count(g), 20), window=3), interval=2)
+
+    env.run(until=100)
+
+    assert env.stop_reason == 'SteadyState'
+    assert env.stop_time % 2 == 0
+    assert total_count(graph) >= 20
+
+
+def test_predicate_and_runtime():
+    env = environment.NetworkEnvironment(build_graph(), seed=0)
+    env.add_stop_condition(lambda g, e: False)
+
+    env.run(until=10)
+
+    assert env.stop_reason is None
+    assert env.now == 10
+
+
+@pytest.mark.parametrize('scheduler', ['heap', 'calendar'])
+def test_run_after_stop_is_not_ended_by_previous_until(scheduler):
+    env = environment.NetworkEnvironment(build_graph(), seed=0, scheduler=scheduler)
+    env.add_stop_condition(lambda graph, env: env.now >= 3)
+
+    env.run(until=10)
+    assert env.now == 3
+    env.run(until=20)
+    assert env.now == 20
+
+
+def test_stop_conditions_survive_reset():
+    env = environment.NetworkEnvironment(build_graph(), seed=0, snapshot=True)
+    env.add_stop_condition(lambda g, e: e.now >= 4, interval=2)
+    env.run(until=10)
+    assert env.stop_time == 4
+
+    env.reset(seed=0)
+    assert env.stop_reason is None
+    env.run(until=10)
+    assert env.stop_reason == 'Predicate'
+    assert env.stop_time == 4
+
+
+def test_simcase_records_stop_reason_in_results(tmp_path):
+    case = Case(str(tmp_path), reuse=True)
+    case.stop_conditions = [(environment.AbsorbingState(total_count, 6), 1)]
+    case.run()
+
+    r = results.from_grid(case.grid, str(tmp_path))
+    for res in r:
+        assert res.meta['stop_reason'] in ('AbsorbingState', 'runtime')
+        assert len(res.data) == res.meta['stop_time']
+    assert any(res.meta['stop_reason'] == 'AbsorbingState' for res in r)
+
+
+class TraceAgent(agents.BaseAgent):
+    """Agent with irregular delays, recording the order in which agents are resumed"""
+    def run(self, graph, env):
+        trace = graph.graph['trace']
+        delays = [1, 0, 0.5, 2, 1.5, 0, 1]
+        ii = self.agent_id
+        while True:
+            trace.append((env.now, self.agent_id))
+            if ii % 5 == 0:
+                yield env.all_of([env.timeout(1), env.timeout(delays[ii % 7])])
+            else:
+                yield env.timeout(delays[ii % 7])
+            ii += 1
+
+
+def trace_run(scheduler, stops=(7, 12.5, 20)):
+    graph = nx.Graph(trace=[])
+    graph.add_nodes_from(TraceAgent(ii) for ii in range(0, 12))
+    env = environment.NetworkEnvironment(graph, scheduler=scheduler)
+    for until in stops:
+        env.run(until=until)
+    return graph.graph['trace'], env.now
+
+
+def test_calendar_scheduler_matches_heap_ordering():
+    trace, now = trace_run('calendar')
+
+    assert (trace, now) == trace_run('heap')
+    assert now == 20
+    assert len(trace) > 100
+
+
+def test_queue_length_matches_between_schedulers():
+    lengths = {}
+    for scheduler in ['heap', 'calendar']:
+        graph = nx.Graph(trace=[])
+        graph.add_nodes_from(TraceAgent(ii) for ii in range(0, 12))
+        env = environment.NetworkEnvironment(graph, scheduler=scheduler)
+        lengths[scheduler] = [env.queue_length()]
+        for until in (7, 12.5, 20):
+            env.run(until=until)
+            lengths[scheduler].append(env.queue_length())
+        env.reset()
+        lengths[scheduler].append(env.queue_length())
+
+    assert lengths['calendar'] == lengths['heap']
+    assert lengths['heap'][0] == 12
+
+
+def test_calendar_scheduler_with_stop_conditions_and_reset():
+    stop_times = []
+    for scheduler in ['heap', 'calendar']:
+        graph = build_graph()
+        env = environment.NetworkEnvironment(graph, seed=0, snapshot=True, scheduler=scheduler)
+        env.add_stop_condition(environment.AbsorbingState(lambda g: total_count(g) >= 10, True))
+        env.run(until=100)
+        env.reset(seed=1)
+        env.run(until=100)
+        stop_times.append((env.stop_time, counts(graph)))
+
+    assert stop_times[0] == stop_times[1]
+
+
+def test_calendar_scheduler_propagates_failures():
+    def fail(env):
+        yield env.timeout(1)
+        raise ValueError('failed')
+
+    env = environment.NetworkEnvironment(nx.Graph(), scheduler='calendar')
+    env.process(fail(env))
+    with pytest.raises(ValueError, match='failed'):
+        env.run()
+    assert env.peek() == float('inf')
+
+
+def test_unknown_scheduler():
+    with pytest.raises(ValueError):
+        environment.NetworkEnvironment(nx.Graph(), scheduler='tree')
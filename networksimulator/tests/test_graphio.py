@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import agents, builders, environment, graphio
+from . import cases
+import networkx as nx
+import numpy as np
+import pytest
+
+
+class Flyweight(agents.FlyweightAgent):
+    def run_node(self, node, graph, env):
+        yield env.timeout(1)
+
+
+def factory_graph(factory):
+    factory.set_size(50)
+    factory.set_agents({cases.Agent: 0.6, cases.OtherAgent: 0.4})
+    factory.set_node_attribute(x=('uniform', [0, 1]), steps=0, sick=False, name='node')
+    factory.set_node_attribute_for(cases.OtherAgent, level=('poisson', [2]))
+    factory.set_edge_by_distribution(('uniform', [0, 1]), 0.9)
+    factory.set_edge_attribute(w=('normal', [0, 1]))
+    graph = factory.build()
+    graph.graph['name'] = 'test'
+    return graph
+
+
+def assert_same_graph(loaded, graph):
+    assert type(loaded) is type(graph)
+    assert loaded.graph == graph.graph
+    assert list(loaded.nodes(data=True)) == list(graph.nodes(data=True))
+    assert [type(node) for node in loaded.nodes()] == [type(node) for node in graph.nodes()]
+    assert canonical_edges(loaded) == canonical_edges(graph)
+
+
+def canonical_edges(graph):
+    key = lambda node: (type(node).__name__, getattr(node, 'agent_id', node))
+    edges = []
+    for u, v, attr in graph.edges(data=True):
+        pair = (key(u), key(v)) if graph.is_directed() else tuple(sorted((key(u), key(v))))
+        edges.append((pair, sorted(attr.items())))
+    return sorted(edges)
+
+
+@pytest.mark.parametrize('factory', [builders.GraphFactory, builders.DiGraphFactory, builders.MultiGraphFactory,
+                                     builders.MultiDiGraphFactory])
+def test_round_trip(tmp_path, factory):
+    graph = factory_graph(factory(np.random.RandomState(3)))
+    assert graph.number_of_edges() > 0
+
+    graphio.save(graph, str(tmp_path / 'graph'))
+    loaded = graphio.read_graph(str(tmp_path / 'graph'))
+
+    assert_same_graph(loaded, graph)
+
+
+def test_load_memory_maps_csr_arrays(tmp_path):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(0, 4))
+    graph.add_edges_from([(2, 0, {'w': 0.5}), (0, 1, {'w': 1.5}), (0, 3, {'w': 2.5})])
+
+    arrays = graphio.load(graphio.save(graph, str(tmp_path / 'graph')))
+
+    assert isinstance(arrays.indices, np.memmap)
+    np.testing.assert_array_equal(arrays.indptr, [0, 2, 2, 3, 3])
+    np.testing.assert_array_equal(arrays.indices, [1, 3, 0])
+    np.testing.assert_array_equal(arrays.sources(), [0, 0, 2])
+    np.testing.assert_array_equal(arrays.edges['w'][0], [1.5, 2.5, 0.5])
+    assert arrays.edges['w'][1] is None
+    assert not isinstance(graphio.load(str(tmp_path / 'graph'), mmap=False).indices, np.memmap)
+
+
+def test_round_trip_flyweights(tmp_path):
+    factory = builders.GraphFactory()
+    factory.set_size(10)
+    factory.set_agent(Flyweight)
+    graph = factory.build()
+
+    loaded = graphio.read_graph(graphio.save(graph, str(tmp_path / 'graph')))
+
+    assert list(loaded.nodes()) == list(range(0, 10))
+    flyweights = loaded.graph['flyweights']
+    assert [(type(agent), nodes) for (agent, nodes) in flyweights.items()] == [(Flyweight, list(range(0, 10)))]
+
+
+def test_round_trip_flyweight_instances(tmp_path):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(0, 4))
+    graph.graph['flyweights'] = {Flyweight(1): [0, 1], Flyweight(2): [2, 3]}
+
+    loaded = graphio.read_graph(graphio.save(graph, str(tmp_path / 'graph')))
+
+    flyweights = loaded.graph['flyweights']
+    assert {(type(agent), agent.agent_id): nodes for (agent, nodes) in flyweights.items()} == {
+        (Flyweight, 1): [0, 1], (Flyweight, 2): [2, 3]}
+
+
+def test_round_trip_mixed_numbers(tmp_path):
+    graph = nx.Graph()
+    graph.add_nodes_from([(0, {'x': 1}), (1, {'x': 2.5}), (2, {'flag': np.bool_(True)}), (3, {'flag': False})])
+
+    loaded = graphio.read_graph(graphio.save(graph, str(tmp_path / 'graph')))
+
+    assert [attr.get('x') for (_, attr) in loaded.nodes(data=True)] == [1.0, 2.5, None, None]
+    assert [attr.get('flag') for (_, attr) in loaded.nodes(data=True)] == [None, None, True, False]
+
+
+def test_file_graph_factory_builds_simulation_ready_graph(tmp_path):
+    path = graphio.save(factory_graph(builders.GraphFactory(np.random.RandomState(1))), str(tmp_path / 'graph'))
+
+    graph = builders.FileGraphFactory(path).build()
+    env = environment.NetworkEnvironment(graph)
+
+    # one initialisation event per agent process
+    assert env.queue_length() == graph.number_of_nodes() == 50
+    env.run(until=3)
+    assert env.now == 3
+
+
+def test_save_overwrites_previous_graph(tmp_path):
+    path = str(tmp_path / 'graph')
+    graphio.save(factory_graph(builders.GraphFactory(np.random.RandomState(1))), path)
+    graph = nx.path_graph(3)
+
+    assert_same_graph(graphio.read_graph(graphio.save(graph, path)), graph)
+
+
+@pytest.mark.parametrize('graph', [nx.Graph([('a', 'b')]), nx.Graph([(0, 1, {'w': [1, 2]})]),
+                                   nx.Graph([(0, 1, {'w': None})]), nx.Graph([(0, 1, {'w': 'a'}), (1, 2, {'w': 1})]),
+                                   nx.Graph([(0, 1, {'w': True}), (1, 2, {'w': 2.5})])])
+def test_save_rejects_untyped_graphs(tmp_path, graph):
+    with pytest.raises(ValueError):
+        graphio.save(graph, str(tmp_path / 'graph'))
+
+
+def test_load_requires_saved_graph(tmp_path):
+    with pytest.raises(ValueError):
+        graphio.load(str(tmp_path))
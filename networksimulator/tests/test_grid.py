@@ -53,3 +53,11 @@ def test_iteration():
         assert(point['x'] in range(0, 3))
         assert(point['y'] in range(0, 4))
         assert((point['x'], point['y']) in points_full)
+
+
+def test_point_by_index():
+    g = BaseGrid().add_dimensions(x=range(0, 3)).add_dimensions(y=['a', 'b']).add_dimensions(z=[0.5, 1.5])
+
+    assert len(g) == 12
+    assert [g.point(ii) for ii in range(0, len(g))] == list(g)
+    assert len(BaseGrid()) == len(list(BaseGrid()))
@@ -0,0 +1,83 @@
+import sys
+import inspect
+import json
+import subprocess
+import pytest
+
+HEAVY = ['scipy.stats', 'scipy.sparse', 'pandas', 'pyarrow']
+
+# Generous bound on the time spent importing the package's own modules, excluding NumPy, NetworkX and SimPy. It only
+# catches gross regressions, such as a heavy import creeping back to module level
+SELF_TIME_BOUND = 0.5
+
+SCRIPT = '''
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def run_import(module):
+    """Imports a module in a fresh interpreter and returns its import time and the heavy modules it loaded"""
+    out = subprocess.run([sys.executable, '-c', SCRIPT.format(module=module, heavy=HEAVY)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def package_self_time(module):
+    """Returns the cumulative self time, in seconds, of the networksimulator modules loaded by importing a module"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                         capture_output=True, text=True, check=True)
+    total = 0
+    for line in out.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip().startswith('networksimulator'):
+            total += int(fields[0].split(':')[1])
+    return total / 1e6
+
+
+def test_package_import_is_lazy():
+    data = run_import('networksimulator')
+    assert data['loaded'] == []
+
+    out = subprocess.run([sys.executable, '-c', 'import sys, networksimulator; print(len([m for m in sys.modules '
+                                                'if m.startswith("networksimulator.")]))'],
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '0'
+
+
+def test_package_submodule_attribute_access():
+    import networksimulator
+    assert networksimulator.streams.RandomStreams is not None
+    with pytest.raises(AttributeError):
+        networksimulator.not_a_module
+
+
+def test_package_star_import():
+    import networksimulator
+    namespace = {}
+    exec('from networksimulator import *', namespace)
+
+    assert all(inspect.ismodule(namespace[name]) for name in networksimulator.__all__)
+
+
+@pytest.mark.parametrize('module', ['agents', 'aggregation', 'builders', 'distributed', 'distributions', 'ensemble',
+                                    'environment', 'graphio', 'grid', 'logger', 'orchestrator', 'reducers', 'results',
+                                    'simulator', 'streams', 'tracing'])
+def test_no_heavy_imports(module):
+    data = run_import('networksimulator.' + module)
+    assert data['loaded'] == []
+    assert package_self_time('networksimulator.' + module) < SELF_TIME_BOUND
+
+
+def test_named_distribution_imports_scipy():
+    script = ('import sys; from numpy import random; from networksimulator import builders; '
+              'b = builders.NodeListBuilder(random.RandomState(0)); b.size = 10; '
+              'b.add(x=(random.RandomState.normal, [0, 1])); '
+              'before = "scipy.stats" in sys.modules; '
+              'b.add(y=("norm", [0, 1])); '
+              'print(before, "scipy.stats" in sys.modules)')
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ['False', 'True']
@@ -1,4 +1,5 @@
-from networksimulator import logger
+from networksimulator import agents, environment, logger, results
+import networkx as nx
 import pytest
 import os
 import shutil
@@ -24,4 +25,69 @@ def test_build_logger():
 
 
 def test_write_to_file(file):
-    pass
\ No newline at end of file
+    pass
+
+
+class SparseAgent(agents.BaseAgent):
+    """Agent changing state once every 10 time units"""
+    def run(self, graph, env):
+        while True:
+            yield env.timeout(10)
+            env.update_node(self, sick=True, count=env.now)
+
+
+def event_graph():
+    graph = nx.Graph()
+    graph.add_nodes_from([(SparseAgent(ii), {'sick': False}) for ii in range(0, 3)])
+    return graph
+
+
+def test_event_logger_records_each_emitted_change(tmp_path):
+    path = str(tmp_path / 'log_events.pickle')
+    graph = event_graph()
+    env = environment.NetworkEnvironment(graph)
+    log = logger.EventLogger(path).register(graph, env)
+
+    env.run(until=25)
+    log.close()
+
+    data = results.from_path(path).data
+    assert len(data) == 6
+    assert [time for (time, _, _) in data] == [10, 10, 10, 20, 20, 20]
+    assert data[0][1] == SparseAgent(0)
+    assert data[-1][2] == {'sick': True, 'count': 20}
+
+
+def test_event_logger_coalesces_changes_within_window(tmp_path):
+    path = str(tmp_path / 'log_events.pickle')
+    graph = event_graph()
+    env = environment.NetworkEnvironment(graph)
+    log = logger.EventLogger(path, interval_log=15).register(graph, env)
+
+    env.run(until=45)
+    log.close()
+
+    data = results.from_path(path).data
+    assert [time for (time, _, _) in data] == [20, 20, 20, 40, 40, 40]
+    assert all(changes == {'sick': True, 'count': time} for (time, _, changes) in data)
+
+
+def test_event_logger_saves_coalesced_records_in_time_order(tmp_path):
+    path = str(tmp_path / 'log_events.pickle')
+    log = logger.EventLogger(path, interval_log=10)
+
+    log.record(0, 'a', {'sick': True})
+    log.record(1, 'b', {'sick': True})
+    log.record(3, 'a', {'count': 1})
+    log.close()
+
+    data = results.from_path(path).data
+    assert data == [(1, 'b', {'sick': True}), (3, 'a', {'sick': True, 'count': 1})]
+
+
+def test_emit_without_subscribers_leaves_graph_state_updated():
+    graph = event_graph()
+    env = environment.NetworkEnvironment(graph)
+    env.run(until=11)
+
+    assert all(attr['sick'] for (_, attr) in graph.nodes(data=True))
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import pytest
+import networkx as nx
+from .. import agents, aggregation, environment, grid, logger, orchestrator, results
+from . import cases
+
+
+class CountingAgent(agents.BaseAgent):
+    def run(self, graph, env):
+        while True:
+            graph.graph['x'] += 1
+            yield env.timeout(1)
+
+
+class Case(cases.Case):
+    def __init__(self, root):
+        super().__init__(root, runtime=5)
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(x=range(0, 4), seed=[0, 1])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        if kwargs['x'] == 3 and kwargs['seed'] == 1:
+            raise ValueError('bad point')
+        graph = nx.Graph(x=kwargs['x'])
+        graph.add_node(CountingAgent(0))
+        return graph
+
+
+def test_orchestrated_sweep(tmp_path):
+    case = Case(str(tmp_path / 'results'))
+    case.aggregator = aggregation.Aggregator(over=('seed',))
+    statuses = []
+    orch = orchestrator.Orchestrator(case, concurrency={'build': 2, 'finalize': 2}, compress=True,
+                                     progress=statuses.append, status_path=str(tmp_path / 'status.json'),
+                                     catalog_path=str(tmp_path / 'catalog.jsonl'))
+
+    status = orch.run()
+
+    assert status['done'] == 7
+    assert status['failed'] == 1
+    assert status['failures'][0]['stage'] == 'build'
+    assert status['failures'][0]['point'] == {'x': 3, 'seed': 1}
+    assert status['eta'] == 0
+    # reported at the start, after every point, and at the end
+    assert [s['done'] + s['failed'] for s in statuses] == list(range(0, 9)) + [8]
+    with open(str(tmp_path / 'status.json')) as f:
+        assert json.load(f)['done'] == 7
+
+    files = os.listdir(str(tmp_path / 'results'))
+    assert len(files) == 7
+    assert all(f.endswith('.gz') for f in files)
+    for point in case.grid.subgrid_from_values(x=[0, 1, 2], seed=[0, 1]):
+        res = results.from_path(results.path_from_point(point, str(tmp_path / 'results')))
+        assert res.data == list(range(point['x'] + 1, point['x'] + 6))
+        assert res.meta['stop_reason'] == 'runtime'
+
+    with open(str(tmp_path / 'catalog.jsonl')) as f:
+        catalog = [json.loads(line) for line in f]
+    assert len(catalog) == 7
+    assert {entry['hash'] for entry in catalog} == {grid.hash_grid_point(e['point']) for e in catalog}
+    assert catalog[0]['meta']['stop_time'] == 5
+
+    assert case.aggregator.summary({'x': 2})['count'].tolist() == [2] * 5
+    assert case.aggregator.summary({'x': 3})['count'].tolist() == [1] * 5
+
+
+class CrashingAgent(agents.BaseAgent):
+    def run(self, graph, env):
+        yield env.timeout(2)
+        raise RuntimeError('crashed')
+
+
+class CrashingCase(Case):
+    def _prepare_graph(self, **kwargs):
+        graph = nx.Graph(x=kwargs['x'])
+        graph.add_node(CrashingAgent(0) if kwargs['x'] == 1 else CountingAgent(0))
+        return graph
+
+
+def test_simulation_errors_are_reported_as_failures(tmp_path):
+    case = CrashingCase(str(tmp_path / 'results'))
+    orch = orchestrator.Orchestrator(case, catalog_path=str(tmp_path / 'catalog.jsonl'))
+
+    status = orch.run()
+
+    assert status['done'] == 6
+    assert status['failed'] == 2
+    assert {f['stage'] for f in status['failures']} == {'simulate'}
+    assert all('crashed' in f['error'] for f in status['failures'])
+    with open(str(tmp_path / 'catalog.jsonl')) as f:
+        assert all(json.loads(line)['point']['x'] != 1 for line in f)
+
+
+def capped_x(graph):
+    time.sleep(0.005)  # slow enough for the runs of several points to overlap
+    return min(graph.graph['x'], 4)
+
+
+class SteadyCase(Case):
+    def __init__(self, root):
+        super().__init__(root)
+        self.stop_conditions = [(environment.SteadyState(capped_x, window=3), 1)]
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(x=range(0, 3), seed=[0, 1])
+        return self.grid
+
+
+def test_stateful_stop_conditions_match_sequential_runs(tmp_path):
+    stop_times = []
+    for name in ['sequential', 'orchestrated']:
+        case = SteadyCase(str(tmp_path / name))
+        if name == 'sequential':
+            case.run()
+        else:
+            orchestrator.Orchestrator(case, concurrency={'build': 4, 'simulate': 2}).run()
+        stop_times.append([results.from_path(results.path_from_point(point, str(tmp_path / name))).meta['stop_time']
+                           for point in case.grid])
+
+    assert stop_times[1] == stop_times[0]
+    assert 0 < min(stop_times[0]) < 5
+
+
+def test_orchestrator_rejects_reused_environments(tmp_path):
+    case = Case(str(tmp_path))
+    case.reuse = True
+
+    with pytest.raises(ValueError):
+        orchestrator.Orchestrator(case)
+
+
+def test_compressed_results_match_uncompressed(tmp_path):
+    log = logger.BaseLogger(str(tmp_path / 'log.pickle'))
+    for ii in range(0, 10):
+        log.save(ii)
+    log.annotate(stop_reason='runtime')
+    log.close()
+    plain = results.from_path(log.path)
+
+    path = logger.compress(log.path)
+
+    assert not os.path.exists(log.path)
+    compressed = results.from_path(path)
+    assert compressed.data == plain.data == list(range(0, 10))
+    assert compressed.meta == plain.meta
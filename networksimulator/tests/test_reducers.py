@@ -0,0 +1,126 @@
+import os
+import pytest
+import networkx as nx
+from .. import agents, grid, logger, reducers, results
+from . import cases
+
+
+def test_reducers():
+    series = [(0, 3), (1, 5), (2, 9), (3, 9), (4, 2), (5, 0), (6, 0)]
+    reduced = {}
+    for name, reducer in [('final', reducers.Final()), ('max', reducers.Max()), ('min', reducers.Min()),
+                          ('argmax', reducers.ArgMax()), ('mean', reducers.Mean()),
+                          ('extinct', reducers.FirstTime(lambda x: x == 0))]:
+        for time, value in series:
+            reducer.update(time, value)
+        reduced[name] = reducer.result()
+
+    assert reduced == {'final': 0, 'max': 9, 'min': 0, 'argmax': 2, 'mean': pytest.approx(4), 'extinct': 5}
+
+
+def test_reducers_without_observations():
+    for reducer in [reducers.Final(), reducers.Max(), reducers.Min(), reducers.ArgMax(), reducers.Mean(),
+                    reducers.FirstTime()]:
+        assert reducer.result() is None
+
+
+def test_logger_records_reductions_in_meta(tmp_path):
+    log = logger.BaseLogger(str(tmp_path / 'log.pickle'))
+    log.add_reducer('peak', reducers.Max(lambda state: state['x']))
+    for ii in [1, 4, 2]:
+        log.observe(ii, {'x': ii})
+    log.close()
+
+    res = results.from_path(log.path)
+    assert res.data == [{'x': 1}, {'x': 4}, {'x': 2}]
+    assert res.meta == {'peak': 4}
+
+
+def test_logger_without_trajectory_writes_no_file(tmp_path):
+    log = logger.BaseLogger(str(tmp_path / 'log.pickle'), trajectory=False)
+    log.add_reducer('mean', reducers.Mean())
+    for ii in range(0, 5):
+        log.observe(ii, ii)
+    log.close()
+
+    assert log.path is None
+    assert log.meta == {'mean': 2}
+    assert os.listdir(str(tmp_path)) == []
+
+
+class Agent(agents.BaseAgent):
+    def run(self, graph, env):
+        while graph.graph['infected'] > 0:
+            graph.graph['infected'] += graph.graph['growth']
+            yield env.timeout(1)
+
+
+class Logger(logger.BaseLogger):
+    def get_state(self, graph):
+        return {'infected': graph.graph['infected']}
+
+
+class Case(cases.Case):
+    logger_class = Logger
+
+    def __init__(self, root):
+        super().__init__(root, runtime=20)
+        self.reducers = {
+            'peak': reducers.Max(lambda state: state['infected']),
+            'extinction': reducers.FirstTime(lambda state: state['infected'] == 0),
+        }
+        self.trajectory = False
+        self.summary = results.SummaryTable(os.path.join(root, 'summary.sqlite'))
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(start=[3, 5], growth=[-1, 1])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        graph = nx.Graph(infected=kwargs['start'], growth=kwargs['growth'])
+        graph.add_node(Agent(0))
+        return graph
+
+
+def test_simcase_records_summary_table_without_trajectories(tmp_path):
+    case = Case(str(tmp_path))
+    case.run()
+
+    assert os.listdir(str(tmp_path)) == ['summary.sqlite']
+    summary = case.summary
+    assert len(summary) == 4
+    assert summary.get({'start': 3, 'growth': -1}) == {
+        'hash': grid.hash_grid_point({'start': 3, 'growth': -1}), 'start': 3, 'growth': -1,
+        'peak': 2, 'extinction': 2, 'stop_reason': 'runtime', 'stop_time': 20
+    }
+    growing = summary.get({'start': 5, 'growth': 1})
+    assert growing['peak'] == 25
+    assert 'extinction' not in growing
+
+    table = summary.read(['start', 'growth', 'peak'])
+    assert sorted(zip(table['start'].tolist(), table['growth'].tolist(), table['peak'].tolist())) == [
+        (3, -1, 2), (3, 1, 23), (5, -1, 4), (5, 1, 25)]
+
+
+def test_summary_table_replaces_rows_and_checks_names(tmp_path):
+    summary = results.SummaryTable(str(tmp_path / 'summary.sqlite'))
+    summary.add({'seed': 1}, {'peak': 3})
+    summary.add({'seed': 1}, {'peak': 4, 'final': [1, 2]})
+
+    assert len(summary) == 1
+    assert summary.get({'seed': 1})['peak'] == 4
+    assert summary.get({'seed': 1})['final'] == '[1, 2]'
+    with pytest.raises(KeyError):
+        summary.get({'seed': 2})
+    with pytest.raises(ValueError):
+        summary.add({'seed': 2}, {'seed': 3})
+
+
+def test_summary_table_reads_do_not_take_the_write_lock(tmp_path):
+    summary = results.SummaryTable(str(tmp_path / 'summary.sqlite'), timeout=0.1)
+    summary.add({'seed': 1}, {'peak': 3})
+
+    with summary._connect(write=False) as db:
+        db.execute('SELECT COUNT(*) FROM summary').fetchone()
+        assert len(summary) == 1
+        assert summary.read(['peak'])['peak'].tolist() == [3]
@@ -2,8 +2,12 @@
 """
 
 """
-from .. import results
+from .. import grid, logger, results
+from . import cases
+import networkx as nx
 import numpy as np
+import pytest
+import os
 
 
 FILEPATH = '/Users/elias/projects/networksimulator/networksimulator/tests/data_test_simulation_results.pickle'
@@ -24,4 +28,79 @@ def test_can_build_from_file_obj():
     with open(FILEPATH, 'rb') as f:
         r = results.from_file(f)
         states = np.asarray(r.data)
-        np.testing.assert_almost_equal(np.mean(states), 50, 1)
\ No newline at end of file
+        np.testing.assert_almost_equal(np.mean(states), 50, 1)
+
+
+class Logger(logger.BaseLogger):
+    def get_state(self, graph):
+        return {'sick': graph.graph['beta'] * graph.graph['seed']}
+
+
+class Case(cases.Case):
+    logger_class = Logger
+
+    def __init__(self, root):
+        super().__init__(root, runtime=4)
+
+    def _prepare_grid(self):
+        self.grid = grid.BaseGrid().add_dimensions(seed=[0, 1, 2], beta=[1, 10])
+        return self.grid
+
+    def _prepare_graph(self, **kwargs):
+        graph = nx.Graph(**kwargs)
+        graph.add_nodes_from([cases.Agent(ii) for ii in range(0, 2)])
+        return graph
+
+
+@pytest.fixture
+def grid_results(tmp_path):
+    case = Case(str(tmp_path / 'raw'))
+    case.run()
+    return case.grid, str(tmp_path / 'raw'), str(tmp_path / 'dataset')
+
+
+def test_point_table_columns():
+    table = results.point_table({'seed': 3}, [1, 2, 4])
+
+    np.testing.assert_array_equal(table['seed'], [3, 3, 3])
+    np.testing.assert_array_equal(table['step'], [0, 1, 2])
+    np.testing.assert_array_equal(table['state'], [1, 2, 4])
+
+
+@pytest.mark.parametrize('fmt', ['npz', 'parquet', 'arrow'])
+def test_export_and_read_grid_dataset(grid_results, fmt):
+    if fmt != 'npz':
+        pytest.importorskip('pyarrow')
+    g, root, path = grid_results
+
+    dataset = results.export_grid(g, root, path, fmt=fmt, partition_by=('beta',))
+    assert os.path.isdir(os.path.join(path, 'beta=10'))
+
+    table = dataset.read()
+    assert len(table['step']) == 6 * 4
+    np.testing.assert_array_equal(table['sick'], table['beta'] * table['seed'])
+
+    table = dataset.read(columns=['sick'], filters=[('beta', '==', 10), ('seed', 'in', [1, 2]), ('step', '<', 2)])
+    assert list(table.keys()) == ['sick']
+    assert sorted(table['sick']) == [10, 10, 20, 20]
+
+
+def test_dataset_filters_prune_files(grid_results, monkeypatch):
+    g, root, path = grid_results
+    dataset = results.export_grid(g, root, path)
+
+    opened = []
+    read_table = results._read_table
+    monkeypatch.setattr(results, '_read_table', lambda *args: opened.append(args[0]) or read_table(*args))
+    dataset.read(filters=[('seed', '==', 0)])
+
+    assert len(opened) == 2
+
+
+def test_dataset_to_dataframe(grid_results):
+    pytest.importorskip('pandas')
+    g, root, path = grid_results
+
+    frame = results.export_grid(g, root, path).to_dataframe(index=['beta', 'seed', 'step'])
+
+    assert frame.loc[(10, 2, 3), 'sick'] == 20
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import agents, builders, environment, streams
+import networkx as nx
+import numpy as np
+import subprocess
+import sys
+
+
+class Agent(agents.BaseAgent):
+    def run(self, graph, env):
+        rng = env.agent_rng(self)
+        while True:
+            graph.nodes[self]['draws'].append(rng.random())
+            yield env.timeout(1)
+
+
+def test_stable_key_is_independent_of_process():
+    code = 'from networksimulator.tests.test_streams import Agent; from networksimulator import streams; ' \
+           'print(streams.stable_key(Agent("a")), streams.stable_key(Agent))'
+    out = subprocess.check_output([sys.executable, '-c', code]).decode().split()
+
+    assert int(out[0]) == streams.stable_key(Agent('a'))
+    assert int(out[1]) == streams.stable_key(Agent)
+    assert streams.stable_key(7) == 7
+
+
+def test_streams_are_reproducible_and_independent():
+    root = streams.RandomStreams(42)
+
+    a = root.generator('agent', 1).random(5)
+    np.testing.assert_array_equal(a, streams.RandomStreams(42).generator('agent', 1).random(5))
+    assert not np.array_equal(a, root.generator('agent', 2).random(5))
+    assert not np.array_equal(root.point({'seed': 0}).generator().random(5),
+                              root.point({'seed': 1}).generator().random(5))
+
+
+def run_agents(order, seed):
+    graph = nx.Graph()
+    graph.add_nodes_from([(Agent(ii), {'draws': []}) for ii in order])
+    environment.NetworkEnvironment(graph, seed=seed).run(until=3)
+    return {node.agent_id: attr['draws'] for node, attr in graph.nodes(data=True)}
+
+
+def test_agent_streams_do_not_depend_on_scheduling_order():
+    seed = streams.RandomStreams(5).point({'beta': 0.1})
+
+    assert run_agents([0, 1, 2, 3], seed) == run_agents([3, 1, 0, 2], seed)
+
+
+def test_environment_with_seed_sequence_uses_generator():
+    env = environment.NetworkEnvironment(nx.Graph(), seed=np.random.SeedSequence(3))
+    first = env.draw('normal')
+
+    env.reset(seed=np.random.SeedSequence(3))
+
+    assert isinstance(env.rng, np.random.Generator)
+    assert env.draw('normal') == first
+
+
+def test_builders_accept_pcg64_streams():
+    b = builders.NodeListBuilder(streams.RandomStreams(0).random_state('nodes'))
+    b.size = 5
+    b.add(x=('normal', [0, 1], {}))
+
+    assert len(b.build(nx.Graph())) == 5
+
+
+def test_graph_factory_with_generator_is_reproducible():
+    def build():
+        factory = builders.GraphFactory(np.random.default_rng(0))
+        factory.set_size(20)
+        factory.set_agent(Agent)
+        factory.set_node_attribute(x=('normal', [0, 1]))
+        factory.set_edge_by_distribution(('uniform', [0, 1]), 0.8)
+        graph = factory.build()
+        return ([(node.agent_id, attr['x']) for node, attr in graph.nodes(data=True)],
+                sorted((u.agent_id, v.agent_id) for u, v in graph.edges()))
+
+    nodes, edges = build()
+
+    assert len({x for (_, x) in nodes}) == 20
+    assert len(edges) > 0
+    assert build() == (nodes, edges)
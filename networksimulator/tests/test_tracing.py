@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+
+"""
+from .. import agents, environment, tracing
+import sys
+import json
+import networkx as nx
+import pytest
+
+
+class Agent(agents.BaseAgent):
+    tracer = None
+
+    def run(self, graph, env):
+        while True:
+            yield env.timeout(1)
+            if self.agent_id == 0 and env.now == 2:
+                Agent.tracer.sample(sys._getframe())
+
+
+class Spinner(agents.BaseAgent):
+    def run(self, graph, env):
+        while True:
+            total = 0
+            for ii in range(0, 20000):
+                total += ii
+            yield env.timeout(1)
+
+
+def build_env(cls, num_nodes=5, **kwargs):
+    graph = nx.Graph()
+    graph.add_nodes_from([cls(ii) for ii in range(0, num_nodes)])
+    return environment.NetworkEnvironment(graph, **kwargs)
+
+
+def probe(env):
+    yield env.timeout(0.5)
+    Agent.tracer.sample(sys._getframe())
+
+
+@pytest.mark.parametrize('scheduler', ['heap', 'calendar'])
+def test_sample_attributes_event_to_process_and_agent_class(scheduler):
+    env = build_env(Agent, scheduler=scheduler)
+    Agent.tracer = tracer = tracing.Tracer(env)
+    env.process(probe(env))
+    env.run(until=3)
+
+    assert tracer.counts == {('Timeout', 'probe', None): 1, ('Timeout', 'Agent.run', 'Agent'): 1}
+    assert [sample[1:3] for sample in tracer.samples] == [(0.5, 6), (2, 5)]
+
+
+def test_describe_outside_simulation():
+    assert tracing.describe(sys._getframe()) is None
+    assert tracing.describe(None) is None
+
+
+def test_tracer_keeps_at_most_max_samples():
+    env = build_env(Agent, num_nodes=1)
+    Agent.tracer = tracer = tracing.Tracer(env, max_samples=1)
+    env.process(probe(env))
+    env.run(until=3)
+    assert len(tracer.samples) == 1
+    assert tracer.taken == 2
+    assert sum(tracer.counts.values()) == 2
+
+
+def test_tracer_samples_running_simulation(tmp_path):
+    env = build_env(Spinner, num_nodes=10)
+    with tracing.Tracer(env, interval=0.001) as tracer:
+        env.run(until=100)
+
+    assert tracer.taken > 0
+    assert tracer.elapsed > 0
+    summary = tracer.summary()
+    assert ('Timeout', 'Spinner.run', 'Spinner') in summary
+    assert sum(entry['time'] for entry in summary.values()) <= tracer.elapsed
+
+    path = tracer.write(str(tmp_path / 'trace.json'))
+    with open(path) as f:
+        trace = json.load(f)
+    complete = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    counters = [event for event in trace['traceEvents'] if event['ph'] == 'C']
+    assert len(complete) == len(counters) == len(tracer.samples)
+    assert 'Spinner.run' in {event['name'] for event in complete}
+    assert all(event['args']['length'] <= 11 for event in counters)
+    assert trace['otherData']['samples'] == tracer.taken
+
+
+def test_tracer_cannot_start_twice():
+    tracer = tracing.Tracer(build_env(Agent)).start()
+    with pytest.raises(ValueError):
+        tracer.start()
+    tracer.stop()
@@ -0,0 +1,182 @@
+"""Tracing module
+
+Statistical tracing of the events processed by a `NetworkEnvironment`, cheap enough to stay on in production sweeps.
+
+A `Tracer` samples, from a background thread and at a fixed wall-clock interval, what the thread running the
+simulation is doing. When it is processing an event in the environment's `step` method, the sample is attributed to
+the event type, e.g. 'Timeout', to the process resumed by the event - e.g. 'Agent.run',
+'NetworkEnvironment._run_batch' or 'BaseLogger.log' - and to the class of its agent, and the length of the event queue
+is recorded alongside. As nothing is added to the processing of each event, the overhead only depends on the sampling
+interval, and is well below a few percent at the default interval.
+
+Each sample stands for an equal share of the wall-clock time traced, so that `summary` estimates the time spent per
+event type, process and agent class. The sampling thread needs the interpreter lock to take a sample, so that the
+actual interval between samples is at least the interpreter's switch interval (`sys.getswitchinterval`, 5ms by
+default). Samples may be written with `write` as Chrome trace-event JSON, viewable offline in chrome://tracing or
+Perfetto. For example:
+```
+with tracing.Tracer(env) as tracer:
+    env.run(until=100)
+tracer.write('trace.json')
+```
+Tracing relies on `sys._current_frames`, which is specific to CPython.
+"""
+import sys
+import json
+import threading
+from time import perf_counter
+from simpy.events import Process
+import simpy
+from . import agents
+from .environment import CalendarScheduler
+
+STEP_CODES = frozenset([simpy.Environment.step.__code__, CalendarScheduler.step.__code__])
+RESUME_CODE = Process._resume.__code__
+
+
+def _local(frame, name):
+    """Reads a local variable of a frame, None if unset. Frames of the simulation thread are running while the tracer
+    reads them, so the read is a best effort and any failure yields None"""
+    try:
+        return frame.f_locals.get(name)
+    except Exception:
+        return None
+
+
+def _agent_name(frame):
+    """Returns the name of the agent class of a process, from the local variables of its generator frame"""
+    # agents resume their own run methods; batches of agents are stepped by the environment's _run_batch
+    for agent in (_local(frame, 'self'), _local(frame, 'agent')):
+        if isinstance(agent, agents.BaseAgent):
+            return type(agent).__name__
+        if isinstance(agent, type) and issubclass(agent, agents.BaseAgent):
+            return agent.__name__
+    return None
+
+
+def describe(frame):
+    """Describes the event being processed by the thread whose innermost frame is given
+
+    Args:
+        frame: Python frame object
+
+    Returns:
+        Tuple of (event type, process name, agent class name), or None if no event is being processed. The process
+        and agent names are None when the event resumes no process, or when it is not yet resuming it
+    """
+    process = None
+    while frame is not None:
+        back = frame.f_back
+        if back is not None and back.f_code is RESUME_CODE:
+            process = frame
+        if frame.f_code in STEP_CODES:
+            event = _local(frame, 'event')
+            if event is None:
+                return None
+            if process is None:
+                return type(event).__name__, None, None
+            code = process.f_code
+            name = getattr(code, 'co_qualname', code.co_name)
+            return type(event).__name__, name, _agent_name(process)
+        frame = back
+    return None
+
+
+class Tracer(object):
+    """Samples the events processed by an environment, from a background thread
+
+    Arguments:
+        env : (NetworkEnvironment) : Environment traced
+        interval : (float) [optional] : Seconds between samples
+        max_samples : (int) [optional] : Number of samples kept for the trace file. Later samples still count towards
+            the summary
+    """
+
+    def __init__(self, env, interval=0.005, max_samples=100000):
+        self.env = env
+        self.interval = interval
+        self.max_samples = max_samples
+        self.samples = []
+        self.counts = {}
+        self.taken = 0
+        self.elapsed = 0.0
+        self.__thread__ = None
+        self.__stop__ = None
+        self.__start__ = perf_counter()
+
+    def start(self):
+        """Starts sampling the thread calling this method, which runs the simulation"""
+        if self.__thread__ is not None:
+            raise ValueError('Tracer is already started')
+        self.__start__ = perf_counter()
+        self.__stop__ = threading.Event()
+        self.__thread__ = threading.Thread(target=self._run, args=(threading.get_ident(),), daemon=True)
+        self.__thread__.start()
+        return self
+
+    def stop(self):
+        """Stops sampling"""
+        if self.__thread__ is not None:
+            self.__stop__.set()
+            self.__thread__.join()
+            self.__thread__ = None
+            self.elapsed += perf_counter() - self.__start__
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self, thread_id):
+        while not self.__stop__.wait(self.interval):
+            self.sample(sys._current_frames().get(thread_id))
+
+    def sample(self, frame):
+        """Records what the thread whose innermost frame is given is processing
+
+        Args:
+            frame: Python frame object
+        """
+        self.taken += 1
+        described = describe(frame)
+        if described is None:
+            return
+        self.counts[described] = self.counts.get(described, 0) + 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append((perf_counter() - self.__start__, self.env.now, self.env.queue_length()) + described)
+
+    def summary(self):
+        """Estimated wall-clock seconds spent processing events, per (event type, process, agent class), once stopped
+
+        Returns:
+            Dictionary of {(event type, process name, agent class name): {'samples': count, 'time': seconds}}
+        """
+        share = self.elapsed / self.taken if self.taken else 0.0
+        return {key: {'samples': count, 'time': count * share} for (key, count) in self.counts.items()}
+
+    def trace_events(self):
+        """Returns the samples as a list of Chrome trace events: one complete event per sample, lasting one sampling
+        interval, and one counter event per sample for the queue length. Timestamps are wall-clock microseconds since
+        the tracer was started"""
+        events = []
+        duration = round(self.interval * 1e6, 3)
+        for start, now, length, kind, name, agent in self.samples:
+            ts = round(start * 1e6, 3)
+            events.append({'name': name or kind, 'cat': kind, 'ph': 'X', 'ts': ts, 'dur': duration, 'pid': 0,
+                           'tid': 0, 'args': {'sim_time': now, 'agent': agent}})
+            events.append({'name': 'queue', 'ph': 'C', 'ts': ts, 'pid': 0, 'args': {'length': length}})
+        return events
+
+    def write(self, path):
+        """Writes the samples to a Chrome trace-event JSON file
+
+        Args:
+            path: (string) path of the trace file
+        """
+        trace = {'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms',
+                 'otherData': {'interval': self.interval, 'samples': self.taken, 'elapsed': self.elapsed}}
+        with open(path, 'w') as f:
+            json.dump(trace, f, separators=(',', ':'), default=repr)
+        return path
@@ -1,7 +1,72 @@
 """
 
 """
+import sqlite3
+from contextlib import contextmanager
 
 
 def dict_lists_to_list_dicts(d):
     return map(dict, zip(*[[(key, val) for val in val_list] for key, val_list in d.items()]))
+
+
+def node_dict(graph):
+    """Returns the mapping of node to node attribute dictionary of a graph
+
+    NetworkX exposes this mapping as `graph.node` before version 2 and as `graph._node` from version 2 onward.
+
+    Args:
+        graph: NetworkX graph object
+
+    Returns:
+        Dictionary of {node: attribute dictionary}
+    """
+    try:
+        return graph._node
+    except AttributeError:
+        return graph.node
+
+
+def adjacency_dicts(graph):
+    """Returns the mappings of node to neighbour dictionary of a graph
+
+    NetworkX exposes these mappings as `graph.adj` and `graph.pred` before version 2 and as `graph._adj` and
+    `graph._pred` from version 2 onward. Neighbour dictionaries map neighbours to edge attribute dictionaries, except on
+    multigraphs.
+
+    Args:
+        graph: NetworkX graph object
+
+    Returns:
+        Tuple of dictionaries ({node: successors}, {node: predecessors}), the latter None for undirected graphs
+    """
+    adj = graph._adj if hasattr(graph, '_adj') else graph.adj
+    if not graph.is_directed():
+        return adj, None
+    return adj, graph._pred if hasattr(graph, '_pred') else graph.pred
+
+
+@contextmanager
+def sqlite_transaction(path, timeout, write=True):
+    """Opens a connection to an SQLite database for a single transaction, committed on exit and rolled back on error.
+    Connections are not shared, so that the objects using them may be used from several threads and processes
+
+    Args:
+        path: (string) path of the database file
+        timeout: (float) seconds to wait for the database lock
+        write: (bool) take the write lock at the start of the transaction, so that its reads and writes are not
+            interleaved with those of other writers. Read-only transactions should not, so as not to block writers
+
+    Yields:
+        sqlite3.Connection object
+    """
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    try:
+        db.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+    finally:
+        db.close()